@@ -1,102 +1,132 @@
+"""
+監看 radar_data 資料夾，新的手勢 .npy 檔案寫入完成後，自動將點雲做成動畫存成 .gif 檔案。
+每個手勢輸出到 radar_data_gif/{檔名}.gif，由固定數量的行程平行處理，閒置時不佔用 CPU。
+"""
 import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 from dotenv import load_dotenv
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import threading
+from modules.animation import export_animation
 
 load_dotenv()
 npy_file_name = os.getenv("DATA_STORAGE_FILE_NAME")
 
-class ProcessingThread(threading.Thread):
-    def __init__(self, radar_viz, file_number):
-        threading.Thread.__init__(self)
-        self.radar_viz = radar_viz
-        self.file_number = file_number
+# Processes rendering animations
+WORKERS = 2
+# Seconds without new write events before a file counts as complete
+SETTLE_TIME = 0.5
+# Attempts to load a file that is still incomplete after settling
+MAX_RETRIES = 10
 
-    def run(self):
-        self.radar_viz.process_new_file(self.file_number)
-
-class RadarDataVisualization:
-    def __init__(self):
-        self.gesture_dataframe = None
-        self.file_path = None
-        self.fig = None
-        self.axes = None
-        self.scatter = None
-
-    def read_data(self, number):
-        path = f"radar_data/{npy_file_name}_{number}.npy"
-        np_array = np.load(path)
-        dataframe = pd.DataFrame(np_array, columns=['x', 'y', 'z', 'doppler', 'range', 'snr', 'azimuth', 'elevation', 'time']).drop('time', axis=1)
-        return dataframe, path
-
-    def set_figure(self, title):
-        self.fig = plt.figure()
-        self.axes = self.fig.add_subplot(projection='3d')
-        self.scatter = self.axes.scatter(self.gesture_dataframe['x'], self.gesture_dataframe['y'], self.gesture_dataframe['z'])
-        self.axes.set_xlabel('X')
-        self.axes.set_ylabel('Y')
-        self.axes.set_zlabel('Z')
-        self.axes.set_xlim([0.6, -0.6])
-        self.axes.set_ylim([0.6, 0])
-        self.axes.set_zlim([-0.6, 0.6])
-        self.axes.view_init(elev=10, azim=-90)
-        # self.axes.view_init(elev=10, azim=180)  
-        plt.title(title)
-
-    def update_plot(self, frame):
-        snr_nonzero_indices = np.nonzero(self.gesture_dataframe['snr'][:frame+1].values)[0]
-        self.scatter._offsets3d = (
-            self.gesture_dataframe['x'][:frame+1].values[snr_nonzero_indices],
-            self.gesture_dataframe['y'][:frame+1].values[snr_nonzero_indices],
-            self.gesture_dataframe['z'][:frame+1].values[snr_nonzero_indices]
-        )
-        # self.scatter.set_array(range(len(snr_nonzero_indices)))
-        # self.scatter.set_cmap('plasma')
-        # self.scatter.set_clim(0, len(snr_nonzero_indices))
-        return self.scatter,
-
-    def process_new_file(self, file_number):
-        self.gesture_dataframe, self.file_path = self.read_data(file_number)
-        print(self.gesture_dataframe)
-        self.gesture_dataframe = self.gesture_dataframe.loc[self.gesture_dataframe['snr'] != 0].reset_index(drop=True)
-        # print(self.gesture_dataframe)
-
-        self.set_figure(f'Filepath: {self.file_path}')
-        animation = FuncAnimation(self.fig, self.update_plot, frames=len(self.gesture_dataframe), interval=40, blit=True)
-
-        output_file = 'radar_data_gif/PointCloud_animation.gif'
-        animation.save(output_file, writer='pillow')
-        print(f"圖片已儲存至 {output_file}")
-
-    def watch_directory(self, directory):
-        event_handler = FileSystemEventHandler()
-
-        def on_created(event):
-            if not event.is_directory:
-                file_name = event.src_path
-                file_number = file_name.split('_')[-1].split('.')[0]
-                processing_thread = ProcessingThread(self, file_number)
-                processing_thread.start()
-
-        event_handler.on_created = on_created
 
+def is_complete(npy_path):
+    """ True when the .npy header can be read and the file holds all of its data """
+    try:
+        np.load(npy_path, mmap_mode='r')
+        return True
+    except (OSError, ValueError, EOFError):
+        return False
+
+
+class GestureWatcher(FileSystemEventHandler):
+    """ Class: GestureWatcher
+
+    Collects write events per .npy file and hands a file to the process pool once no event
+    has arrived for SETTLE_TIME seconds and it loads completely. The scheduler thread sleeps
+    on a condition until the next deadline, so nothing runs while the directory is idle.
+    """
+
+    def __init__(self, directory, gif_directory, workers=WORKERS, settle_time=SETTLE_TIME):
+        FileSystemEventHandler.__init__(self)
+        self.directory = directory
+        self.gif_directory = gif_directory
+        self.settle_time = settle_time
+        self.pattern = re.compile(rf'''^{re.escape(npy_file_name or '')}.*_(\d+)\.npy$''')
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        # path -> (deadline, retries)
+        self.pending = {}
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.scheduler = threading.Thread(target=self.schedule, daemon=True)
+
+    def on_created(self, event):
+        self.touch(event)
+
+    def on_modified(self, event):
+        self.touch(event)
+
+    def on_moved(self, event):
+        self.touch(event, event.dest_path)
+
+    def touch(self, event, path=None):
+        """ (Re)start the settle timer of a gesture file """
+        path = path or event.src_path
+        if event.is_directory or not self.pattern.match(os.path.basename(path)):
+            return
+        with self.condition:
+            retries = self.pending.get(path, (0, 0))[1]
+            self.pending[path] = (time.monotonic() + self.settle_time, retries)
+            self.condition.notify()
+
+    def schedule(self):
+        """ Scheduler loop: submit settled files, re-arm the ones still being written """
+        with self.condition:
+            while not self.stopped:
+                now = time.monotonic()
+                due = [path for path, (deadline, _) in self.pending.items() if deadline <= now]
+                for path in due:
+                    retries = self.pending.pop(path)[1]
+                    if is_complete(path):
+                        self.submit(path)
+                    elif retries < MAX_RETRIES and os.path.exists(path):
+                        self.pending[path] = (now + self.settle_time, retries + 1)
+                    else:
+                        print(f"[Warning] 無法讀取 {path}，略過")
+                timeout = min((deadline for deadline, _ in self.pending.values()), default=None)
+                self.condition.wait(None if timeout is None else max(timeout - now, 0))
+
+    def submit(self, npy_path):
+        """ Queue one gesture for rendering """
+        gif_name = os.path.splitext(os.path.basename(npy_path))[0] + '.gif'
+        # front view, only the frames that add a point
+        future = self.pool.submit(export_animation, npy_path, os.path.join(self.gif_directory, gif_name),
+                                  ('a',), True, f'Filepath: {npy_path}')
+        future.add_done_callback(self.report)
+
+    @staticmethod
+    def report(future):
+        """ Print a failed job, a bad file must not stop the watcher """
+        if future.exception() is not None:
+            print(f"[Error] {future.exception()!r}")
+        else:
+            print(f"圖片已儲存至 {future.result()}")
+
+    def run(self):
+        """ Watch until Ctrl+C """
+        os.makedirs(self.gif_directory, exist_ok=True)
         observer = Observer()
-        observer.schedule(event_handler, directory, recursive=False)
+        observer.schedule(self, self.directory, recursive=False)
         observer.start()
+        self.scheduler.start()
+        print(f"[Info] 監看 {self.directory}，輸出至 {self.gif_directory}")
         try:
-            while True:
-                pass
+            while observer.is_alive():
+                # blocks; the timeout only lets Ctrl+C through on every platform
+                observer.join(1)
         except KeyboardInterrupt:
-            observer.stop()
+            pass
+        observer.stop()
         observer.join()
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.pool.shutdown(wait=True)
+
 
 if __name__ == '__main__':
-    radar_viz = RadarDataVisualization()
-    radar_viz.watch_directory('radar_data')
+    GestureWatcher('radar_data', 'radar_data_gif').run()
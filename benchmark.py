@@ -0,0 +1,215 @@
+"""
+擷取熱路徑的效能基準測試。
+以 PacketGenerator 產生的合成封包（或 --capture 指定的錄製檔）驅動每個階段，
+依不同設定檔與點數量測 frames/s 與 p50/p99 延遲，結果存成 JSON；
+指定 --baseline 時，任何階段的 p50 比基準慢超過 --threshold 即標示為退步並以非零狀態結束。
+
+python benchmark.py
+python benchmark.py --configs radar_config/heatmap.cfg --points 8 64 --output new.json --baseline old.json
+python benchmark.py --capture radar_capture/capture_20240101_120000.bin --configs radar_config/30fps_06m_15db.cfg
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from modules.parser_mmw_demo import parser_helper, parser_one_mmw_demo_output_packet
+from modules.packet_generator import PacketGenerator
+from modules.frame_sync import FrameSynchronizer
+from modules.capture import ReplaySerial
+from modules.radar import Radar
+
+CONFIG_FILE_PATHS = ['radar_config/30fps_06m_15db.cfg', 'radar_config/heatmap.cfg']
+POINT_COUNTS = [1, 8, 32, 128, 512]
+REPEAT = 500
+# Rendering and saving touch the disk, they get fewer iterations
+SLOW_REPEAT = 10
+WINDOW_SIZE = 40
+THRESHOLD = 0.2
+
+
+class PacketSerial:
+    """ Class: PacketSerial
+
+    Hands out one whole packet per read, cycling through a list of packets,
+    so Radar.read_and_parse_radar_data parses exactly one frame per call.
+    """
+
+    def __init__(self, packets):
+        self.packets = packets
+        self.index = 0
+
+    @property
+    def in_waiting(self):
+        """ Size of the next packet """
+        return len(self.packets[self.index])
+
+    def read(self, size=1):
+        """ Return the next packet """
+        packet = self.packets[self.index]
+        self.index = (self.index + 1) % len(self.packets)
+        return packet[:size]
+
+
+class NullRenderPool:
+    """ Class: NullRenderPool
+
+    Render pool that drops every job, so data_to_numpy is timed without plot_data.
+    """
+
+    def submit(self, *args, **kwargs):
+        """ Drop the job, returns an already completed future like ProcessPoolExecutor.submit """
+        future = Future()
+        future.set_result(None)
+        return future
+
+
+def time_calls(function, arguments, repeat):
+    """ Call function once per repeat, cycling through arguments, and return the latencies in seconds """
+    latencies = np.empty(repeat)
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        function(*arguments[0])
+        for index in range(repeat):
+            args = arguments[index % len(arguments)]
+            start = time.perf_counter()
+            function(*args)
+            latencies[index] = time.perf_counter() - start
+    return latencies
+
+
+def summarize(latencies):
+    """ frames/s and latency percentiles in us """
+    return {
+        "repeat": len(latencies),
+        "frames_per_sec": float(len(latencies) / latencies.sum()),
+        "mean_us": float(latencies.mean() * 1e6),
+        "p50_us": float(np.percentile(latencies, 50) * 1e6),
+        "p99_us": float(np.percentile(latencies, 99) * 1e6),
+    }
+
+
+def capture_packets(capture_file_path):
+    """ Split the data-port stream of a capture file into packets """
+    frame_sync = FrameSynchronizer(2**20)
+    frame_sync.feed(ReplaySerial(capture_file_path, speed=0).data)
+    return [bytes(frame) for frame in frame_sync.frames()]
+
+
+def benchmark_frames(radar, packets, repeat):
+    """ Per-frame stages on a list of packets """
+    frames = [np.frombuffer(packet, dtype='uint8') for packet in packets]
+    frame_args = [(frame, len(frame)) for frame in frames]
+    results = {
+        "parser_helper": time_calls(parser_helper, frame_args, repeat),
+        "parser_one_mmw_demo_output_packet": time_calls(
+            parser_one_mmw_demo_output_packet,
+            [(frame, num_bytes, radar.radar_parameters) for frame, num_bytes in frame_args], repeat),
+        "read_and_parse_radar_data": time_calls(
+            radar.read_and_parse_radar_data, [(PacketSerial(packets),)], repeat),
+    }
+    detection_objs = [radar.parse_frame(packet)[2] for packet in packets]
+    results["find_average_point"] = time_calls(
+        radar.find_average_point, [(1, detection_obj) for detection_obj in detection_objs], repeat)
+    return results
+
+
+def benchmark_window(radar, packets, repeat):
+    """ Per-gesture stages on a window built from the packets """
+    window = []
+    for index in range(WINDOW_SIZE):
+        avg_pt = radar.find_average_point(1, radar.parse_frame(packets[index % len(packets)])[2])
+        # Leave some empty frames so interpolation has gaps to fill
+        window.append(np.zeros(9) if index % 7 == 3 else avg_pt[0].copy())
+    window = np.array(window)
+
+    with tempfile.TemporaryDirectory() as npy_file_dir, tempfile.TemporaryDirectory() as pic_file_dir:
+        return {
+            "data_to_numpy": time_calls(
+                radar.data_to_numpy, [(npy_file_dir, 'bench', pic_file_dir, window, NullRenderPool())], repeat),
+            "plot_data": time_calls(Radar.plot_data, [(window, 0, pic_file_dir)], repeat),
+        }
+
+
+def run(config_file_paths, point_counts, repeat, slow_repeat, capture_file_path=None):
+    """ Run every stage for every config and point count, return {key: result} """
+    results = {}
+    for config_file_path in config_file_paths:
+        generator = PacketGenerator(config_file_path, seed=0)
+        radar = Radar()
+        radar.radar_parameters = generator.radar_parameters
+
+        if capture_file_path:
+            packet_sets = {"capture": capture_packets(capture_file_path)}
+        else:
+            packet_sets = {num_points: [generator.packet(frame_number, num_points) for frame_number in range(16)]
+                           for num_points in point_counts}
+
+        for num_points, packets in packet_sets.items():
+            for stage, latencies in benchmark_frames(radar, packets, repeat).items():
+                results[f'''{stage}|{config_file_path}|{num_points}'''] = {
+                    "stage": stage, "config": config_file_path, "points": num_points, **summarize(latencies)}
+
+        packets = next(iter(packet_sets.values()))
+        for stage, latencies in benchmark_window(radar, packets, slow_repeat).items():
+            results[f'''{stage}|{config_file_path}|window'''] = {
+                "stage": stage, "config": config_file_path, "points": "window", **summarize(latencies)}
+    return results
+
+
+def compare(results, baseline, threshold):
+    """ Keys whose p50 latency grew by more than threshold over the baseline """
+    regressions = {}
+    for key, result in results.items():
+        if key in baseline and result["p50_us"] > baseline[key]["p50_us"] * (1 + threshold):
+            regressions[key] = result["p50_us"] / baseline[key]["p50_us"] - 1
+    return regressions
+
+
+def main():
+    """ Command line entry """
+    argument_parser = argparse.ArgumentParser(description='Benchmark the radar acquisition hot path')
+    argument_parser.add_argument('--configs', nargs='+', default=CONFIG_FILE_PATHS)
+    argument_parser.add_argument('--points', nargs='+', type=int, default=POINT_COUNTS)
+    argument_parser.add_argument('--repeat', type=int, default=REPEAT)
+    argument_parser.add_argument('--slow-repeat', type=int, default=SLOW_REPEAT)
+    argument_parser.add_argument('--capture', help='capture file to replay instead of synthetic packets')
+    argument_parser.add_argument('--output', default='benchmark_result.json')
+    argument_parser.add_argument('--baseline', help='earlier result file to compare against')
+    argument_parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                                 help='allowed p50 slowdown as a fraction, 0.2 = 20%%')
+    args = argument_parser.parse_args()
+
+    results = run(args.configs, args.points, args.repeat, args.slow_repeat, args.capture)
+
+    print(f"{'stage':<36} {'config':<32} {'points':>8} {'frames/s':>12} {'p50 us':>10} {'p99 us':>10}")
+    for result in results.values():
+        print(f"{result['stage']:<36} {os.path.basename(result['config']):<32} {str(result['points']):>8} "
+              f"{result['frames_per_sec']:>12.0f} {result['p50_us']:>10.1f} {result['p99_us']:>10.1f}")
+
+    with open(args.output, 'w', encoding='utf-8') as output_file:
+        json.dump({"meta": {"time": time.strftime('%Y-%m-%d %H:%M:%S'), "python": platform.python_version(),
+                            "numpy": np.__version__, "machine": platform.machine(),
+                            "repeat": args.repeat, "capture": args.capture},
+                   "results": results}, output_file, indent=2)
+    print(f'''[Info] Benchmark result saved to {args.output}''')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for key, slowdown in regressions.items():
+            print(f'''[Warning] Regression {key}: p50 {slowdown:+.0%} over baseline''')
+        if regressions:
+            sys.exit(1)
+        print(f'''[Info] No stage slower than baseline by more than {args.threshold:.0%}''')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+"""
+將 DATA_STORAGE_FILE_PATH 中舊有的 {DATA_STORAGE_FILE_NAME}_{編號}.npy 檔案依編號順序匯入 GestureStore。
+每個檔案的 id 沿用原本的編號（id 已被使用時才另配新 id），匯入後印出舊編號與新 id 的對照，原本的 .npy 檔案不會被刪除。
+匯入完成後可在 .env 設定 DATA_STORAGE_BACKEND=store；目前 read_npy.py、trans_npy2pic.py、auto_read.py 與 RadarDataset 仍只讀 .npy 檔案，看不到 store 中的手勢。
+"""
+import os
+from dotenv import load_dotenv
+from modules.gesture_store import GestureStore
+
+load_dotenv()
+data_storage_file_path = os.getenv("DATA_STORAGE_FILE_PATH")
+data_storage_file_name = os.getenv("DATA_STORAGE_FILE_NAME")
+
+if __name__ == '__main__':
+    store = GestureStore(data_storage_file_path)
+    ids = store.import_npy_dir(data_storage_file_path, data_storage_file_name)
+    for number, gesture_id in ids.items():
+        print(f"{data_storage_file_name}_{number}.npy -> {gesture_id}")
+    store.close()
+    print(f"匯入 {len(ids)} 筆手勢，共 {len(store)} 筆。")
@@ -1,130 +1,164 @@
 """This module contains the main application logic for processing and displaying radar data."""
-from threading import Thread
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from modules.utils import Utils
-from modules.radar import Radar
+from modules.radar import Radar, render_worker_initializer
+from modules.serial_reader import SerialReader
+from modules.pipeline import Pipeline
+from modules.trigger import StaLtaTrigger
 from modules.gui import GUI
 from modules.heatmap import HEATMAP
-import numpy as np
+from modules.dashboard import Dashboard
 
 # Point Cloud GUI
 POINT_CLOUD_GUI = 1
-# Heatmap GUI
+# Heatmap GUI, shown next to the point cloud when both are enabled
 HEATMAP_GUI = 0
-
-# Initialize classes
-Utils = Utils()
-Radar = Radar()
-GUI = GUI()
-HEATMAP = HEATMAP()
-
-RADAR_CLI_PORT, RADAR_DATA_PORT, RADAR_CONFIG_FILE_PATH, DATA_STORAGE_FILE_PATH, DATA_STORAGE_FILE_NAME, IMAGE_STORAGE_FILE_PATH = Utils.get_radar_env()
-cli_serial, data_serial = Radar.start(
-    RADAR_CLI_PORT, RADAR_DATA_PORT, RADAR_CONFIG_FILE_PATH)
-
-RADAR_POSITION_X, RADAR_POSITION_Y, RADAR_POSITION_Z, GRID_SIZE = Utils.get_gui_env()
-
-
-def sliding_window(frameNum, queue, snr):
-
-    queue.append(snr)
-
-    # Check if the window buffer is full
-    if len(queue) >= frameNum:
-        # Clear the window buffer for the next window
-        queue = queue[1:]  # Remove the oldest data point
-
-    return queue
-
-
-def trigger_check(sta, lta, status):
-    if not sta or not lta:
-        return status
-
-    staMean = sum(sta)/len(sta)
-    ltaMean = sum(lta)/len(lta)
-
-    if staMean/ltaMean > 1.35:
-        status = True
-    elif staMean/ltaMean < 1.1:
-        status = False
-
-    # print(f'''status: {status}, STA/LTA: {staMean/ltaMean}, staMean:{staMean}, ltaMean:{ltaMean}''')
-    return status
-
-
-def radar_thread_function():
-    """radar_thread_function"""
-    sta = []
-    lta = []
-    status = False
-    prev_status = False  # 新增变量以跟踪上一个状态
-    counter = 0
-    pre_trigger_data = []
-
-    while True:
-        ### 雷達座標點讀取，以及取平均點 ###
-        data_ok, _, detection_obj = Radar.read_and_parse_radar_data(
-            data_serial)
-        avg_pt = Radar.find_average_point(data_ok, detection_obj)
-
-        if data_ok:
-            # print(detection_obj)
-            # print(avg_pt)
-
-            if data_ok:
-                pre_trigger_data.append(avg_pt)
-                if len(pre_trigger_data) > 10:
-                    pre_trigger_data.pop(0)
-
-                # trigger checking
-                prev_status = status
-                status = trigger_check(sta, lta, status)
-                if status:
-                    if not prev_status:
-                        print("\nGesture Start")
-                        for data in pre_trigger_data:
-                            Radar.sliding_window(data)
-                        counter = len(pre_trigger_data)
-
-                if status and counter < 25:
-                    Radar.sliding_window(avg_pt)
-                    counter += 1
-                    print(f'''Record frame {counter}, data: {avg_pt}''')
-
-                if status and counter == 25:
-                    print("Gesture End\n")
-                    Radar.data_to_numpy(
-                        DATA_STORAGE_FILE_PATH, DATA_STORAGE_FILE_NAME, IMAGE_STORAGE_FILE_PATH)
-                    # reset
-                    counter = 0
-                    sta = []
-                    lta = []
-                    status = False
-                    pre_trigger_data = []
-                    Radar.window_buffer = np.ndarray((0, 9))
-
-                if not status:
-                    snr = avg_pt[0][5]
-                    sta = sliding_window(15, sta, snr + 150)
-                    lta = sliding_window(35, lta, snr + 150)
-
-            if data_ok and POINT_CLOUD_GUI and not HEATMAP_GUI:
-                GUI.store_point(avg_pt[:, :3])
-
-            if data_ok and HEATMAP_GUI and not POINT_CLOUD_GUI:
-                HEATMAP.save_data(
-                    detection_obj['doppler'], detection_obj['range'])
-
-
-if POINT_CLOUD_GUI:
-    thread1 = Thread(target=radar_thread_function, args=(), daemon=True)
-    thread1.start()
-    GUI.start(RADAR_POSITION_X, RADAR_POSITION_Y, RADAR_POSITION_Z, GRID_SIZE)
-else:
-    radar_thread_function()
-
-
-if HEATMAP_GUI:
-    thread2 = Thread(target=radar_thread_function, args=(), daemon=True)
-    thread2.start()
-    HEATMAP.start()
+# 'points' bins the detected points, 'matrix' shows the TLV type 5 range-Doppler matrix (radar_config/heatmap.cfg)
+HEATMAP_MODE = 'points'
+# Frames kept when parsing falls behind, older ones are dropped unparsed
+MAX_FRAME_BACKLOG = 8
+# Processes rendering gesture images
+RENDER_WORKERS = 2
+# Seconds between pipeline metrics logs, 0 to disable
+PIPELINE_METRICS_INTERVAL = 10
+
+class GestureSegmenter:
+    """ Gesture segmentation stage: average point per frame, STA/LTA trigger and gesture window """
+
+    def __init__(self, radar):
+        self.radar = radar
+        # STA 15 frames, LTA 35 frames, on above 1.35, off below 1.1, on SNR + 150
+        self.trigger = StaLtaTrigger(15, 35, 1.35, 1.1, 150)
+        self.status = False
+        self.prev_status = False  # 新增变量以跟踪上一个状态
+        self.counter = 0
+
+    def process(self, detection_obj):
+        """ Returns [gesture window] when a gesture has been recorded, otherwise None """
+        gesture = None
+        if detection_obj["numObj"] == 0:
+            # frames without detections only reach the GUIs, e.g. to keep the heatmap running
+            return gesture
+        ### 取平均點 ###
+        avg_pt = self.radar.find_average_point(True, detection_obj)
+
+        # print(detection_obj)
+        # print(avg_pt)
+
+        self.radar.window.push_history(avg_pt[0])
+
+        # trigger checking
+        self.prev_status = self.status
+        self.status = self.trigger.check()
+        if self.status:
+            if not self.prev_status:
+                print("\nGesture Start")
+                self.radar.window.start()
+                self.counter = len(self.radar.window)
+
+        if self.status and self.counter < self.radar.WINDOW_SIZE:
+            self.radar.sliding_window(avg_pt)
+            self.counter += 1
+            print(f'''Record frame {self.counter}, data: {avg_pt}''')
+
+        if self.status and self.counter == self.radar.WINDOW_SIZE:
+            print("Gesture End\n")
+            # hand a copy of the window to the storage stage, acquisition continues meanwhile
+            gesture = [self.radar.window_buffer.copy()]
+            # reset
+            self.counter = 0
+            self.trigger.reset()
+            self.status = False
+            self.radar.window.reset()
+
+        if not self.status:
+            self.trigger.push(avg_pt[0][5])
+
+        return gesture
+
+
+def main():
+    """ Start the radar, the processing pipeline and the GUIs """
+    # Initialize classes
+    utils = Utils()
+    radar = Radar()
+    gui = GUI()
+    heatmap = HEATMAP(mode=HEATMAP_MODE)
+
+    # Render workers are spawned, not forked: they are created from the storage thread while the reader,
+    # pipeline and Qt threads run, and a forked child could inherit a lock held by one of them
+    render_pool = ProcessPoolExecutor(
+        max_workers=RENDER_WORKERS, initializer=render_worker_initializer,
+        mp_context=multiprocessing.get_context('spawn'))
+
+    RADAR_CLI_PORT, RADAR_DATA_PORT, RADAR_CONFIG_FILE_PATH, DATA_STORAGE_FILE_PATH, DATA_STORAGE_FILE_NAME, IMAGE_STORAGE_FILE_PATH = utils.get_radar_env()
+    RADAR_CAPTURE_FILE_DIR, RADAR_REPLAY_FILE_PATH, RADAR_REPLAY_SPEED = utils.get_capture_env()
+    if utils.get_storage_env() == 'store':
+        radar.open_gesture_store(DATA_STORAGE_FILE_PATH, DATA_STORAGE_FILE_NAME, IMAGE_STORAGE_FILE_PATH)
+    if RADAR_REPLAY_FILE_PATH:
+        # Replay a recorded data-port stream, no board needed
+        cli_serial, data_serial = radar.start_replay(
+            RADAR_REPLAY_FILE_PATH, RADAR_CONFIG_FILE_PATH, RADAR_REPLAY_SPEED)
+    else:
+        cli_serial, data_serial = radar.start(
+            RADAR_CLI_PORT, RADAR_DATA_PORT, RADAR_CONFIG_FILE_PATH, capture_file_dir=RADAR_CAPTURE_FILE_DIR)
+    # Blocking reader stage, wakes up as soon as bytes arrive instead of polling in_waiting
+    serial_reader = SerialReader(
+        data_serial, radar.radar_parameters["frame_periodicity"])
+    serial_reader.start()
+    gui.configure(radar.radar_parameters)
+    heatmap.configure(radar.radar_parameters)
+
+    RADAR_POSITION_X, RADAR_POSITION_Y, RADAR_POSITION_Z, GRID_SIZE = utils.get_gui_env()
+
+    def parse_chunk(read_buffer):
+        """ Parsing stage: every complete frame in the newly read bytes """
+        return list(radar.iter_chunk_frames(read_buffer, MAX_FRAME_BACKLOG))
+
+    def save_gesture(window):
+        """ Storage stage: interpolate and save the gesture, render its images in the process pool """
+        radar.data_to_numpy(DATA_STORAGE_FILE_PATH, DATA_STORAGE_FILE_NAME,
+                            IMAGE_STORAGE_FILE_PATH, window, render_pool)
+
+    # reader -> parse -> segment -> storage, each stage in its own thread with a bounded queue
+    segmenter = GestureSegmenter(radar)
+    pipeline = Pipeline(serial_reader.chunks)
+    pipeline.add_stage('parse', parse_chunk)
+    pipeline.add_stage('segment', segmenter.process)
+    # gestures are rare and must not be lost, the segment stage waits when storage falls behind
+    pipeline.add_stage('storage', save_gesture, lossless=True)
+    # the GUIs get every parsed frame from the parse stage, each frame is parsed once for all views
+    if POINT_CLOUD_GUI:
+        pipeline.subscribe('parse', gui.store_points)
+    if HEATMAP_GUI:
+        pipeline.subscribe('parse', heatmap.store_frame)
+    try:
+        pipeline.start(PIPELINE_METRICS_INTERVAL)
+
+        if POINT_CLOUD_GUI or HEATMAP_GUI:
+            dashboard = Dashboard()
+            if POINT_CLOUD_GUI:
+                dashboard.add_view('Point Cloud', gui.build_widget(
+                    RADAR_POSITION_X, RADAR_POSITION_Y, RADAR_POSITION_Z, GRID_SIZE))
+            if HEATMAP_GUI:
+                dashboard.add_view('Heatmap', heatmap.build_widget())
+            dashboard.run()
+        else:
+            pipeline.join()
+    finally:
+        # stop reading before the port is closed, and storing before the pool and the store go away
+        serial_reader.stop()
+        serial_reader.join()
+        pipeline.stop()
+        pipeline.join()
+        # closing a RecordingSerial flushes the end of the capture file
+        data_serial.close()
+        if cli_serial is not None:
+            cli_serial.close()
+        render_pool.shutdown(wait=True)
+        if radar.gesture_store is not None:
+            radar.gesture_store.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+""" module animation """
+import os
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from PIL import Image
+
+# elev, azim of the review views: a front (up/down, left/right), b top (left/right, near/far),
+# c side (up/down, near/far)
+VIEWS = {'a': (10, -90), 'b': (80, -90), 'c': (5, -150)}
+# Axis limits of the point cloud plots, x is drawn mirrored
+X_LIMITS = (0.6, -0.6)
+Y_LIMITS = (0.6, 0)
+Z_LIMITS = (-0.6, 0.6)
+# matplotlib's default 3D box aspect
+BOX_ASPECT = np.array([4, 4, 3]) / 4
+BACKGROUND_COLOR = (255, 255, 255)
+BOX_COLOR = (190, 190, 190)
+TEXT_COLOR = (60, 60, 60)
+# Unit cube corners and the 12 edges between them
+CUBE_CORNERS = np.array([[x, y, z] for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)], dtype=float)
+CUBE_EDGES = [(a, b) for a in range(8) for b in range(a + 1, 8) if bin(a ^ b).count('1') == 1]
+SHIFT_BITS = 4
+
+
+def normalize(points):
+    """ Map x, y, z inside the axis limits to the box [-1, 1] scaled by BOX_ASPECT """
+    limits = np.array([X_LIMITS, Y_LIMITS, Z_LIMITS], dtype=float)
+    centre = limits.mean(axis=1)
+    half_span = (limits[:, 1] - limits[:, 0]) / 2
+    return (points - centre) / half_span * BOX_ASPECT
+
+
+def view_basis(elev, azim):
+    """ Screen right, screen up and towards-viewer unit vectors of an (elev, azim) view in degrees """
+    elev, azim = np.radians(elev), np.radians(azim)
+    right = np.array([-np.sin(azim), np.cos(azim), 0])
+    up = np.array([-np.sin(elev) * np.cos(azim), -np.sin(elev) * np.sin(azim), np.cos(elev)])
+    towards = np.array([np.cos(elev) * np.cos(azim), np.cos(elev) * np.sin(azim), np.sin(elev)])
+    return np.stack((right, up, towards), axis=1)
+
+
+def project(points, view, size):
+    """ Orthographic projection of normalized points to (column, row) pixels of a size x size image
+    and their depth, larger is closer to the viewer """
+    projected = points @ view_basis(*VIEWS[view])
+    # the box diagonal always fits, so every view shares one scale
+    scale = size / 2 / (np.linalg.norm(BOX_ASPECT) * 1.05)
+    pixels = np.empty((len(points), 2))
+    pixels[:, 0] = size / 2 + projected[:, 0] * scale
+    pixels[:, 1] = size / 2 - projected[:, 1] * scale
+    return pixels, projected[:, 2]
+
+
+def plasma_colors(num_points):
+    """ RGB plasma colours from dark (first) to bright (last) """
+    if num_points == 0:
+        return np.zeros((0, 3), dtype=np.uint8)
+    levels = np.linspace(0, 255, num_points).astype(np.uint8).reshape(-1, 1)
+    return cv2.applyColorMap(levels, cv2.COLORMAP_PLASMA).reshape(-1, 3)[:, ::-1]
+
+
+class PointCloudAnimator:
+    """ Class: PointCloudAnimator
+
+    Draws gesture point-cloud animations straight into RGB arrays. The points of every view are
+    projected once per gesture; each frame then only redraws the points detected so far (frames with
+    snr != 0), oldest dark to newest bright in plasma colours, on a pre-drawn axis box. Several views
+    are tiled side by side. Frames are encoded in one go to GIF (Pillow) or MP4 (OpenCV).
+    """
+
+    def __init__(self, views=('a',), size=400, point_radius=5, interval=40):
+        self.views = views
+        self.size = size
+        self.point_radius = point_radius
+        self.interval = interval
+        self.backgrounds = [self.draw_background(view) for view in views]
+
+    def draw_background(self, view):
+        """ Empty frame of one view with the axis box """
+        image = np.full((self.size, self.size, 3), BACKGROUND_COLOR, dtype=np.uint8)
+        corners, _ = project(CUBE_CORNERS * BOX_ASPECT, view, self.size)
+        corners = np.round(corners * (1 << SHIFT_BITS)).astype(np.int32)
+        for start, end in CUBE_EDGES:
+            cv2.line(image, tuple(corners[start]), tuple(corners[end]), BOX_COLOR, 1, cv2.LINE_AA, SHIFT_BITS)
+        cv2.putText(image, view, (8, 22), cv2.FONT_HERSHEY_SIMPLEX, 0.6, TEXT_COLOR, 1, cv2.LINE_AA)
+        return image
+
+    def frames(self, gesture, title=None):
+        """ (frames, size, size * views, 3) uint8 RGB animation of one gesture """
+        gesture = np.asarray(gesture)
+        detected = np.flatnonzero(gesture[:, 5] != 0)
+        points = normalize(gesture[detected, :3])
+        num_frames = len(gesture)
+        width = self.size * len(self.views)
+        frames = np.empty((num_frames, self.size, width, 3), dtype=np.uint8)
+
+        for view_index, view in enumerate(self.views):
+            pixels, depth = project(points, view, self.size)
+            pixels = np.round(pixels * (1 << SHIFT_BITS)).astype(np.int32)
+            tile = slice(view_index * self.size, (view_index + 1) * self.size)
+            for frame in range(num_frames):
+                image = frames[frame, :, tile]
+                image[:] = self.backgrounds[view_index]
+                num_points = np.searchsorted(detected, frame, side='right')
+                colors = plasma_colors(num_points)
+                # far points first so near ones are drawn on top
+                for index in np.argsort(depth[:num_points], kind='stable'):
+                    cv2.circle(image, tuple(pixels[index]), self.point_radius << SHIFT_BITS,
+                               tuple(int(c) for c in colors[index]), -1, cv2.LINE_AA, SHIFT_BITS)
+
+        if title:
+            for frame in frames:
+                cv2.putText(frame, title, (8, self.size - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.4, TEXT_COLOR, 1,
+                            cv2.LINE_AA)
+        return frames
+
+    def save(self, gesture, output_path, title=None):
+        """ Encode the animation of one gesture to .gif or .mp4, returns output_path """
+        frames = self.frames(gesture, title)
+        if len(frames) == 0:
+            frames = np.stack([np.hstack(self.backgrounds)])
+        if output_path.lower().endswith('.mp4'):
+            height, width = frames.shape[1:3]
+            writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), 1000 / self.interval,
+                                     (width, height))
+            for frame in frames:
+                writer.write(frame[:, :, ::-1])
+            writer.release()
+        else:
+            images = [Image.fromarray(frame) for frame in frames]
+            images[0].save(output_path, save_all=True, append_images=images[1:], duration=self.interval, loop=0)
+        return output_path
+
+
+def export_animation(npy_path, output_path, views=('a',), skip_empty=False, title=None, interval=40):
+    """ Pool job: animate one .npy gesture file, or a gesture array already loaded by the caller.
+
+    Passing the array lets the caller delete or move the file before the job runs.
+    skip_empty drops the frames without detections, so the animation only shows frames that add a point.
+    The file is written under a temporary name and renamed, so readers never see a partial file.
+    """
+    gesture = np.load(npy_path) if isinstance(npy_path, (str, os.PathLike)) else np.asarray(npy_path)
+    if skip_empty:
+        gesture = gesture[gesture[:, 5] != 0]
+    root, extension = os.path.splitext(output_path)
+    tmp_path = f'{root}.{os.getpid()}.tmp{extension}'
+    PointCloudAnimator(views, interval=interval).save(gesture, tmp_path, title)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+class AnimationExporter:
+    """ Class: AnimationExporter
+
+    Background process pool for export_animation, so interactive tools keep responding
+    while animations are encoded.
+    """
+
+    def __init__(self, workers=2):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(self, npy_path, output_path, views=('a',), skip_empty=False, title=None, interval=40):
+        """ Queue one export of a .npy path or a gesture array, returns its Future """
+        return self.pool.submit(export_animation, npy_path, output_path, views, skip_empty, title, interval)
+
+    def shutdown(self, wait=True):
+        """ Finish queued exports and stop the workers """
+        self.pool.shutdown(wait=wait)
@@ -0,0 +1,143 @@
+""" module capture """
+import bisect
+import os
+import struct
+import time
+
+# File layout: CAPTURE_MAGIC, start time (<d, epoch seconds), then one record per read:
+# seconds since start (<d), length (<I), raw data-port bytes
+CAPTURE_MAGIC = b'MMWCAP01'
+FILE_HEADER = struct.Struct('<d')
+RECORD_HEADER = struct.Struct('<dI')
+
+
+class RecordingSerial:
+    """ Class: RecordingSerial
+
+    Wraps the data port and tees every chunk that is read into a capture file.
+    Exposes the same read/in_waiting/timeout interface as serial.Serial.
+    """
+
+    def __init__(self, data_serial, capture_file_dir):
+        self.data_serial = data_serial
+        self.start_time = time.time()
+        self.start_counter = time.perf_counter()
+        file_name = time.strftime('capture_%Y%m%d_%H%M%S.bin', time.localtime(self.start_time))
+        self.capture_file_path = os.path.join(capture_file_dir, file_name)
+        self.capture_file = open(self.capture_file_path, 'wb')
+        self.capture_file.write(CAPTURE_MAGIC + FILE_HEADER.pack(self.start_time))
+        print(f'''[Info] Recording data port to {self.capture_file_path}''')
+
+    @property
+    def in_waiting(self):
+        """ in_waiting of the wrapped port """
+        return self.data_serial.in_waiting
+
+    @property
+    def timeout(self):
+        """ timeout of the wrapped port """
+        return self.data_serial.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.data_serial.timeout = value
+
+    def read(self, size=1):
+        """ Read from the wrapped port and append the bytes to the capture file """
+        data = self.data_serial.read(size)
+        if data:
+            self.capture_file.write(RECORD_HEADER.pack(
+                time.perf_counter() - self.start_counter, len(data)) + data)
+        return data
+
+    def close(self):
+        """ Close the capture file and the wrapped port """
+        self.capture_file.close()
+        self.data_serial.close()
+
+
+class ReplaySerial:
+    """ Class: ReplaySerial
+
+    Plays a capture file back through the serial.Serial read/in_waiting/timeout interface.
+    speed 1.0 replays in real time, 10.0 ten times faster, 0 as fast as the reader can consume.
+    The playback clock starts on the first read or in_waiting.
+    """
+
+    def __init__(self, capture_file_path, speed=1.0):
+        self.speed = speed
+        self.timeout = None
+        self.start_counter = None
+        self.position = 0
+        self.timestamps = []
+        self.record_ends = []
+        chunks = []
+
+        with open(capture_file_path, 'rb') as capture_file:
+            if capture_file.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+                raise ValueError(f'''{capture_file_path} is not a radar capture file''')
+            (self.capture_start_time,) = FILE_HEADER.unpack(capture_file.read(FILE_HEADER.size))
+            total_bytes = 0
+            while True:
+                header = capture_file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                timestamp, length = RECORD_HEADER.unpack(header)
+                chunk = capture_file.read(length)
+                total_bytes += len(chunk)
+                chunks.append(chunk)
+                self.timestamps.append(timestamp)
+                self.record_ends.append(total_bytes)
+
+        self.data = b''.join(chunks)
+        print(f'''[Info] Replaying {capture_file_path}: {len(self.timestamps)} reads, ''' +
+              f'''{len(self.data)} bytes, speed {speed if speed > 0 else 'max'}''')
+
+    @property
+    def eof(self):
+        """ True when every byte of the capture has been read """
+        return self.position >= len(self.data)
+
+    def playback_time(self):
+        """ Capture time reached by the playback clock """
+        if self.start_counter is None:
+            self.start_counter = time.perf_counter()
+        return (time.perf_counter() - self.start_counter) * self.speed
+
+    def available_end(self):
+        """ Number of capture bytes released by the playback clock """
+        if self.speed <= 0:
+            return len(self.data)
+        num_records = bisect.bisect_right(self.timestamps, self.playback_time())
+        return self.record_ends[num_records - 1] if num_records else 0
+
+    @property
+    def in_waiting(self):
+        """ Bytes that can be read without blocking """
+        return self.available_end() - self.position
+
+    def read(self, size=1):
+        """ Read up to size bytes, blocking until they are released or the timeout expires """
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        while self.in_waiting < size:
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                break
+            if self.available_end() == len(self.data):
+                # Nothing more will arrive, an exhausted capture behaves like an idle port
+                if self.eof and deadline is not None:
+                    time.sleep(deadline - now)
+                break
+            num_records = bisect.bisect_right(self.timestamps, self.playback_time())
+            wait = (self.timestamps[num_records] - self.playback_time()) / self.speed
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            time.sleep(max(wait, 0))
+
+        num_bytes = min(size, self.in_waiting)
+        data = self.data[self.position:self.position + num_bytes]
+        self.position += num_bytes
+        return data
+
+    def close(self):
+        """ Nothing to release, kept for serial.Serial compatibility """
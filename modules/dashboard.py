@@ -0,0 +1,36 @@
+''' Module: dashboard '''
+import sys
+from pyqtgraph.Qt import QtCore, QtWidgets
+
+
+class Dashboard():
+    ''' Class Dashboard
+
+    One Qt application and main window hosting several views as dock widgets, e.g. the
+    GUI point cloud and the HEATMAP side by side. Views come from their build_widget()
+    methods, which need the QApplication created here.
+    '''
+
+    def __init__(self, title='mmWave Radar'):
+        self.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+        self.window = QtWidgets.QMainWindow()
+        self.window.setWindowTitle(title)
+        self.docks = []
+        print('''[Info] Initialize Dashboard class ''')
+
+    def add_view(self, title, widget):
+        """ Dock a view, the first on the left and the following ones on the right """
+        dock = QtWidgets.QDockWidget(title, self.window)
+        dock.setWidget(widget)
+        area = QtCore.Qt.DockWidgetArea.LeftDockWidgetArea if not self.docks else \
+            QtCore.Qt.DockWidgetArea.RightDockWidgetArea
+        self.window.addDockWidget(area, dock)
+        self.docks.append(dock)
+        return dock
+
+    def run(self):
+        """ Show the window and run the Qt event loop """
+        self.window.resize(640 * max(len(self.docks), 1), 640)
+        self.window.show()
+        if sys.flags.interactive != 1:
+            self.app.exec()
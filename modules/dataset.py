@@ -0,0 +1,152 @@
+""" module dataset """
+import os
+import csv
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Cached per-file metadata, read from the .npy header instead of loading the data
+INDEX_FIELDS = [('num_rows', '<i8'), ('num_columns', '<i8'), ('mtime', '<f8'), ('size', '<i8')]
+
+
+def read_npy_shape(npy_path):
+    """ (shape, dtype) of a .npy file from its header only """
+    with open(npy_path, 'rb') as npy_file:
+        version = np.lib.format.read_magic(npy_file)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(npy_file)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(npy_file)
+    return shape, dtype
+
+
+class RadarDataset:
+    """ Class: RadarDataset
+
+    Gestures listed in a label CSV (rows of npy_path, label). The shape of every file is read
+    from its .npy header and cached next to the CSV together with its mtime and size; on the
+    next open only files whose mtime or size changed are read again. Gesture data is memory-mapped
+    on access, and batches are copied into one zero-padded (batch, frames, columns) tensor.
+    max_frames() and label_counts() are answered from the index without touching the data.
+    """
+
+    def __init__(self, label_csv, index_path=None, workers=4):
+        self.label_csv = label_csv
+        self.index_path = index_path or f'''{os.path.splitext(label_csv)[0]}.index.npy'''
+        self.workers = workers
+        self.paths = []
+        self.labels = []
+        with open(label_csv, 'r', newline='') as csv_file:
+            for row in csv.reader(csv_file):
+                if row:
+                    self.paths.append(row[0])
+                    self.labels.append(row[1])
+        self.index = self.build_index()
+        print(f'''[Info] Open RadarDataset {label_csv}: {len(self)} gestures''')
+
+    def load_index(self):
+        """ Cached records by path, empty when there is no usable cache """
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            cached = np.load(self.index_path)
+        except (OSError, ValueError):
+            print(f'''[Warning] Ignore unreadable dataset index {self.index_path}''')
+            return {}
+        return {str(path): record for path, record in zip(cached['path'], cached[[name for name, _ in INDEX_FIELDS]])}
+
+    def build_index(self):
+        """ Index of every file, re-reading only the headers of new or changed files """
+        cached = self.load_index()
+        index = np.zeros(len(self.paths), dtype=INDEX_FIELDS)
+        num_read = 0
+        for position, path in enumerate(self.paths):
+            stat = os.stat(path)
+            record = cached.get(path)
+            if record is not None and record['mtime'] == stat.st_mtime and record['size'] == stat.st_size:
+                index[position] = record
+                continue
+            shape, _ = read_npy_shape(path)
+            if len(shape) != 2:
+                raise ValueError(f'''{path}: gesture must be 2-D, got shape {shape}''')
+            index[position] = (shape[0], shape[1], stat.st_mtime, stat.st_size)
+            num_read += 1
+        if num_read or len(cached) != len(self.paths):
+            self.save_index(index)
+        return index
+
+    def save_index(self, index):
+        """ Write the index cache, renamed into place so a reader never sees a partial file """
+        width = max((len(path) for path in self.paths), default=1)
+        cached = np.zeros(len(index), dtype=[('path', f'''U{width}''')] + INDEX_FIELDS)
+        cached['path'] = self.paths
+        for name, _ in INDEX_FIELDS:
+            cached[name] = index[name]
+        tmp_path = f'''{self.index_path}.{os.getpid()}.tmp'''
+        with open(tmp_path, 'wb') as index_file:
+            np.save(index_file, cached)
+        os.replace(tmp_path, self.index_path)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, position):
+        return self.load(position), self.labels[position]
+
+    def load(self, position):
+        """ Rows of one gesture as a read-only memory map. Each map holds a file descriptor until it is
+        released, so do not keep one per gesture; load_batch() copies and releases them one by one """
+        return np.load(self.paths[position], mmap_mode='r')
+
+    def max_frames(self):
+        """ Largest number of frames of any gesture """
+        return int(self.index['num_rows'].max(initial=0))
+
+    def label_counts(self):
+        """ {label: number of gestures} """
+        labels, counts = np.unique(np.asarray(self.labels, dtype=str), return_counts=True)
+        return dict(zip(labels.tolist(), counts.tolist()))
+
+    def load_batch(self, positions, max_frames=None, out=None):
+        """ Copy gestures into one zero-padded (len(positions), max_frames, columns) float tensor.
+
+        max_frames defaults to the longest gesture of the batch, longer gestures are cut.
+        Returns (batch, lengths, labels); lengths are the frames copied per gesture.
+        """
+        positions = np.asarray(positions, dtype=int)
+        records = self.index[positions]
+        if max_frames is None:
+            max_frames = int(records['num_rows'].max(initial=0))
+        num_columns = int(records['num_columns'].max(initial=0))
+        shape = (len(positions), max_frames, num_columns)
+        if out is None:
+            out = np.zeros(shape)
+        elif out.shape != shape:
+            raise ValueError(f'''out must have shape {shape}, got {out.shape}''')
+        else:
+            out.fill(0)
+        lengths = np.minimum(records['num_rows'], max_frames)
+        for row, (position, length) in enumerate(zip(positions, lengths)):
+            data = self.load(position)
+            out[row, :length, :data.shape[1]] = data[:length]
+        return out, lengths, [self.labels[position] for position in positions]
+
+    def batches(self, batch_size, max_frames=None, shuffle=False, seed=None, prefetch=2):
+        """ Yield load_batch() results over the whole dataset, loading the next batches in threads.
+
+        max_frames defaults to the longest gesture of the dataset so every batch has the same shape.
+        """
+        order = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        if max_frames is None:
+            max_frames = self.max_frames()
+        chunks = (order[start:start + batch_size] for start in range(0, len(order), batch_size))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            queue = deque()
+            for chunk in chunks:
+                queue.append(pool.submit(self.load_batch, chunk, max_frames))
+                if len(queue) > prefetch:
+                    yield queue.popleft().result()
+            while queue:
+                yield queue.popleft().result()
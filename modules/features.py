@@ -0,0 +1,72 @@
+""" module features """
+import time
+import numpy as np
+
+# Per-frame average point, same column order as the (1, 9) rows stored in gesture windows
+AVERAGE_POINT_FIELDS = ('x', 'y', 'z', 'doppler', 'range', 'snr', 'azimuth', 'elevation', 'time')
+# Optional aggregates, appended after the average point
+EXTRA_FIELDS = ('num_points', 'weighted_x', 'weighted_y', 'weighted_z', 'spread_x', 'spread_y', 'spread_z',
+                'min_x', 'min_y', 'min_z', 'max_x', 'max_y', 'max_z', 'max_doppler')
+
+# Detection object keys feeding the average point columns, in order
+DETECTION_COLUMNS = ('x', 'y', 'z', 'doppler', 'range', 'snr', 'azimuth', 'elevation')
+NUM_COLUMNS = len(DETECTION_COLUMNS)
+
+
+class FeatureExtractor:
+    """ Class: FeatureExtractor
+
+    Per-frame aggregates of the points with non-zero Doppler, computed directly on the parser's
+    arrays. The columns (and their squares, for the spread) are copied into a reused scratch matrix
+    and summed with one masked matrix product. Results are written into one preallocated structured
+    row that is overwritten every frame.
+    """
+
+    def __init__(self, extras=False, capacity=64):
+        self.extras = extras
+        fields = AVERAGE_POINT_FIELDS + (EXTRA_FIELDS if extras else ())
+        self.dtype = np.dtype([(name, 'f8') for name in fields])
+        self.row = np.zeros(1, dtype=self.dtype)
+        # (1, 9) float view of the average point fields, shares memory with self.row
+        self.average_point = self.row.view('f8').reshape(1, len(fields))[:, :len(AVERAGE_POINT_FIELDS)]
+        self.values = self.row.view('f8').reshape(len(fields))
+        self.scratch = np.empty((capacity, NUM_COLUMNS + 3))
+
+    def extract(self, detection_obj, timestamp=None):
+        """ Fill self.row from one detection object and return it, all zero when no point moves """
+        doppler = np.asarray(detection_obj["doppler"])
+        num_objects = len(doppler)
+        if num_objects > len(self.scratch):
+            self.scratch = np.empty((max(num_objects, 2 * len(self.scratch)), NUM_COLUMNS + 3))
+        columns = self.scratch[:num_objects]
+        for index, key in enumerate(DETECTION_COLUMNS):
+            columns[:, index] = detection_obj[key]
+        np.square(columns[:, :3], out=columns[:, NUM_COLUMNS:])
+
+        mask = doppler != 0
+        num_points = np.count_nonzero(mask)
+        self.values[:] = 0
+        if num_points == 0:
+            return self.row
+
+        sums = mask.astype('f8') @ columns
+        means = sums / num_points
+        self.values[:NUM_COLUMNS] = means[:NUM_COLUMNS]
+        self.values[NUM_COLUMNS] = time.time() if timestamp is None else timestamp
+
+        if self.extras:
+            moving = columns[mask]
+            row = self.row[0]
+            row['num_points'] = num_points
+            snr = moving[:, 5]
+            snr_total = snr.sum()
+            if snr_total > 0:
+                row['weighted_x'], row['weighted_y'], row['weighted_z'] = snr @ moving[:, :3] / snr_total
+            else:
+                row['weighted_x'], row['weighted_y'], row['weighted_z'] = means[:3]
+            variance = np.maximum(means[NUM_COLUMNS:] - means[:3] ** 2, 0)
+            row['spread_x'], row['spread_y'], row['spread_z'] = np.sqrt(variance)
+            row['min_x'], row['min_y'], row['min_z'] = moving[:, :3].min(axis=0)
+            row['max_x'], row['max_y'], row['max_z'] = moving[:, :3].max(axis=0)
+            row['max_doppler'] = np.abs(moving[:, 3]).max()
+        return self.row
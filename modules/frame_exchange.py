@@ -0,0 +1,94 @@
+""" module frame_exchange """
+import threading
+import numpy as np
+
+# Fastest GUI refresh in ms, about one 60 Hz display frame
+MIN_REFRESH_INTERVAL = 16
+
+
+def refresh_interval(frame_periodicity, min_interval=MIN_REFRESH_INTERVAL):
+    """ GUI timer interval in ms for a radar frame periodicity in ms: one redraw per radar frame,
+    never faster than min_interval """
+    return max(int(round(frame_periodicity)), min_interval)
+
+
+class FrameExchange:
+    """ Class: FrameExchange
+
+    Latest-frame handoff from a producer thread (radar) to a consumer (Qt timer) through three
+    fixed buffers allocated once: the producer fills the back buffer, the newest published frame
+    waits in the middle one, and the consumer owns the front one. The lock only guards the swap of
+    two buffer indices, never a copy, so neither side waits for the other's work, and the consumer
+    never sees a half-written array.
+
+    Frames may have fewer rows than the buffers (e.g. a varying number of points); rows beyond
+    the capacity are dropped and counted in truncated. Every published frame gets the next
+    sequence number; read() returns None when nothing new arrived since the last read, so the
+    consumer can skip its redraw.
+    """
+
+    def __init__(self, shape, dtype):
+        self.buffers = [np.zeros(shape, dtype=dtype) for _ in range(3)]
+        self.lengths = [shape[0]] * 3
+        self.back, self.middle, self.front = 0, 1, 2
+        self.lock = threading.Lock()
+        # sequence number of the frame in the middle buffer, 0 before the first write
+        self.sequence = 0
+        self.read_sequence = 0
+        self.rejected = 0
+        self.truncated = 0
+        self.dropped = 0
+
+    @property
+    def shape(self):
+        return self.buffers[0].shape
+
+    def write(self, frame):
+        """ Publish one frame, returns False (and counts it) when its columns do not match """
+        frame = np.asarray(frame)
+        if frame.ndim != len(self.shape) or frame.shape[1:] != self.shape[1:]:
+            self.rejected += 1
+            return False
+        length = self.fit(len(frame))
+        # the back buffer belongs to the producer, no lock needed while copying
+        np.copyto(self.buffers[self.back][:length], frame[:length], casting='unsafe')
+        self.publish(length)
+        return True
+
+    def write_columns(self, columns):
+        """ Publish a 2-D frame given as one 1-D array per column, without stacking them first """
+        if len(columns) != self.shape[1]:
+            self.rejected += 1
+            return False
+        length = self.fit(min(len(column) for column in columns))
+        back = self.buffers[self.back]
+        for index, column in enumerate(columns):
+            np.copyto(back[:length, index], column[:length], casting='unsafe')
+        self.publish(length)
+        return True
+
+    def fit(self, length):
+        """ Rows of a frame that fit into a buffer """
+        if length > self.shape[0]:
+            self.truncated += 1
+        return min(length, self.shape[0])
+
+    def publish(self, length):
+        """ Swap the filled back buffer with the middle one """
+        self.lengths[self.back] = length
+        with self.lock:
+            if self.sequence != self.read_sequence:
+                # the previous frame was never read
+                self.dropped += 1
+            self.back, self.middle = self.middle, self.back
+            self.sequence += 1
+
+    def read(self):
+        """ The newest frame as a view of the front buffer, or None when there is no new frame.
+        The view stays valid until the next read(). """
+        with self.lock:
+            if self.sequence == self.read_sequence:
+                return None
+            self.front, self.middle = self.middle, self.front
+            self.read_sequence = self.sequence
+        return self.buffers[self.front][:self.lengths[self.front]]
@@ -0,0 +1,224 @@
+""" module frame_sync """
+
+from modules.parser_module.data_parser import MAGIC_WORD
+
+HEADER_NUM_BYTES = 40
+
+
+class FrameSynchronizer:
+    """ Class: FrameSynchronizer
+
+    Circular byte buffer that cuts the UART stream into mmw demo output packets.
+    The magic word search resumes where the previous call stopped, so every byte is
+    scanned once and each call costs O(new bytes) instead of O(buffer size).
+    """
+
+    def __init__(self, capacity=2**15):
+        self.capacity = capacity
+        self.ring = bytearray(capacity)
+        self.ring_view = memoryview(self.ring)
+        # Frames that wrap around the end of the ring are linearized here
+        self.scratch = bytearray(capacity)
+        self.scratch_view = memoryview(self.scratch)
+        # Absolute stream positions, the ring index is position % capacity
+        self.read_pos = 0
+        self.write_pos = 0
+        self.scan_pos = 0
+        # True when read_pos sits on a verified magic word
+        self.synced = False
+        self.lost_sync = False
+        # Counters
+        self.bytes_received = 0
+        self.bytes_overflowed = 0
+        self.bytes_discarded = 0
+        self.overflow_count = 0
+        self.resync_count = 0
+        self.bad_length_count = 0
+        self.truncated_count = 0
+        self.frame_count = 0
+        self.frames_dropped = 0
+
+    @property
+    def buffered(self):
+        """ Number of bytes waiting in the ring """
+        return self.write_pos - self.read_pos
+
+    def feed(self, data):
+        """ Append newly read UART bytes.
+
+        When the ring is full the oldest bytes are dropped, counted in bytes_overflowed
+        and the synchronizer searches for the next magic word again.
+        Memoryviews returned by next_frame() are only valid until the next feed().
+        """
+        data = memoryview(data)
+        num_bytes = len(data)
+        if num_bytes == 0:
+            return
+        self.bytes_received += num_bytes
+
+        if num_bytes > self.capacity:
+            # Everything buffered is older than the part of data that fits
+            skipped = num_bytes - self.capacity
+            self.drop_oldest(self.buffered)
+            self.bytes_overflowed += skipped
+            self.write_pos += skipped
+            self.read_pos = self.scan_pos = self.write_pos
+            data = data[skipped:]
+            num_bytes = self.capacity
+        elif num_bytes > self.capacity - self.buffered:
+            self.drop_oldest(num_bytes - (self.capacity - self.buffered))
+
+        index = self.write_pos % self.capacity
+        first = min(num_bytes, self.capacity - index)
+        self.ring_view[index:index + first] = data[:first]
+        if first < num_bytes:
+            self.ring_view[:num_bytes - first] = data[first:]
+        self.write_pos += num_bytes
+
+    def drop_oldest(self, num_bytes):
+        """ Drop num_bytes from the head of the ring because of an overflow """
+        self.overflow_count += 1
+        self.bytes_overflowed += num_bytes
+        self.read_pos = min(self.read_pos + num_bytes, self.write_pos)
+        self.scan_pos = max(self.scan_pos, self.read_pos)
+        self.synced = False
+        self.lost_sync = True
+
+    def next_frame(self):
+        """ Return the next complete packet as a memoryview, or None if no complete packet is buffered """
+        while True:
+            if not self.synced and not self.find_magic():
+                return None
+            if self.buffered < 16:
+                return None
+
+            total_packet_len = int.from_bytes(self.peek(self.read_pos + 12, 4), 'little')
+            if total_packet_len < HEADER_NUM_BYTES or total_packet_len > self.capacity:
+                # Corrupted header, skip this magic word and search for the next one
+                self.bad_length_count += 1
+                self.discard(len(MAGIC_WORD))
+                continue
+            if self.buffered < total_packet_len:
+                return None
+            next_magic_pos = self.search(self.read_pos + len(MAGIC_WORD), self.read_pos + total_packet_len)
+            if next_magic_pos >= 0:
+                # Truncated packet, the next packet starts inside it
+                self.truncated_count += 1
+                self.discard(next_magic_pos - self.read_pos)
+                continue
+
+            frame = self.slice(self.read_pos, total_packet_len)
+            self.read_pos += total_packet_len
+            self.scan_pos = self.read_pos
+            self.synced = False
+            self.frame_count += 1
+            return frame
+
+    def frames(self):
+        """ Yield every complete packet currently buffered """
+        frame = self.next_frame()
+        while frame is not None:
+            yield frame
+            frame = self.next_frame()
+
+    def drop_stale(self, keep):
+        """ Drop the oldest complete packets so that at most keep of them stay buffered.
+
+        Packets are walked by their header length only, nothing is decoded.
+        Returns the number of dropped packets.
+        """
+        if not self.synced and not self.find_magic():
+            return 0
+
+        packet_starts = []
+        position = self.read_pos
+        while self.write_pos - position >= 16 and self.peek(position, len(MAGIC_WORD)) == MAGIC_WORD:
+            total_packet_len = int.from_bytes(self.peek(position + 12, 4), 'little')
+            if total_packet_len < HEADER_NUM_BYTES or self.write_pos - position < total_packet_len:
+                break
+            packet_starts.append(position)
+            position += total_packet_len
+
+        num_dropped = len(packet_starts) - keep
+        if num_dropped <= 0:
+            return 0
+        self.read_pos = self.scan_pos = packet_starts[num_dropped]
+        self.frames_dropped += num_dropped
+        return num_dropped
+
+    def find_magic(self):
+        """ Search for the magic word from scan_pos and move read_pos onto it """
+        start = max(self.scan_pos, self.read_pos)
+        magic_pos = self.search(start, self.write_pos)
+
+        if magic_pos < 0:
+            # Only the last 7 bytes can still be the beginning of a magic word
+            self.scan_pos = max(self.read_pos, self.write_pos - len(MAGIC_WORD) + 1)
+            if self.scan_pos > self.read_pos:
+                self.discard(self.scan_pos - self.read_pos)
+            return False
+
+        if magic_pos > self.read_pos:
+            self.discard(magic_pos - self.read_pos)
+        if self.lost_sync:
+            self.resync_count += 1
+            self.lost_sync = False
+        self.scan_pos = magic_pos
+        self.synced = True
+        return True
+
+    def discard(self, num_bytes):
+        """ Skip num_bytes of data that does not belong to a packet """
+        self.bytes_discarded += num_bytes
+        self.read_pos += num_bytes
+        self.scan_pos = max(self.scan_pos, self.read_pos)
+        self.synced = False
+        self.lost_sync = True
+
+    def search(self, start, end):
+        """ Return the absolute position of the first magic word inside [start, end), or -1 """
+        if end - start < len(MAGIC_WORD):
+            return -1
+        index = start % self.capacity
+        stop = index + end - start
+        if stop <= self.capacity:
+            found = self.ring.find(MAGIC_WORD, index, stop)
+            return -1 if found < 0 else start + found - index
+
+        found = self.ring.find(MAGIC_WORD, index, self.capacity)
+        if found >= 0:
+            return start + found - index
+        # Magic word split across the end of the ring
+        seam_start = max(index, self.capacity - len(MAGIC_WORD) + 1)
+        seam = self.ring[seam_start:] + self.ring[:min(len(MAGIC_WORD) - 1, stop - self.capacity)]
+        found = seam.find(MAGIC_WORD)
+        if found >= 0:
+            return start + seam_start - index + found
+        found = self.ring.find(MAGIC_WORD, 0, stop - self.capacity)
+        return -1 if found < 0 else start + self.capacity - index + found
+
+    def peek(self, position, num_bytes):
+        """ Copy num_bytes starting at an absolute position """
+        index = position % self.capacity
+        if index + num_bytes <= self.capacity:
+            return bytes(self.ring_view[index:index + num_bytes])
+        return bytes(self.ring_view[index:]) + bytes(self.ring_view[:index + num_bytes - self.capacity])
+
+    def slice(self, position, num_bytes):
+        """ Return num_bytes starting at an absolute position as a memoryview """
+        index = position % self.capacity
+        if index + num_bytes <= self.capacity:
+            return self.ring_view[index:index + num_bytes]
+        first = self.capacity - index
+        self.scratch_view[:first] = self.ring_view[index:]
+        self.scratch_view[first:num_bytes] = self.ring_view[:num_bytes - first]
+        return self.scratch_view[:num_bytes]
+
+    def stats(self):
+        """ Synchronizer counters """
+        return {"bytes_received": self.bytes_received, "bytes_buffered": self.buffered,
+                "bytes_overflowed": self.bytes_overflowed, "bytes_discarded": self.bytes_discarded,
+                "overflow_count": self.overflow_count, "resync_count": self.resync_count,
+                "bad_length_count": self.bad_length_count, "truncated_count": self.truncated_count,
+                "frame_count": self.frame_count,
+                "frames_dropped": self.frames_dropped}
@@ -0,0 +1,188 @@
+""" module gesture_store """
+import os
+import re
+import time
+import numpy as np
+
+DATA_FILE_NAME = 'gestures.dat'
+INDEX_FILE_NAME = 'gestures.idx'
+# One fixed-size record per gesture, in id order. Rows are little-endian float64 in the data file.
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('num_rows', '<u4'), ('num_columns', '<u4'),
+                        ('timestamp', '<f8'), ('label', '<i4'), ('deleted', 'u1'), ('reserved', 'u1', (3,))])
+DELETED_FIELD_OFFSET = INDEX_DTYPE.fields['deleted'][1]
+
+
+class GestureStore:
+    """ Class: GestureStore
+
+    Append-only gesture dataset in one directory: every gesture's rows go to the end of a single
+    data file, and a fixed-size record (offset, shape, timestamp, label, tombstone) to an index file.
+    The gesture id is the record number, so appends and lookups are O(1) and no directory is scanned.
+    Reads go through a memory map of the data file. Files are fsynced every sync_every appends
+    and on flush()/close(); after a crash, records without complete data are dropped on open.
+    """
+
+    def __init__(self, store_dir, sync_every=16):
+        os.makedirs(store_dir, exist_ok=True)
+        self.store_dir = store_dir
+        self.sync_every = sync_every
+        self.data_path = os.path.join(store_dir, DATA_FILE_NAME)
+        self.index_path = os.path.join(store_dir, INDEX_FILE_NAME)
+        self.pending = 0
+        self.data_map = None
+
+        index = self.load_index()
+        self.count = len(index)
+        # records has spare capacity so appends do not reallocate every gesture
+        self.records = np.zeros(max(64, 2 * self.count), dtype=INDEX_DTYPE)
+        self.records[:self.count] = index
+        self.data_file = open(self.data_path, 'ab')
+        self.index_file = open(self.index_path, 'ab')
+        self.data_size = self.data_file.tell()
+        print(f'''[Info] Open GestureStore {store_dir}: {self.count} gestures''')
+
+    def load_index(self):
+        """ Read the index, dropping a torn last record and records whose data never reached the disk.
+
+        Only a torn tail after the last complete record is cut from the data file. Data without a
+        usable index cannot be split into gestures again, so the store refuses to open it.
+        """
+        data_size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        index_size = os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0
+        num_records = index_size // INDEX_DTYPE.itemsize
+        if num_records == 0 and data_size > 0:
+            raise ValueError(f'''{self.data_path} holds {data_size} bytes but {self.index_path} is missing or '''
+                             f'''empty, restore the index or move the data file away''')
+        index = np.fromfile(self.index_path, dtype=INDEX_DTYPE, count=num_records) if num_records else \
+            np.zeros(0, dtype=INDEX_DTYPE)
+        ends = index['offset'] + index['num_rows'].astype('u8') * index['num_columns'] * 8
+        complete = int(np.searchsorted(ends > data_size, True))
+        if complete * INDEX_DTYPE.itemsize != index_size:
+            print(f'''[Warning] GestureStore {self.store_dir}: dropping {num_records - complete} incomplete records''')
+            with open(self.index_path, 'r+b') as index_file:
+                index_file.truncate(complete * INDEX_DTYPE.itemsize)
+        # rows written after the last complete record are a torn append, cut them so offsets stay aligned
+        data_end = int(ends[complete - 1]) if complete else 0
+        if data_size > data_end:
+            print(f'''[Warning] GestureStore {self.store_dir}: dropping {data_size - data_end} bytes '''
+                  f'''written after the last complete record''')
+            with open(self.data_path, 'r+b') as data_file:
+                data_file.truncate(data_end)
+        return index[:complete]
+
+    @property
+    def index(self):
+        """ Index records of every gesture id, including deleted ones """
+        return self.records[:self.count]
+
+    def __len__(self):
+        return self.count
+
+    def append(self, window, timestamp=None, label=-1):
+        """ Store one gesture (num_rows x num_columns) and return its id """
+        window = np.ascontiguousarray(window, dtype='<f8')
+        if window.ndim != 2:
+            raise ValueError(f'''gesture must be 2-D, got shape {window.shape}''')
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record['offset'] = self.data_size
+        record['num_rows'], record['num_columns'] = window.shape
+        record['timestamp'] = time.time() if timestamp is None else timestamp
+        record['label'] = label
+
+        self.data_file.write(window.tobytes())
+        self.data_size += window.nbytes
+        return self.add_records(record)
+
+    def add_records(self, records):
+        """ Write index records after their data, returns the id of the first one """
+        self.index_file.write(records.tobytes())
+        first_id = self.count
+        if self.count + len(records) > len(self.records):
+            capacity = max(2 * len(self.records), self.count + len(records))
+            self.records = np.concatenate((self.records, np.zeros(capacity - len(self.records), dtype=INDEX_DTYPE)))
+        self.records[self.count:self.count + len(records)] = records
+        self.count += len(records)
+
+        self.pending += 1
+        if self.pending >= self.sync_every:
+            self.flush()
+        return first_id
+
+    def reserve_ids(self, next_id):
+        """ Make next_id the id of the next append by tombstoning the ids below it, e.g. the numbers
+        already used by legacy .npy files and images, so no new gesture reuses one of them """
+        if next_id <= self.count:
+            return
+        records = np.zeros(next_id - self.count, dtype=INDEX_DTYPE)
+        records['offset'] = self.data_size
+        records['timestamp'] = time.time()
+        records['label'] = -1
+        records['deleted'] = 1
+        self.add_records(records)
+
+    def flush(self):
+        """ Write buffered appends to disk, data before index so the index never points past the data """
+        for output_file in (self.data_file, self.index_file):
+            output_file.flush()
+            os.fsync(output_file.fileno())
+        self.pending = 0
+
+    def record(self, gesture_id):
+        """ Index record of a live gesture """
+        if not 0 <= gesture_id < self.count or self.index[gesture_id]['deleted']:
+            raise KeyError(f'''gesture {gesture_id} is not in {self.store_dir}''')
+        return self.index[gesture_id]
+
+    def get(self, gesture_id):
+        """ Rows of one gesture as a read-only view into the memory-mapped data file """
+        record = self.record(gesture_id)
+        num_values = int(record['num_rows']) * int(record['num_columns'])
+        if num_values == 0:
+            # nothing to map, and the data file may still be empty
+            return np.zeros((record['num_rows'], record['num_columns']), dtype='<f8')
+        start = int(record['offset']) // 8
+        if self.data_map is None or start + num_values > len(self.data_map):
+            # the gesture was appended after the file was mapped
+            self.data_file.flush()
+            self.data_map = np.memmap(self.data_path, dtype='<f8', mode='r')
+        return self.data_map[start:start + num_values].reshape(record['num_rows'], record['num_columns'])
+
+    def __getitem__(self, gesture_id):
+        return self.get(gesture_id)
+
+    def delete(self, gesture_id):
+        """ Tombstone a gesture; its id is never reused and its rows stay in the data file """
+        self.record(gesture_id)
+        self.index_file.flush()
+        with open(self.index_path, 'r+b') as index_file:
+            index_file.seek(gesture_id * INDEX_DTYPE.itemsize + DELETED_FIELD_OFFSET)
+            index_file.write(b'\x01')
+        self.records[gesture_id]['deleted'] = 1
+
+    def ids(self):
+        """ Ids of the gestures that are not deleted """
+        return np.flatnonzero(self.index['deleted'] == 0)
+
+    def __iter__(self):
+        for gesture_id in self.ids():
+            yield int(gesture_id), self.get(gesture_id)
+
+    def import_npy_dir(self, npy_file_dir, npy_file_name, label=-1):
+        """ Append the legacy {npy_file_name}_{number}.npy files in number order, returns {number: id}.
+        A file gets its number as id (skipped numbers are tombstoned) unless that id is already taken """
+        pattern = re.compile(rf'''^{re.escape(npy_file_name)}_(\d+)\.npy$''')
+        numbers = sorted(int(match.group(1)) for match in map(pattern.match, os.listdir(npy_file_dir)) if match)
+        ids = {}
+        for number in numbers:
+            self.reserve_ids(number)
+            npy_path = os.path.join(npy_file_dir, f'''{npy_file_name}_{number}.npy''')
+            ids[number] = self.append(np.load(npy_path), os.path.getmtime(npy_path), label)
+        self.flush()
+        return ids
+
+    def close(self):
+        """ Flush and close the store """
+        self.flush()
+        self.data_file.close()
+        self.index_file.close()
+        self.data_map = None
@@ -0,0 +1,60 @@
+""" module gesture_window """
+import numpy as np
+
+
+class GestureWindow:
+    """ Class: GestureWindow
+
+    Preallocated gesture window. Frames are written in place at a cursor, so recording
+    a gesture allocates nothing per frame. The last pre_trigger_size frames before the
+    trigger are kept in a small ring and copied to the front of the window on start().
+    """
+
+    def __init__(self, window_size=25, num_columns=9, pre_trigger_size=10):
+        self.window_size = window_size
+        self.pre_trigger_size = pre_trigger_size
+        self.buffer = np.zeros((window_size, num_columns))
+        self.cursor = 0
+        self.history = np.zeros((pre_trigger_size, num_columns))
+        # Total frames pushed into the history ring since the last reset
+        self.history_count = 0
+
+    def __len__(self):
+        return self.cursor
+
+    @property
+    def full(self):
+        """ True when window_size frames have been recorded """
+        return self.cursor >= self.window_size
+
+    def push_history(self, row):
+        """ Remember a frame seen before the trigger, the oldest one is overwritten """
+        if self.pre_trigger_size:
+            self.history[self.history_count % self.pre_trigger_size] = row
+            self.history_count += 1
+
+    def start(self):
+        """ Begin a gesture with the pre-trigger frames, oldest first """
+        num_rows = min(self.history_count, self.pre_trigger_size, self.window_size)
+        if num_rows:
+            first = self.history_count - num_rows
+            indices = np.arange(first, first + num_rows) % self.pre_trigger_size
+            self.buffer[:num_rows] = self.history[indices]
+        self.cursor = num_rows
+
+    def append(self, row):
+        """ Record one frame, returns False when the window is already full """
+        if self.cursor >= self.window_size:
+            return False
+        self.buffer[self.cursor] = row
+        self.cursor += 1
+        return True
+
+    def view(self):
+        """ Recorded frames without copying, only valid until the next reset or start """
+        return self.buffer[:self.cursor]
+
+    def reset(self):
+        """ Empty the window and the pre-trigger history """
+        self.cursor = 0
+        self.history_count = 0
@@ -4,33 +4,48 @@ from pyqtgraph.Qt import QtCore, QtGui, QtWidgets
 import pyqtgraph.opengl as gl
 import pyqtgraph as pg
 import numpy as np
+from modules.frame_exchange import FrameExchange, refresh_interval
+from modules.point_trail import PointTrail, FRAME_COLUMNS
 
 class GUI():
-    ''' Class GUI '''
+    ''' Class GUI
 
-    def __init__(self):
+    Raw point clouds are handed from the radar thread to the Qt timer through a FrameExchange.
+    The timer adds each new frame to a PointTrail of the last trail_frames frames and uploads
+    its preallocated position and colour arrays, only when a new frame arrived.
+    '''
+
+    def __init__(self, max_points=256, trail_frames=10, color_by='age'):
         self.point_cloud = None
-        self.point_data = np.array([[0.0 ,0.0 ,0.0]])
+        self.exchange = FrameExchange((max_points, len(FRAME_COLUMNS)), np.float32)
+        self.trail = PointTrail(trail_frames, max_points, color_by)
+        self.interval = 50
+        self.timer = None
         print('''[Info] Initialize GUI class ''')
 
     def start(self, radar_position_x, radar_position_y, radar_position_z, grid_size):
-        """ start """
+        """ start: the point cloud in its own window, see Dashboard to show it next to other views """
         # pylint: disable=W0612
-        app = QtWidgets.QApplication([])
+        app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+        gl_view = self.build_widget(radar_position_x, radar_position_y, radar_position_z, grid_size)
+        gl_view.show()
+        if sys.flags.interactive != 1:
+            if not hasattr(QtCore, 'PYQT_VERSION'):
+                QtWidgets.QApplication.instance().exec()
+
+    def build_widget(self, radar_position_x, radar_position_y, radar_position_z, grid_size):
+        """ 3D view of the point cloud with its redraw timer running, needs a QApplication """
         gl_view = gl.GLViewWidget()
         gl_view.setBackgroundColor(QtGui.QColor(0, 0, 0))
-        gl_view.show()
         self.radar_position_settings(
             gl_view, radar_position_x, radar_position_y, radar_position_z)
         self.grid_settings(gl_view, grid_size)
         self.coordinate_axis_settings(gl_view)
         self.view_angle_settings(gl_view)
         self.initialize_point_cloud(gl_view)
-        timer = QtCore.QTimer()
-        self.set_timer(timer)
-        if sys.flags.interactive != 1:
-            if not hasattr(QtCore, 'PYQT_VERSION'):
-                QtWidgets.QApplication.instance().exec()
+        self.timer = QtCore.QTimer()
+        self.set_timer(self.timer)
+        return gl_view
 
     def radar_position_settings(self, gl_view, radar_position_x, radar_position_y, radar_position_z):
         """ radar_position_settings """
@@ -96,20 +111,28 @@ class GUI():
 
     def initialize_point_cloud(self, gl_view):
         """ initialize_point_cloud """
-        self.point_cloud = gl.GLScatterPlotItem(pos=np.zeros((100, 3)), color=[
-                                           0, 255, 240, 255], size=10.0)
+        self.point_cloud = gl.GLScatterPlotItem(pos=self.trail.positions, color=self.trail.colors, size=10.0)
         gl_view.addItem(self.point_cloud)
 
     def update_point(self):
         """ update_point """
-        self.point_cloud.setData(pos=self.point_data)
+        frame = self.exchange.read()
+        if frame is not None:
+            self.trail.push(frame)
+            # same arrays every time, updated in place
+            self.point_cloud.setData(pos=self.trail.positions, color=self.trail.colors)
 
     def set_timer(self, timer):
         """ set_timer """
         timer.timeout.connect(self.update_point)
-        timer.start(50)
+        timer.start(self.interval)
+
+    def configure(self, radar_parameters):
+        """ Redraw once per radar frame, colour doppler over the radar's velocity range """
+        self.interval = refresh_interval(radar_parameters["frame_periodicity"])
+        max_velocity = radar_parameters["max_velocity"]
+        self.trail.value_ranges['doppler'] = (-max_velocity, max_velocity)
 
-    def store_point(self, point):
-        """ store_point """
-        self.point_data = point
-        # print(point)
+    def store_points(self, detection_obj):
+        """ Publish the raw point cloud of one parsed frame """
+        self.exchange.write_columns([detection_obj[column] for column in FRAME_COLUMNS])
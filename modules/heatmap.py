@@ -6,17 +6,49 @@ import pyqtgraph.opengl as gl
 import pyqtgraph as pg
 import numpy as np
 from colour import Color
+from modules.frame_exchange import FrameExchange, refresh_interval
+
+HEATMAP_MODES = ('points', 'matrix')
+# Matrix mode adaptive levels: per redraw, the level range follows a new extreme at once and
+# relaxes towards the current frame's min/max by this factor otherwise
+LEVEL_DECAY = 0.95
 
 class HEATMAP():
-    ''' Class GUI '''
+    ''' Class GUI
+
+    Range-Doppler heatmap, x is range in meters and y doppler in m/s.
+    mode 'points' bins the detected points into one preallocated (range bins, doppler bins) grid;
+    with decay > 0 the previous frames fade out instead of being cleared, so the display shows
+    persistence. mode 'matrix' shows the firmware's dense TLV type 5 matrix (guiMonitor
+    rangeDopplerHeatMap enabled, e.g. radar_config/heatmap.cfg), with fixed levels when given or
+    levels that track a decaying running min/max otherwise.
+    Both hand their frames from the radar thread to the Qt timer through a FrameExchange, and the
+    timer only redraws when a new frame arrived.
+    '''
 
-    def __init__(self):
+    def __init__(self, num_range_bins=32, num_doppler_bins=32, decay=0.0, value=1000, mode='points', levels=None):
+        if mode not in HEATMAP_MODES:
+            raise ValueError(f'''mode must be one of {HEATMAP_MODES}, got {mode!r}''')
         self.blue = Color('blue')
         self.red = Color('red')
         self.colors = self.blue.range_to(self.red, 256)
         self.colors_array = np.array([np.array(color.get_rgb()) * 255 for color in self.colors])
         self.look_up_table = self.colors_array.astype(np.uint8)
-        self.data = np.zeros((32, 256))
+        self.decay = decay
+        self.value = value
+        self.data = np.zeros((num_range_bins, num_doppler_bins))
+        # range -2..2 m and doppler -2..2 m/s until configure() is called
+        self.range_limits = (-2.0, 2.0)
+        self.doppler_limits = (-2.0, 2.0)
+        self.mode = mode
+        # matrix mode: fixed (min, max) color levels, adaptive when None
+        self.levels = levels
+        self.adaptive_levels = None
+        self.exchange = FrameExchange(self.data.shape, self.data.dtype)
+        # x, y, width, height of the image in meters and m/s
+        self.rect = None
+        self.interval = 100
+        self.timer = None
         self.range = None
         # self.dopplerAry = None
         self.doppler = None
@@ -24,44 +56,120 @@ class HEATMAP():
         print('''[Info] Initialize HEATMAP class ''')
 
     def start(self):
-        """ start """
-        app = QtWidgets.QApplication([])
+        """ start: the heatmap in its own window, see Dashboard to show it next to other views """
+        app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+        window = self.build_widget()
+        window.show()
+        
+        if sys.flags.interactive != 1:
+            if not hasattr(QtCore, 'PYQT_VERSION'):
+                QtWidgets.QApplication.instance().exec()
+
+    def build_widget(self):
+        """ Heatmap plot with its redraw timer running, needs a QApplication """
         window = pg.GraphicsLayoutWidget()
-        self.image = pg.ImageItem()
+        if self.mode == 'matrix':
+            # rangeDoppler rows are doppler bins, columns range bins
+            self.image = pg.ImageItem(axisOrder='row-major')
+        else:
+            self.image = pg.ImageItem()
         self.image.setLookupTable(self.look_up_table)  # Add
-        self.image.setImage(self.data)
+        self.image.setImage(self.exchange.buffers[self.exchange.front])
+        if self.rect is None:
+            self.rect = (self.range_limits[0], self.doppler_limits[0], self.range_limits[1] - self.range_limits[0],
+                         self.doppler_limits[1] - self.doppler_limits[0])
+        self.image.setRect(QtCore.QRectF(*self.rect))
         view_box = pg.ViewBox()
         view_box.addItem(self.image)
         plot = pg.PlotItem(viewBox=view_box)
+        plot.setLabel('bottom', 'Range', units='m')
+        plot.setLabel('left', 'Doppler', units='m/s')
         # plot.setYRange()
         plot.showGrid(x=True, y=True, alpha=1)
         window.enableMouse(False)
         window.addItem(plot)
-        
-        timer = QtCore.QTimer()
-        self.setTimer(timer)
-        window.show()
-        
-        if sys.flags.interactive != 1:
-            if not hasattr(QtCore, 'PYQT_VERSION'):
-                QtWidgets.QApplication.instance().exec()
+
+        self.timer = QtCore.QTimer()
+        self.setTimer(self.timer)
+        return window
 
 
     def update(self):
-        # self.data = self.dopplerAry
-        self.image.setImage(self.data) #test with updateImage
-        #print doppler array
-        # print(self.data)
+        # only redraw when the radar thread published a new frame
+        data = self.exchange.read()
+        if data is None:
+            return
+        if self.mode == 'matrix':
+            levels = self.levels if self.levels is not None else self.update_levels(data)
+            # the front buffer stays untouched until the next read, no copy needed
+            self.image.setImage(data, autoLevels=False, levels=levels)
+        else:
+            self.image.setImage(data)
+
+    def update_levels(self, data):
+        """ Running (min, max) levels: a new extreme is taken at once, otherwise they relax towards
+        the frame's range, so a change of scene or gain neither saturates nor blacks out the image """
+        frame_min, frame_max = float(data.min()), float(data.max())
+        if self.adaptive_levels is None:
+            low, high = frame_min, frame_max
+        else:
+            low, high = self.adaptive_levels
+            low = min(frame_min, low * LEVEL_DECAY + frame_min * (1 - LEVEL_DECAY))
+            high = max(frame_max, high * LEVEL_DECAY + frame_max * (1 - LEVEL_DECAY))
+        self.adaptive_levels = (low, max(high, low + 1))
+        return self.adaptive_levels
 
     def setTimer(self, t):
         t.timeout.connect(self.update)
-        t.start(100)
+        t.start(self.interval)
     
+    def configure(self, radar_parameters):
+        """ Bin edges from parse_radar_config(): range 0..max_range, doppler -max_velocity..max_velocity """
+        self.range_limits = (0.0, radar_parameters["max_range"])
+        self.doppler_limits = (-radar_parameters["max_velocity"], radar_parameters["max_velocity"])
+        if self.mode == 'matrix':
+            num_range_bins = int(radar_parameters["num_range_bins"])
+            num_doppler_bins = int(radar_parameters["num_doppler_bins"])
+            range_step = radar_parameters["range_idx_to_meters"]
+            doppler_step = radar_parameters["doppler_resolution_mps"]
+            self.exchange = FrameExchange((num_doppler_bins, num_range_bins), np.int16)
+            # pixel centres on rangeArray / dopplerArray of parse_type5
+            self.rect = (-range_step / 2, (-num_doppler_bins / 2 - 0.5) * doppler_step,
+                         num_range_bins * range_step, num_doppler_bins * doppler_step)
+        # redraw at the frame rate
+        self.interval = refresh_interval(radar_parameters["frame_periodicity"])
+
+    def store_frame(self, detection_obj):
+        """ Publish one parsed frame: its rangeDoppler matrix or its detected points, by mode """
+        if self.mode == 'matrix':
+            if len(detection_obj['rangeDoppler']):
+                self.save_matrix(detection_obj['rangeDoppler'])
+        else:
+            self.save_data(detection_obj['doppler'], detection_obj['range'])
+
+    def save_matrix(self, range_doppler):
+        """ Publish one rangeDoppler matrix (TLV type 5) for the next redraw """
+        if np.shape(range_doppler) != self.exchange.shape:
+            self.exchange.rejected += 1
+            if self.exchange.rejected == 1:
+                print(f'''[Warning] rangeDoppler shape {np.shape(range_doppler)} does not match the config {self.exchange.shape}''')
+            return
+        self.exchange.write(range_doppler)
+
     def save_data(self, doppler, range):
-        self.data = np.zeros((32, 32))
-        for i, j in enumerate(range) :
-            self.data[int((j+2)*8)][int((doppler[i]+2)*8)] = 1000
-            # self.range = range * 50 #useless
-            # self.doppler = doppler * 50#useless
-        print(self.data)
-        # self.data = np.transpose(self.data) 
\ No newline at end of file
+        """ Decay the grid and add value to the cell of every point, points outside the limits are dropped """
+        self.data *= self.decay
+        num_range_bins, num_doppler_bins = self.data.shape
+        range_bins = bin_indices(range, self.range_limits, num_range_bins)
+        doppler_bins = bin_indices(doppler, self.doppler_limits, num_doppler_bins)
+        inside = (range_bins >= 0) & (doppler_bins >= 0)
+        np.add.at(self.data.reshape(-1), range_bins[inside] * num_doppler_bins + doppler_bins[inside], self.value)
+        self.exchange.write(self.data)
+
+
+def bin_indices(values, limits, num_bins):
+    """ Bin of every value for num_bins equal bins between limits, -1 outside """
+    low, high = limits
+    bins = np.floor((np.asarray(values, dtype=float) - low) * (num_bins / (high - low)))
+    bins[~((bins >= 0) & (bins < num_bins))] = -1
+    return bins.astype(np.intp)
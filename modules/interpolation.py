@@ -0,0 +1,79 @@
+""" module interpolation """
+import numpy as np
+
+INTERPOLATION_METHODS = ('linear', 'hold', 'spline')
+
+
+def missing_frames(windows):
+    """ Mask of the frames without any detection, i.e. rows that are all zero """
+    return ~np.any(windows != 0, axis=-1)
+
+
+def interpolate_gaps(windows, missing=None, method='linear'):
+    """ Fill missing frames inside gesture windows, vectorized over a whole batch.
+
+    windows : (frames, columns) or (batch, frames, columns) array
+    missing : bool mask (frames) or (batch, frames), defaults to missing_frames(windows);
+              present frames are never changed, so real zero values are kept
+    method  : 'linear' between the surrounding present frames, 'hold' the last present frame,
+              or 'spline', a cubic Hermite (Catmull-Rom) through the two present frames on each side
+
+    Only gaps between two present frames are filled, frames before the first and after the last
+    present frame stay zero. Returns a new float array of the same shape.
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f'''method must be one of {INTERPOLATION_METHODS}, got {method!r}''')
+    windows = np.asarray(windows, dtype=float)
+    single = windows.ndim == 2
+    if single:
+        windows = windows[np.newaxis]
+    if missing is None:
+        missing = missing_frames(windows)
+    missing = np.asarray(missing, dtype=bool).reshape(windows.shape[:2])
+
+    num_frames = windows.shape[1]
+    frames = np.arange(num_frames)
+    present = ~missing
+    # index of the present frame at or before / at or after every frame, -1 / num_frames when there is none
+    previous = np.maximum.accumulate(np.where(present, frames, -1), axis=1)
+    following = np.minimum.accumulate(np.where(present, frames, num_frames)[:, ::-1], axis=1)[:, ::-1]
+    gaps = missing & (previous >= 0) & (following < num_frames)
+
+    result = np.where(missing[..., np.newaxis], 0.0, windows)
+    if not gaps.any():
+        return result[0] if single else result
+
+    batch_index, frame_index = np.nonzero(gaps)
+    left = previous[batch_index, frame_index]
+    right = following[batch_index, frame_index]
+    left_values = windows[batch_index, left]
+    right_values = windows[batch_index, right]
+
+    if method == 'hold':
+        values = left_values
+    else:
+        span = (right - left)[:, np.newaxis]
+        position = (frame_index - left)[:, np.newaxis] / span
+        if method == 'linear':
+            values = left_values + (right_values - left_values) * position
+        else:
+            # neighbours one present frame further out, the gap edge itself at the window border
+            outer_left = np.where(left > 0, previous[batch_index, np.maximum(left - 1, 0)], -1)
+            outer_left = np.where(outer_left >= 0, outer_left, left)
+            outer_right = np.where(right < num_frames - 1,
+                                   following[batch_index, np.minimum(right + 1, num_frames - 1)], num_frames)
+            outer_right = np.where(outer_right < num_frames, outer_right, right)
+            outer_left_values = windows[batch_index, outer_left]
+            outer_right_values = windows[batch_index, outer_right]
+            # tangents per frame, scaled to the gap span
+            left_tangent = (right_values - outer_left_values) / (right - outer_left)[:, np.newaxis] * span
+            right_tangent = (outer_right_values - left_values) / (outer_right - left)[:, np.newaxis] * span
+            position2 = position * position
+            position3 = position2 * position
+            values = ((2 * position3 - 3 * position2 + 1) * left_values +
+                      (position3 - 2 * position2 + position) * left_tangent +
+                      (-2 * position3 + 3 * position2) * right_values +
+                      (position3 - position2) * right_tangent)
+
+    result[batch_index, frame_index] = values
+    return result[0] if single else result
@@ -0,0 +1,188 @@
+""" module packet_generator """
+import struct
+import time
+import numpy as np
+from modules.radar import Radar
+from modules.frame_sync import MAGIC_WORD, HEADER_NUM_BYTES
+
+SDK_VERSION = 0x03060000
+PLATFORM = 0xA6843
+CPU_CLOCK_HZ = 200e6
+# mmw demo pads every packet to a multiple of 32 bytes
+PACKET_ALIGNMENT = 32
+
+
+class PacketGenerator:
+    """ Class: PacketGenerator
+
+    Emits valid mmw demo output packets for a radar config file, for load and robustness tests.
+    The TLVs follow the config's guiMonitor line: detected points (1) with side info (7),
+    range profile (2), noise profile (3), range-Doppler heatmap (5) and stats (6).
+
+    num_points     : fixed point count, or (low, high) to draw a count per frame
+    corruption     : probability per frame of each fault, keys 'truncate', 'garbage', 'bad_length'
+    """
+
+    def __init__(self, radar_config_file_path, num_points=(1, 32), corruption=None, seed=None):
+        radar = Radar()
+        radar_config = radar.read_radar_config(radar_config_file_path)
+        self.radar_parameters = radar.parse_radar_config(radar_config)
+        self.num_points = num_points
+        self.corruption = corruption or {}
+        self.rng = np.random.default_rng(seed)
+        self.injected = {"truncate": 0, "garbage": 0, "bad_length": 0}
+
+        self.detected_points = True
+        self.side_info = True
+        self.range_profile = False
+        self.noise_profile = False
+        self.range_doppler = False
+        self.stats = False
+        for line in radar_config:
+            line_split = line.split()
+            if line_split and line_split[0] == 'guiMonitor':
+                self.detected_points = int(line_split[2]) > 0
+                self.side_info = int(line_split[2]) == 1
+                self.range_profile = int(line_split[3]) == 1
+                self.noise_profile = int(line_split[4]) == 1
+                self.range_doppler = int(line_split[6]) == 1
+                self.stats = int(line_split[7]) == 1
+
+        self.num_range_bins = int(self.radar_parameters["num_range_bins"])
+        self.num_doppler_bins = int(self.radar_parameters["num_doppler_bins"])
+        self.frame_periodicity = self.radar_parameters["frame_periodicity"]
+        print(f'''[Info] Initialize PacketGenerator: {radar_config_file_path}''')
+
+    def draw_num_points(self):
+        """ Point count of the next frame """
+        if isinstance(self.num_points, int):
+            return self.num_points
+        low, high = self.num_points
+        return int(self.rng.integers(low, high + 1))
+
+    def packet(self, frame_number, num_points=None):
+        """ Build one valid packet """
+        if num_points is None:
+            num_points = self.draw_num_points()
+        tlvs = []
+
+        if self.detected_points and num_points > 0:
+            max_range = self.radar_parameters["max_range"]
+            max_velocity = self.radar_parameters["max_velocity"]
+            points = np.empty((num_points, 4), dtype='<f4')
+            points[:, 0] = self.rng.uniform(-max_range / 2, max_range / 2, num_points)
+            points[:, 1] = self.rng.uniform(0, max_range, num_points)
+            points[:, 2] = self.rng.uniform(-max_range / 2, max_range / 2, num_points)
+            points[:, 3] = self.rng.uniform(-max_velocity, max_velocity, num_points)
+            tlvs.append((1, points.tobytes()))
+            if self.side_info:
+                side_info = self.rng.integers(0, 500, (num_points, 2)).astype('<u2')
+                tlvs.append((7, side_info.tobytes()))
+        if self.range_profile:
+            tlvs.append((2, self.rng.integers(0, 2**16, self.num_range_bins).astype('<u2').tobytes()))
+        if self.noise_profile:
+            tlvs.append((3, self.rng.integers(0, 2**16, self.num_range_bins).astype('<u2').tobytes()))
+        if self.range_doppler:
+            matrix = self.rng.integers(0, 2**15, self.num_range_bins * self.num_doppler_bins)
+            tlvs.append((5, matrix.astype('<i2').tobytes()))
+        if self.stats:
+            tlvs.append((6, self.rng.integers(0, 2**16, 6).astype('<u4').tobytes()))
+
+        payload = b''.join(struct.pack('<2I', tlv_type, len(value)) + value for tlv_type, value in tlvs)
+        total_packet_len = HEADER_NUM_BYTES + len(payload)
+        total_packet_len += (-total_packet_len) % PACKET_ALIGNMENT
+        time_cpu_cycles = int(frame_number * self.frame_periodicity * 1e-3 * CPU_CLOCK_HZ) % 2**32
+        header = MAGIC_WORD + struct.pack('<8I', SDK_VERSION, total_packet_len, PLATFORM, frame_number,
+                                          time_cpu_cycles, num_points, len(tlvs), 0)
+        packet = header + payload
+        return packet + bytes(total_packet_len - len(packet))
+
+    def corrupted_packet(self, frame_number, num_points=None):
+        """ Build one packet and inject the configured faults """
+        packet = self.packet(frame_number, num_points)
+        if self.rng.random() < self.corruption.get("bad_length", 0):
+            self.injected["bad_length"] += 1
+            bad_length = int(self.rng.choice([self.rng.integers(0, HEADER_NUM_BYTES), self.rng.integers(2**16, 2**32)]))
+            packet = packet[:12] + struct.pack('<I', bad_length) + packet[16:]
+        if self.rng.random() < self.corruption.get("truncate", 0):
+            self.injected["truncate"] += 1
+            packet = packet[:int(self.rng.integers(1, len(packet)))]
+        if self.rng.random() < self.corruption.get("garbage", 0):
+            self.injected["garbage"] += 1
+            packet = self.rng.integers(0, 256, int(self.rng.integers(1, 256)), dtype=np.uint8).tobytes() + packet
+        return packet
+
+    def stream(self, num_frames=None, start_frame=0):
+        """ Yield packets, corrupted as configured; num_frames None never stops """
+        frame_number = start_frame
+        while num_frames is None or frame_number < start_frame + num_frames:
+            yield self.corrupted_packet(frame_number)
+            frame_number += 1
+
+    def stream_bytes(self, num_frames, start_frame=0):
+        """ num_frames packets as one bytes object """
+        return b''.join(self.stream(num_frames, start_frame))
+
+
+class GeneratedSerial:
+    """ Class: GeneratedSerial
+
+    Serves PacketGenerator output through the serial.Serial read/in_waiting/timeout interface.
+    Frames are released at the config's frame rate times speed; speed 0 releases them as fast
+    as they are read, so Radar and SerialReader can be driven well beyond the real frame rate.
+    """
+
+    def __init__(self, generator, speed=1.0, num_frames=None):
+        self.generator = generator
+        self.speed = speed
+        self.timeout = None
+        self.frames = generator.stream(num_frames)
+        self.frame_interval = generator.frame_periodicity / 1000 / speed if speed > 0 else 0
+        self.start_counter = None
+        self.frames_released = 0
+        self.exhausted = False
+        self.buffer = bytearray()
+
+    def release(self):
+        """ Generate the frames that are due by now """
+        if self.start_counter is None:
+            self.start_counter = time.perf_counter()
+        if self.frame_interval:
+            due = int((time.perf_counter() - self.start_counter) / self.frame_interval) + 1
+        else:
+            due = self.frames_released + 1
+        while not self.exhausted and self.frames_released < due:
+            packet = next(self.frames, None)
+            if packet is None:
+                self.exhausted = True
+                break
+            self.buffer += packet
+            self.frames_released += 1
+
+    @property
+    def in_waiting(self):
+        """ Bytes that can be read without blocking """
+        self.release()
+        return len(self.buffer)
+
+    def read(self, size=1):
+        """ Read up to size bytes, blocking until they are generated or the timeout expires """
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        while self.in_waiting < size and not self.exhausted:
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                break
+            next_frame_time = self.start_counter + self.frames_released * self.frame_interval
+            wait = next_frame_time - now
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            time.sleep(max(wait, 0))
+        if not self.buffer and self.exhausted and deadline is not None:
+            time.sleep(max(deadline - time.perf_counter(), 0))
+
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def close(self):
+        """ Nothing to release, kept for serial.Serial compatibility """
@@ -31,12 +31,8 @@
 # *
 
 # import the required Python packages
-import struct
-import math
-import binascii
-import codecs
 import numpy as np
-from modules.parser_module.data_parser import getHex, getUint16, getUint32
+from modules.parser_module.data_parser import MAGIC_WORD, parse_header, parse_tlvs
 import matplotlib.pyplot as plt
 
 
@@ -58,26 +54,28 @@ def checkMagicPattern(data):
         found = 1
     return (found)
           
-def parser_helper(data, readNumBytes,debug=False):
+def parser_helper(data, readNumBytes, debug=False, headerStartIndex=None):
     """!
        This function is called by parser_one_mmw_demo_output_packet() function or application to read the input buffer, find the magic number, header location, the length of frame, the number of detected object and the number of TLV contained in this mmw demo output packet.
 
         @param data                   : 1-demension byte array holds the the data read from mmw demo output. It ignorant of the fact that data is coming from UART directly or file read.  
         @param readNumBytes           : the number of bytes contained in this input byte array  
+        @param headerStartIndex       : the header start location when the caller already knows it (e.g. FrameSynchronizer frames start at 0), skips the magic word search
             
         @return headerStartIndex      : the mmw demo output packet header start location
         @return totalPacketNumBytes   : the mmw demo output packet lenght           
         @return numDetObj             : the number of detected objects contained in this mmw demo output packet          
         @return numTlv                : the number of TLV contained in this mmw demo output packet           
         @return subFrameNumber        : the sbuframe index (0,1,2 or 3) of the frame contained in this mmw demo output packet
+        @return frameNumber           : the frame number of this mmw demo output packet
+        @return timeCpuCycles         : the CPU time stamp of this mmw demo output packet
     """ 
     
-    headerStartIndex = -1
-
-    for index in range (readNumBytes):
-        if checkMagicPattern(data[index:index+8:1]) == 1:
-            headerStartIndex = index
-            break
+    if headerStartIndex is None:
+        # one C-level pass over the buffer instead of comparing 8 bytes at every index
+        headerStartIndex = bytes(data[:readNumBytes]).find(MAGIC_WORD)
+    if headerStartIndex + 40 > readNumBytes:
+        headerStartIndex = -1
   
     if headerStartIndex == -1: # does not find the magic number i.e output packet header 
         totalPacketNumBytes = -1
@@ -88,34 +86,32 @@ def parser_helper(data, readNumBytes,debug=False):
         frameNumber         = -1
         timeCpuCycles       = -1
     else: # find the magic number i.e output packet header 
-        totalPacketNumBytes = getUint32(data[headerStartIndex+12:headerStartIndex+16:1])
-        platform            = getHex(data[headerStartIndex+16:headerStartIndex+20:1])
-        frameNumber         = getUint32(data[headerStartIndex+20:headerStartIndex+24:1])
-        timeCpuCycles       = getUint32(data[headerStartIndex+24:headerStartIndex+28:1])
-        numDetObj           = getUint32(data[headerStartIndex+28:headerStartIndex+32:1])
-        numTlv              = getUint32(data[headerStartIndex+32:headerStartIndex+36:1])
-        subFrameNumber      = getUint32(data[headerStartIndex+36:headerStartIndex+40:1])
+        (_, _, totalPacketNumBytes, platform, frameNumber, timeCpuCycles,
+         numDetObj, numTlv, subFrameNumber) = parse_header(data, headerStartIndex)
         
     if(debug):
         print("headerStartIndex    = %d" % (headerStartIndex))
         print("totalPacketNumBytes = %d" % (totalPacketNumBytes))
-        print("platform            = %s" % (platform)) 
+        print("platform            = %x" % (platform)) 
         print("frameNumber         = %d" % (frameNumber)) 
         print("timeCpuCycles       = %d" % (timeCpuCycles))   
         print("numDetObj           = %d" % (numDetObj)) 
         print("numTlv              = %d" % (numTlv))
         print("subFrameNumber      = %d" % (subFrameNumber))   
                             
-    return (headerStartIndex, totalPacketNumBytes, numDetObj, numTlv, subFrameNumber)
+    return (headerStartIndex, totalPacketNumBytes, numDetObj, numTlv, subFrameNumber, frameNumber, timeCpuCycles)
 
 
-def parser_one_mmw_demo_output_packet(data, readNumBytes, configParameters, debug=False):
+def parser_one_mmw_demo_output_packet(data, readNumBytes, configParameters, debug=False, tlvTypes=None, headerStartIndex=None):
     """!
        This function is called by application. Firstly it calls parser_helper() function to find the start location of the mmw demo output packet, then extract the contents from the output packet.
        Each invocation of this function handles only one frame at a time and user needs to manage looping around to parse data for multiple frames.
 
         @param data                   : 1-demension byte array holds the the data read from mmw demo output. It ignorant of the fact that data is coming from UART directly or file read.  
         @param readNumBytes           : the number of bytes contained in this input byte array  
+        @param configParameters       : radar parameters from Radar.parse_radar_config(), used by the heatmap TLVs
+        @param tlvTypes               : collection of TLV types to decode, None decodes all of them. Other TLVs are skipped by length.
+        @param headerStartIndex       : the header start location when already known, see parser_helper()
             
         @return result                : parser result. 0 pass otherwise fail
         @return headerStartIndex      : the mmw demo output packet header start location
@@ -132,12 +128,16 @@ def parser_one_mmw_demo_output_packet(data, readNumBytes, configParameters, debu
         @return detectedElevAngle_array : 1-demension array holds each detected target's elevAngle of the mmw demo output packet
         @return detectedSNR_array     : 1-demension array holds each detected target's snr of the mmw demo output packet
         @return detectedNoise_array   : 1-demension array holds each detected target's noise of the mmw demo output packet
+        @return rangeArray            : range of each range-Doppler heatmap column in meters
+        @return dopplerArray          : velocity of each range-Doppler heatmap row in m/s
+        @return rangeDoppler          : range-Doppler heatmap from TLV type 5
+        @return tlvs                  : dict of {tlvType: parsed values} for every decoded TLV, see parse_tlvs()
+        @return frameNumber           : the frame number from the packet header
+        @return timeCpuCycles         : the CPU time stamp from the packet header
     """
 
     headerNumBytes = 40   
 
-    PI = 3.14159265
-
     detectedX_array = []
     detectedY_array = []
     detectedZ_array = []
@@ -150,11 +150,12 @@ def parser_one_mmw_demo_output_packet(data, readNumBytes, configParameters, debu
     rangeArray = []
     dopplerArray = []
     rangeDoppler = []
+    tlvs = {}
     
     result = TC_PASS
 
     # call parser_helper() function to find the output packet header start location and packet size 
-    (headerStartIndex, totalPacketNumBytes, numDetObj, numTlv, subFrameNumber) = parser_helper(data, readNumBytes, debug)
+    (headerStartIndex, totalPacketNumBytes, numDetObj, numTlv, subFrameNumber, frameNumber, timeCpuCycles) = parser_helper(data, readNumBytes, debug, headerStartIndex)
                          
     if headerStartIndex == -1:
         result = TC_FAIL
@@ -168,152 +169,61 @@ def parser_one_mmw_demo_output_packet(data, readNumBytes, configParameters, debu
         elif nextHeaderStartIndex + 8 < readNumBytes and checkMagicPattern(data[nextHeaderStartIndex:nextHeaderStartIndex+8:1]) == 0:
             result = TC_FAIL
             print("********** Frame Fail, incomplete packet **********") 
-        elif numDetObj <= 0:
-            result = TC_FAIL
-            # print("************ Frame Fail, numDetObj = %d *****************" % (numDetObj))
         elif subFrameNumber > 3:
             result = TC_FAIL
             print("************ Frame Fail, subFrameNumber = %d *****************" % (subFrameNumber))
         else: 
-            # process the 1st TLV
+            # walk all TLVs in the order they were sent and decode only the requested types
             tlvStart = headerStartIndex + headerNumBytes
-                                                    
-            tlvType    = getUint32(data[tlvStart+0:tlvStart+4:1])
-            tlvLen     = getUint32(data[tlvStart+4:tlvStart+8:1])       
-            offset = 8
-            if(debug):        
-                print("The 1st TLV") 
-                print("    type %d" % (tlvType))
-                print("    len %d bytes" % (tlvLen))
-                                                    
-            # the 1st TLV must be type 1
-            if tlvType == 1 and tlvLen < totalPacketNumBytes:#MMWDEMO_UART_MSG_DETECTED_POINTS
-
-                # TLV type 1 contains x, y, z, v values of all detect objects. 
-                # each x, y, z, v are 32-bit float in IEEE 754 single-precision binary floating-point format, so every 16 bytes represent x, y, z, v values of one detect objects.    
-                
-                # for each detect objects, extract/convert float x, y, z, v values and calculate range profile and azimuth                           
-                for obj in range(numDetObj):
-                    # convert byte0 to byte3 to float x value
-                    x = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset:tlvStart + offset+4:1]),'hex'))[0]
+            tlvs = parse_tlvs(data, tlvStart, headerStartIndex + totalPacketNumBytes, numTlv, numDetObj,
+                              configParameters, tlvTypes, debug)
 
-                    # convert byte4 to byte7 to float y value
-                    y = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset+4:tlvStart + offset+8:1]),'hex'))[0]
-
-                    # convert byte8 to byte11 to float z value
-                    z = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset+8:tlvStart + offset+12:1]),'hex'))[0]
-
-                    # convert byte12 to byte15 to float v value
-                    v = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset+12:tlvStart + offset+16:1]),'hex'))[0]
-
-                    # calculate range profile from x, y, z
-                    compDetectedRange = math.sqrt((x * x)+(y * y)+(z * z))
+        if result == TC_PASS and 1 in tlvs and len(tlvs[1]["detectedX_array"]) != numDetObj:
+            result = TC_FAIL
+            tlvs = {}
+            print("************ Frame Fail, numDetObj = %d does not match the detected points TLV *****************" % (numDetObj))
+        elif result == TC_PASS and 7 in tlvs and len(tlvs[7]["detectedSNR_array"]) != numDetObj:
+            result = TC_FAIL
+            tlvs = {}
+            print("************ Frame Fail, numDetObj = %d does not match the side info TLV *****************" % (numDetObj))
 
-                    # calculate azimuth from x, y           
-                    if y == 0:
-                        if x >= 0:
-                            detectedAzimuth = 90
-                        else:
-                            detectedAzimuth = -90 
-                    else:
-                        detectedAzimuth = math.atan(x/y) * 180 / PI
+        if result == TC_PASS:
 
-                    # calculate elevation angle from x, y, z
-                    if x == 0 and y == 0:
-                        if z >= 0:
-                            detectedElevAngle = 90
-                        else: 
-                            detectedElevAngle = -90
-                    else:
-                        detectedElevAngle = math.atan(z/math.sqrt((x * x)+(y * y))) * 180 / PI
-                            
-                    detectedX_array.append(x)
-                    detectedY_array.append(y)
-                    detectedZ_array.append(z)
-                    detectedV_array.append(v)
-                    detectedRange_array.append(compDetectedRange)
-                    detectedAzimuth_array.append(detectedAzimuth)
-                    detectedElevAngle_array.append(detectedElevAngle)
-                                                                
-                    offset = offset + 16
-                # end of for obj in range(numDetObj) for 1st TLV
-                                                            
-            # Process the 2nd TLV
-            tlvStart = tlvStart + 8 + tlvLen
-                                                    
-            tlvType    = getUint32(data[tlvStart+0:tlvStart+4:1])
-            tlvLen     = getUint32(data[tlvStart+4:tlvStart+8:1])      
-            offset = 8
+            if 1 in tlvs: #MMWDEMO_UART_MSG_DETECTED_POINTS
 
-            if(debug):        
-                print("The 2nd TLV") 
-                print("    type %d" % (tlvType))
-                print("    len %d bytes" % (tlvLen))
-            
-                                             
-                                                
-            if tlvType == 7: 
+                # TLV type 1 contains x, y, z, v values of all detect objects. 
+                # each x, y, z, v are 32-bit float in IEEE 754 single-precision binary floating-point format, so every 16 bytes represent x, y, z, v values of one detect objects.    
+                detectedX_array = tlvs[1]["detectedX_array"]
+                detectedY_array = tlvs[1]["detectedY_array"]
+                detectedZ_array = tlvs[1]["detectedZ_array"]
+                detectedV_array = tlvs[1]["detectedV_array"]
+                detectedRange_array = tlvs[1]["detectedRange_array"]
+                detectedAzimuth_array = tlvs[1]["detectedAzimuth_array"]
+                detectedElevAngle_array = tlvs[1]["detectedElevAngle_array"]
+
+            if 7 in tlvs: 
                 
                 # TLV type 7 contains snr and noise of all detect objects.
                 # each snr and noise are 16-bit integer represented by 2 bytes, so every 4 bytes represent snr and noise of one detect objects.    
-            
-                # for each detect objects, extract snr and noise                                            
-                for obj in range(numDetObj):
-                    # byte0 and byte1 represent snr. convert 2 bytes to 16-bit integer
-                    snr   = getUint16(data[tlvStart + offset + 0:tlvStart + offset + 2:1])
-                    # byte2 and byte3 represent noise. convert 2 bytes to 16-bit integer 
-                    noise = getUint16(data[tlvStart + offset + 2:tlvStart + offset + 4:1])
-
-                    detectedSNR_array.append(snr)
-                    detectedNoise_array.append(noise)
-                                                                    
-                    offset = offset + 4
+                detectedSNR_array = tlvs[7]["detectedSNR_array"]
+                detectedNoise_array = tlvs[7]["detectedNoise_array"]
             else:
-                for obj in range(numDetObj):
-                    detectedSNR_array.append(0)
-                    detectedNoise_array.append(0)
-                
-            
-            tlvStart = tlvStart + 8 + tlvLen
-                                                    
-            tlvType    = getUint32(data[tlvStart+0:tlvStart+4:1])
-            tlvLen     = getUint32(data[tlvStart+4:tlvStart+8:1])      
-            offset = 8
-
-            if(debug):        
-                print("The 3rd TLV") 
-                print("    type %d" % (tlvType))
-                print("    len %d bytes" % (tlvLen))
+                detectedSNR_array = np.zeros(numDetObj, dtype=np.int64)
+                detectedNoise_array = np.zeros(numDetObj, dtype=np.int64)
             
             #tlv for heatmap. rangeArray, dopplerArray are included
-            if tlvType == 5:
-        
-                num_doppler_bins = int(configParameters["num_doppler_bins"])
-                num_range_bins = configParameters["num_range_bins"]
-                numBytes = 2*num_range_bins*num_doppler_bins
-                
-                payload = data[tlvStart:tlvStart + numBytes]
-                
-                tlvStart += numBytes
-                
-                rangeDoppler = payload.view(dtype=np.int16)
-                
-                if np.max(rangeDoppler) > 10000:
-                    pass
-         
-                rangeDoppler = np.reshape(rangeDoppler, (num_doppler_bins, num_range_bins),'F') #Fortran-like reshape
-                rangeDoppler = np.append(rangeDoppler[int(len(rangeDoppler)/2):], rangeDoppler[:int(len(rangeDoppler)/2)], axis=0)
-                rangeArray = np.array(range(num_range_bins))*configParameters["range_idx_to_meters"]
-                dopplerArray = np.multiply(np.arange(-num_doppler_bins/2 , num_doppler_bins/2), configParameters["doppler_resolution_mps"])
+            if 5 in tlvs:
+                rangeDoppler = tlvs[5]["rangeDoppler"]
+                rangeArray = tlvs[5]["rangeArray"]
+                dopplerArray = tlvs[5]["dopplerArray"]
 
                 if(debug):
                     print("rangeArray: ", rangeArray, "dopplerArray: ", dopplerArray,"rangeDoppler: ", rangeDoppler)
             
-            # end of if tlvType == 7
-            if(debug):           
+            if(debug and 1 in tlvs):           
                 print("                  x(m)         y(m)         z(m)        v(m/s)    Com0range(m)  azimuth(deg)  elevAngle(deg)  snr(0.1dB)    noise(0.1dB)")
                 for obj in range(numDetObj):
                     print("    obj%3d: %12f %12f %12f %12f %12f %12f %12d %12d %12d" % (obj, detectedX_array[obj], detectedY_array[obj], detectedZ_array[obj], detectedV_array[obj], detectedRange_array[obj], detectedAzimuth_array[obj], detectedElevAngle_array[obj], detectedSNR_array[obj], detectedNoise_array[obj]))
                 
                 
-    return (result, headerStartIndex, totalPacketNumBytes, numDetObj, numTlv, subFrameNumber, detectedX_array, detectedY_array, detectedZ_array, detectedV_array, detectedRange_array, detectedAzimuth_array, detectedElevAngle_array, detectedSNR_array, detectedNoise_array, rangeArray, dopplerArray, rangeDoppler)
+    return (result, headerStartIndex, totalPacketNumBytes, numDetObj, numTlv, subFrameNumber, detectedX_array, detectedY_array, detectedZ_array, detectedV_array, detectedRange_array, detectedAzimuth_array, detectedElevAngle_array, detectedSNR_array, detectedNoise_array, rangeArray, dopplerArray, rangeDoppler, tlvs, frameNumber, timeCpuCycles)
@@ -1,7 +1,3 @@
-import struct
-import math
-import binascii
-import codecs
 import numpy as np
 # from modules.parser_module import data_parser
 
@@ -45,80 +41,93 @@ def getHex(data):
     return np.matmul(data,word)
 
 
-### All the parsers here are not in used. #######
+# mmw demo output packet header, 40 bytes starting at the magic word
+MAGIC_WORD = bytes([2, 1, 4, 3, 6, 5, 8, 7])
+HEADER_DTYPE = np.dtype([('magicWord', '<u8'), ('version', '<u4'), ('totalPacketLen', '<u4'), ('platform', '<u4'),
+                         ('frameNumber', '<u4'), ('timeCpuCycles', '<u4'), ('numDetectedObj', '<u4'),
+                         ('numTLVs', '<u4'), ('subFrameNumber', '<u4')])
+TLV_HEADER_DTYPE = np.dtype([('type', '<u4'), ('length', '<u4')])
 
-def parse_type1(data, numDetobj, tlvStart, offset):
+def parse_header(data, headerStartIndex=0):
+    """!
+       This function decodes the whole 40-byte packet header in one pass through HEADER_DTYPE.
+
+        @param data             : 1-demension byte array holds the mmw demo output packet
+        @param headerStartIndex : the header start location, i.e. the magic word
+        @return                 : tuple of python ints in HEADER_DTYPE order (magicWord, version, totalPacketLen,
+                                  platform, frameNumber, timeCpuCycles, numDetectedObj, numTLVs, subFrameNumber)
+    """
+    return np.frombuffer(data, dtype=HEADER_DTYPE, count=1, offset=headerStartIndex)[0].item()
+
+
+### TLV parsers. Each parser takes the same arguments so parse_tlvs() can dispatch through TLV_PARSERS. #######
+# data       : 1-demension byte array holding the packet
+# numDetobj  : the number of detected objects from the packet header
+# tlvStart   : the TLV start location (TLV header, not payload)
+# offset     : the payload offset from tlvStart, i.e. the 8-byte TLV header
+# tlvLen     : the payload length in bytes
+# configParameters : radar parameters from Radar.parse_radar_config()
+#
+# Parsers always return arrays that own their memory, so results stay valid after the input buffer is reused.
+
+# TLV payload layouts, little-endian as sent by the mmw demo over UART.
+# Payloads are viewed in place through these dtypes instead of being unpacked value by value.
+DETECTED_POINT_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('v', '<f4')])
+SIDE_INFO_DTYPE = np.dtype([('snr', '<u2'), ('noise', '<u2')])
+STATS_DTYPE = np.dtype([('interFrameProcessingTime', '<u4'), ('transmitOutputTime', '<u4'),
+                        ('interFrameProcessingMargin', '<u4'), ('interChirpProcessingMargin', '<u4'),
+                        ('activeFrameCPULoad', '<u4'), ('interFrameCPULoad', '<u4')])
+TEMPERATURE_DTYPE = np.dtype([('tempReportValid', '<i4'), ('time', '<u4'),
+                              ('tmpRx0Sens', '<u2'), ('tmpRx1Sens', '<u2'), ('tmpRx2Sens', '<u2'), ('tmpRx3Sens', '<u2'),
+                              ('tmpTx0Sens', '<u2'), ('tmpTx1Sens', '<u2'), ('tmpTx2Sens', '<u2'),
+                              ('tmpPmSens', '<u2'), ('tmpDig0Sens', '<u2'), ('tmpDig1Sens', '<u2')])
+
+
+def parse_type1(data, numDetobj, tlvStart, offset, tlvLen=None, configParameters=None):
     
     """
         TLV Value Type : Detected Points
         Type: 1
         Length: 16 Bytes x Num Detected Obj
         Value: Array of detected points. Each point is represented by 16 bytes giving position and radial Doppler velocity.
+
+        The payload is viewed as DETECTED_POINT_DTYPE without copying and range, azimuth and elevation
+        are computed for all points in one vectorized pass. The returned arrays are float64 copies,
+        so they stay valid after the input buffer is reused.
+        At most tlvLen bytes are read; when the header's numDetobj does not fit, fewer points are
+        returned and the caller rejects the frame.
     """
     
-    detectedX_array = []
-    detectedY_array = []
-    detectedZ_array = []
-    detectedV_array = []
-    detectedRange_array = []
-    detectedAzimuth_array = []
-    detectedElevAngle_array = []
-    
-    
-    for obj in range(numDetobj):
-        # convert byte0 to byte3 to float x value
-        x = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset:tlvStart + offset+4:1]),'hex'))[0]
-
-        # convert byte4 to byte7 to float y value
-        y = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset+4:tlvStart + offset+8:1]),'hex'))[0]
-
-        # convert byte8 to byte11 to float z value
-        z = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset+8:tlvStart + offset+12:1]),'hex'))[0]
-
-        # convert byte12 to byte15 to float v value
-        v = struct.unpack('<f', codecs.decode(binascii.hexlify(data[tlvStart + offset+12:tlvStart + offset+16:1]),'hex'))[0]
+    count = numDetobj if tlvLen is None else min(numDetobj, tlvLen // DETECTED_POINT_DTYPE.itemsize)
+    points = np.frombuffer(data, dtype=DETECTED_POINT_DTYPE, count=count, offset=tlvStart + offset)
 
-        # calculate range profile from x, y, z
-        compDetectedRange = math.sqrt((x * x)+(y * y)+(z * z))
+    x = points['x'].astype(np.float64)
+    y = points['y'].astype(np.float64)
+    z = points['z'].astype(np.float64)
+    v = points['v'].astype(np.float64)
 
-        # calculate azimuth from x, y           
-        if y == 0:
-            if x >= 0:
-                detectedAzimuth = 90
-            else:
-                detectedAzimuth = -90 
-        else:
-            detectedAzimuth = math.atan(x/y) * 180 / PI
+    # calculate range profile from x, y, z
+    xyDistance = np.sqrt((x * x) + (y * y))
+    detectedRange_array = np.sqrt((x * x) + (y * y) + (z * z))
 
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # calculate azimuth from x, y
+        detectedAzimuth_array = np.arctan(x / y) * 180 / PI
         # calculate elevation angle from x, y, z
-        if x == 0 and y == 0:
-            if z >= 0:
-                detectedElevAngle = 90
-            else: 
-                detectedElevAngle = -90
-        else:
-            detectedElevAngle = math.atan(z/math.sqrt((x * x)+(y * y))) * 180 / PI
-                
-        detectedX_array.append(x)
-        detectedY_array.append(y)
-        detectedZ_array.append(z)
-        detectedV_array.append(v)
-        detectedRange_array.append(compDetectedRange)
-        detectedAzimuth_array.append(detectedAzimuth)
-        detectedElevAngle_array.append(detectedElevAngle)
-                                                    
-        offset = offset + 16
-    # end of for obj in range(numDetObj) for 1st TLV
-    
-    return {"detectedX_array" : detectedX_array,
-            "detectedY_array" : detectedY_array,
-            "detectedZ_array" : detectedZ_array,
-            "detectedV_array" : detectedV_array,
+        detectedElevAngle_array = np.arctan(z / xyDistance) * 180 / PI
+
+    detectedAzimuth_array = np.where(y == 0, np.where(x >= 0, 90.0, -90.0), detectedAzimuth_array)
+    detectedElevAngle_array = np.where((x == 0) & (y == 0), np.where(z >= 0, 90.0, -90.0), detectedElevAngle_array)
+    
+    return {"detectedX_array" : x,
+            "detectedY_array" : y,
+            "detectedZ_array" : z,
+            "detectedV_array" : v,
             "detectedRange_array" : detectedRange_array,
             "detectedAzimuth_array" : detectedAzimuth_array,
             "detectedElevAngle_array" : detectedElevAngle_array}
 
-def parse_type2(data):
+def parse_type2(data, numDetobj, tlvStart, offset, tlvLen, configParameters=None):
     
     """
         TLV Value Type : Range Profile
@@ -127,8 +136,11 @@ def parse_type2(data):
         Value: Array of profile points at 0th Doppler (stationary objects). The points represent the sum of log2 magnitudes of received antennas expressed in Q9 format.
     """
     
+    rangeProfile = np.frombuffer(data, dtype='<u2', count=tlvLen // 2, offset=tlvStart + offset)
+
+    return {"rangeProfile" : rangeProfile.astype(np.uint16)}
     
-def parse_type3(data):
+def parse_type3(data, numDetobj, tlvStart, offset, tlvLen, configParameters=None):
     
     """
         TLV Value Type : Noise Profile
@@ -138,10 +150,13 @@ def parse_type3(data):
         there would be no objects or clutter at maximum speed so the range profile at such speed represents the receiver noise floor.
     """
     
+    noiseProfile = np.frombuffer(data, dtype='<u2', count=tlvLen // 2, offset=tlvStart + offset)
 
-def parse_type4(data):
+    return {"noiseProfile" : noiseProfile.astype(np.uint16)}
+
+def parse_type4(data, numDetobj, tlvStart, offset, tlvLen, configParameters):
     
-   """ 
+    """ 
         TLV Value Type : Azimuth Static Heatmap
         Type: 4
         Length: (Range FFT size) x (Number of “azimuth” virtual antennas) x (4Bytes)
@@ -158,8 +173,9 @@ def parse_type4(data):
                 The values from the radar cube are used to construct the range-azimuth heatmap in the visualizer.
     """
     
+    return {"azimuthStaticHeatmap" : parseStaticHeatmap(data, tlvStart + offset, tlvLen, configParameters)}
     
-def parse_type5(data):
+def parse_type5(data, numDetobj, tlvStart, offset, tlvLen, configParameters):
     
     """
         TLV Value Type : Range-Doppler Heatmap
@@ -172,29 +188,63 @@ def parse_type5(data):
         
     """
 
-def parse_type6(data):
+    num_doppler_bins = int(configParameters["num_doppler_bins"])
+    num_range_bins = int(configParameters["num_range_bins"])
+    if num_range_bins * num_doppler_bins * 2 > tlvLen:
+        # the TLV does not match the config, e.g. a capture replayed with another config
+        return {"rangeDoppler" : [],
+                "rangeArray" : [],
+                "dopplerArray" : []}
+
+    payload = np.frombuffer(data, dtype='<i2', count=num_range_bins * num_doppler_bins, offset=tlvStart + offset)
+
+    rangeDoppler = np.reshape(payload, (num_doppler_bins, num_range_bins), 'F') #Fortran-like reshape
+    # move zero Doppler to the middle row; np.append also copies the matrix out of the input buffer
+    rangeDoppler = np.append(rangeDoppler[int(len(rangeDoppler)/2):], rangeDoppler[:int(len(rangeDoppler)/2)], axis=0)
+    rangeArray = np.array(range(num_range_bins))*configParameters["range_idx_to_meters"]
+    dopplerArray = np.multiply(np.arange(-num_doppler_bins/2 , num_doppler_bins/2), configParameters["doppler_resolution_mps"])
+
+    return {"rangeDoppler" : rangeDoppler,
+            "rangeArray" : rangeArray,
+            "dopplerArray" : dopplerArray}
+
+def parse_type6(data, numDetobj, tlvStart, offset, tlvLen, configParameters=None):
     
     """
         TLV Value Type : Statistics
         Type: 6
         Length: 24 Bytes
         Value: Stats information from data path. See the doxygen for detailed explanation of each stat.
+
+        A TLV shorter than the stats record decodes to an empty dict.
     """
 
-def parse_type7(data):
+    if tlvLen < STATS_DTYPE.itemsize:
+        return {"stats" : {}}
+    stats = np.frombuffer(data, dtype=STATS_DTYPE, count=1, offset=tlvStart + offset)[0]
+
+    return {"stats" : {name: int(stats[name]) for name in STATS_DTYPE.names}}
+
+def parse_type7(data, numDetobj, tlvStart, offset, tlvLen=None, configParameters=None):
     
     """
         TLV Value Type : Side Info for Detected Points
         Type: 7
         Length: 4 Bytes x Num Detected Obj
         Value: The payload consists of 4 bytes for EACH point in the point cloud. The values for snr and noise are measured in multiples of 0.1dB.
+
+        At most tlvLen bytes are read; when the header's numDetobj does not fit, fewer values are
+        returned and the caller rejects the frame.
     """
     
-    detectedSNR_array = []
-    detectedNoise_array = []
+    count = numDetobj if tlvLen is None else min(numDetobj, tlvLen // SIDE_INFO_DTYPE.itemsize)
+    sideInfo = np.frombuffer(data, dtype=SIDE_INFO_DTYPE, count=count, offset=tlvStart + offset)
+
+    return {"detectedSNR_array" : sideInfo['snr'].astype(np.int64),
+            "detectedNoise_array" : sideInfo['noise'].astype(np.int64)}
     
 
-def parse_type8(data):
+def parse_type8(data, numDetobj, tlvStart, offset, tlvLen, configParameters):
     
     """
         TLV Value Type : Azimuth/Elevation Static Heatmap
@@ -211,12 +261,93 @@ def parse_type8(data):
         ###The demo will only output either the Azimuth Static Heatmap or the Azimuth/Elevation Static Heatmap###
     """
 
+    return {"azimuthElevationStaticHeatmap" : parseStaticHeatmap(data, tlvStart + offset, tlvLen, configParameters)}
+
 
-def parse_type9(data):
+def parse_type9(data, numDetobj, tlvStart, offset, tlvLen, configParameters=None):
     
     """
         TLV Value Type : Temperature Statistics
         Type: 9
         Length: 28 Bytes
         Value: Temperature report - snapshot taken just before shipping data over UART
-    """
\ No newline at end of file
+
+        A TLV shorter than the temperature record decodes to an empty dict.
+    """
+
+    if tlvLen < TEMPERATURE_DTYPE.itemsize:
+        return {"temperature" : {}}
+    temperature = np.frombuffer(data, dtype=TEMPERATURE_DTYPE, count=1, offset=tlvStart + offset)[0]
+
+    return {"temperature" : {name: int(temperature[name]) for name in TEMPERATURE_DTYPE.names}}
+
+
+def parseStaticHeatmap(data, payloadStart, tlvLen, configParameters):
+    """!
+       This function converts the (imag, real) int16 pairs of TLV type 4 and type 8 into a complex matrix.
+
+        @return : complex array with shape (num_range_bins, number of virtual antennas)
+    """
+    num_range_bins = int(configParameters["num_range_bins"])
+    numVirtualAnt = tlvLen // (4 * num_range_bins)
+
+    samples = np.frombuffer(data, dtype='<i2', count=num_range_bins * numVirtualAnt * 2, offset=payloadStart)
+    samples = samples.reshape(num_range_bins, numVirtualAnt, 2)
+
+    return samples[:, :, 1] + 1j * samples[:, :, 0]
+
+
+TLV_PARSERS = {
+    1: parse_type1,  # MMWDEMO_OUTPUT_MSG_DETECTED_POINTS
+    2: parse_type2,  # MMWDEMO_OUTPUT_MSG_RANGE_PROFILE
+    3: parse_type3,  # MMWDEMO_OUTPUT_MSG_NOISE_PROFILE
+    4: parse_type4,  # MMWDEMO_OUTPUT_MSG_AZIMUT_STATIC_HEAT_MAP
+    5: parse_type5,  # MMWDEMO_OUTPUT_MSG_RANGE_DOPPLER_HEAT_MAP
+    6: parse_type6,  # MMWDEMO_OUTPUT_MSG_STATS
+    7: parse_type7,  # MMWDEMO_OUTPUT_MSG_DETECTED_POINTS_SIDE_INFO
+    8: parse_type8,  # MMWDEMO_OUTPUT_MSG_AZIMUT_ELEVATION_STATIC_HEAT_MAP
+    9: parse_type9,  # MMWDEMO_OUTPUT_MSG_TEMPERATURE_STATS
+}
+
+
+def parse_tlvs(data, tlvStart, packetEnd, numTlv, numDetObj, configParameters, tlvTypes=None, debug=False):
+    """!
+       This function walks the numTlv TLVs of one mmw demo output packet in whatever order the firmware sent them
+       and dispatches each one to its parser in TLV_PARSERS.
+       TLVs that are not requested in tlvTypes, or have no registered parser, are skipped by their length without being decoded.
+
+        @param data             : 1-demension byte array holds the mmw demo output packet
+        @param tlvStart         : the start location of the first TLV, i.e. right after the packet header
+        @param packetEnd        : the end location of the packet; a TLV running past it stops the walk
+        @param numTlv           : the number of TLV contained in the packet
+        @param numDetObj        : the number of detected objects contained in the packet
+        @param configParameters : radar parameters from Radar.parse_radar_config()
+        @param tlvTypes         : collection of TLV types to decode, None decodes every registered type
+
+        @return tlvs            : dict of {tlvType: parsed values} for the decoded TLVs
+    """
+    tlvs = {}
+
+    for index in range(numTlv):
+        if tlvStart + 8 > packetEnd:
+            break
+
+        tlvType, tlvLen = np.frombuffer(data, dtype=TLV_HEADER_DTYPE, count=1, offset=tlvStart)[0].item()
+
+        if(debug):
+            print("TLV %d" % (index))
+            print("    type %d" % (tlvType))
+            print("    len %d bytes" % (tlvLen))
+
+        if tlvStart + 8 + tlvLen > packetEnd:
+            if(debug):
+                print("    TLV runs past the end of the packet, stop parsing")
+            break
+
+        parser = TLV_PARSERS.get(tlvType)
+        if parser is not None and (tlvTypes is None or tlvType in tlvTypes):
+            tlvs[tlvType] = parser(data, numDetObj, tlvStart, 8, tlvLen, configParameters)
+
+        tlvStart = tlvStart + 8 + tlvLen
+
+    return tlvs
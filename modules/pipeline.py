@@ -0,0 +1,186 @@
+""" module pipeline """
+import queue
+import threading
+import time
+from collections import deque
+import numpy as np
+
+
+def put_drop_oldest(target_queue, item):
+    """ Put item into a bounded queue without blocking, dropping the oldest item when full.
+    Returns the number of dropped items. """
+    dropped = 0
+    while True:
+        try:
+            target_queue.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                target_queue.get_nowait()
+                dropped += 1
+            except queue.Empty:
+                pass
+
+
+class Stage(threading.Thread):
+    """ Class: Stage
+
+    One worker thread between two bounded queues. function(item) returns an iterable of
+    items for the next stage, or None. Putting never blocks, so a slow stage only drops
+    its own backlog and never stalls the stages before it, unless the next stage is lossless:
+    then putting waits for space, for items that must not be lost such as recorded gestures.
+    Every result is also handed to the stage's subscribers, in the stage thread, so they
+    must return quickly.
+    """
+
+    def __init__(self, name, function, input_queue, output_queue=None, latency_samples=1000):
+        threading.Thread.__init__(self, name=name, daemon=True)
+        self.function = function
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        # wait for space in output_queue instead of dropping its oldest item
+        self.lossless_output = False
+        self.stop_event = threading.Event()
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.subscribers = []
+        self.subscriber_errors = 0
+        self.latencies = deque(maxlen=latency_samples)
+
+    def run(self):
+        """ Worker loop """
+        while not self.stop_event.is_set():
+            try:
+                item = self.input_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            start_time = time.perf_counter()
+            try:
+                results = self.function(item)
+                if results is not None:
+                    for result in results:
+                        self.notify(result)
+                        if self.output_queue is None:
+                            continue
+                        if self.lossless_output:
+                            self.put_waiting(result)
+                        else:
+                            self.dropped += put_drop_oldest(self.output_queue, result)
+            except Exception as error:  # pylint: disable=W0703
+                # keep the pipeline alive, one bad item must not stop acquisition
+                self.errors += 1
+                print(f'''[Error] Stage {self.name}: {error!r}''')
+            self.latencies.append(time.perf_counter() - start_time)
+            self.processed += 1
+
+    def put_waiting(self, result):
+        """ Put into the output queue, waiting for space; only a stop request gives up, and says so """
+        while True:
+            try:
+                self.output_queue.put(result, timeout=0.1)
+                return
+            except queue.Full:
+                if self.stop_event.is_set():
+                    self.dropped += 1
+                    print(f'''[Warning] Stage {self.name}: stopped with a full queue, item dropped''')
+                    return
+
+    def notify(self, result):
+        """ Hand one result to every subscriber, a failing subscriber does not affect the others """
+        for callback in self.subscribers:
+            try:
+                callback(result)
+            except Exception as error:  # pylint: disable=W0703
+                self.subscriber_errors += 1
+                print(f'''[Error] Stage {self.name} subscriber {callback!r}: {error!r}''')
+
+    def stop(self):
+        """ Ask the worker loop to exit """
+        self.stop_event.set()
+
+    def metrics(self):
+        """ Queue depth, throughput counters and per-item latency in ms """
+        latencies = np.array(self.latencies) * 1000
+        return {
+            "queue_depth": self.input_queue.qsize(),
+            "queue_size": self.input_queue.maxsize,
+            "processed": self.processed,
+            "dropped_downstream": self.dropped,
+            "errors": self.errors,
+            "subscriber_errors": self.subscriber_errors,
+            "latency_ms_mean": float(latencies.mean()) if len(latencies) else 0.0,
+            "latency_ms_p99": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            "latency_ms_max": float(latencies.max()) if len(latencies) else 0.0,
+        }
+
+
+class Pipeline:
+    """ Class: Pipeline
+
+    Chain of stages connected by bounded queues, fed from a source queue
+    such as SerialReader.chunks.
+    """
+
+    def __init__(self, source_queue):
+        self.source_queue = source_queue
+        self.stages = []
+        self.monitor = None
+        self.stop_event = threading.Event()
+        print('''[Info] Initialize Pipeline class ''')
+
+    def add_stage(self, name, function, max_queue=64, lossless=False):
+        """ Append a stage; its input is the previous stage's output.
+        With lossless the previous stage waits for space in the input queue instead of dropping items. """
+        if self.stages:
+            input_queue = queue.Queue(max_queue)
+            self.stages[-1].output_queue = input_queue
+            self.stages[-1].lossless_output = lossless
+        else:
+            input_queue = self.source_queue
+        stage = Stage(name, function, input_queue)
+        self.stages.append(stage)
+        return stage
+
+    def subscribe(self, stage_name, callback):
+        """ Call callback(result) for every result of the named stage, e.g. each parsed frame.
+        Several consumers share one stage this way, so a frame is parsed once for all of them. """
+        for stage in self.stages:
+            if stage.name == stage_name:
+                stage.subscribers.append(callback)
+                return
+        raise KeyError(f'''no stage named {stage_name!r}''')
+
+    def start(self, metrics_interval=None):
+        """ Start every stage, and print metrics every metrics_interval seconds if given """
+        for stage in self.stages:
+            stage.start()
+        if metrics_interval:
+            self.monitor = threading.Thread(
+                target=self.log_metrics, args=(metrics_interval,), daemon=True)
+            self.monitor.start()
+        print(f'''[Info] Pipeline started: {' -> '.join(stage.name for stage in self.stages)}''')
+
+    def stop(self):
+        """ Stop every stage """
+        self.stop_event.set()
+        for stage in self.stages:
+            stage.stop()
+
+    def join(self):
+        """ Block until every stage has stopped """
+        for stage in self.stages:
+            stage.join()
+
+    def metrics(self):
+        """ Metrics of every stage by name """
+        return {stage.name: stage.metrics() for stage in self.stages}
+
+    def log_metrics(self, interval):
+        """ Print metrics periodically """
+        while not self.stop_event.wait(interval):
+            for name, metrics in self.metrics().items():
+                print(f'''[Info] Stage {name}: depth {metrics["queue_depth"]}/{metrics["queue_size"]}, ''' +
+                      f'''processed {metrics["processed"]}, dropped {metrics["dropped_downstream"]}, ''' +
+                      f'''latency mean {metrics["latency_ms_mean"]:.2f} ms, p99 {metrics["latency_ms_p99"]:.2f} ms''')
@@ -0,0 +1,96 @@
+""" module point_trail """
+import numpy as np
+
+COLOR_MODES = ('age', 'snr', 'doppler')
+# Columns of a raw frame handed to PointTrail.push()
+FRAME_COLUMNS = ('x', 'y', 'z', 'snr', 'doppler')
+# Colour map stops from low to high, RGB in 0..1 (dark blue, magenta, yellow)
+COLOR_STOPS = np.array([[0.05, 0.03, 0.53], [0.80, 0.28, 0.47], [0.94, 0.98, 0.13]])
+# Alpha of the oldest frame, the newest is opaque
+MIN_ALPHA = 0.15
+
+
+def color_lut(size=256, stops=COLOR_STOPS):
+    """ (size, 4) float32 RGBA lookup table interpolated between the colour stops """
+    positions = np.linspace(0, 1, len(stops))
+    levels = np.linspace(0, 1, size)
+    lut = np.ones((size, 4), dtype=np.float32)
+    for channel in range(3):
+        lut[:, channel] = np.interp(levels, positions, stops[:, channel])
+    return lut
+
+
+class PointTrail:
+    """ Class: PointTrail
+
+    Raw point clouds of the last num_frames frames in a fixed ring, laid out as one
+    (num_frames * max_points, 3) position array and one matching RGBA colour array for a
+    GLScatterPlotItem. Both are allocated once and updated in place: push() overwrites the
+    oldest frame's slot, unused rows of a slot are made transparent, and older frames fade out.
+    color_by 'age' colours points by frame age, 'snr' and 'doppler' by their value within
+    snr_range / doppler_range.
+    """
+
+    def __init__(self, num_frames=10, max_points=256, color_by='age', snr_range=(0, 300), doppler_range=(-2, 2)):
+        if color_by not in COLOR_MODES:
+            raise ValueError(f'''color_by must be one of {COLOR_MODES}, got {color_by!r}''')
+        self.num_frames = num_frames
+        self.max_points = max_points
+        self.color_by = color_by
+        self.value_ranges = {'snr': snr_range, 'doppler': doppler_range}
+        self.positions = np.zeros((num_frames * max_points, 3), dtype=np.float32)
+        self.colors = np.zeros((num_frames * max_points, 4), dtype=np.float32)
+        # (frame slot, point) views of the flat arrays
+        self.slot_positions = self.positions.reshape(num_frames, max_points, 3)
+        self.slot_colors = self.colors.reshape(num_frames, max_points, 4)
+        # 1 for the rows of a slot that hold a point
+        self.valid = np.zeros((num_frames, max_points), dtype=np.float32)
+        self.lut = color_lut()
+        # colour and alpha by age, age 0 is the newest frame
+        self.age_colors = color_lut(num_frames)[::-1].copy()
+        self.age_alpha = np.linspace(1, MIN_ALPHA, num_frames, dtype=np.float32)
+        # scratch arrays so push() and update_colors() do not allocate
+        self.slots = np.arange(num_frames)
+        self.ages = np.zeros(num_frames, dtype=np.intp)
+        self.aged_colors = np.zeros((num_frames, 4), dtype=np.float32)
+        self.slot_alpha = np.zeros(num_frames, dtype=np.float32)
+        self.scaled = np.zeros(max_points)
+        self.lut_index = np.zeros(max_points, dtype=np.intp)
+        self.head = -1
+        self.truncated = 0
+
+    def push(self, frame):
+        """ Add one frame of points, (points, 5) with the FRAME_COLUMNS, replacing the oldest frame """
+        self.head = (self.head + 1) % self.num_frames
+        num_points = min(len(frame), self.max_points)
+        if num_points < len(frame):
+            self.truncated += 1
+        self.slot_positions[self.head, :num_points] = frame[:num_points, :3]
+        self.valid[self.head, :num_points] = 1
+        self.valid[self.head, num_points:] = 0
+        if self.color_by != 'age' and num_points:
+            low, high = self.value_ranges[self.color_by]
+            scaled = self.scaled[:num_points]
+            np.subtract(frame[:num_points, FRAME_COLUMNS.index(self.color_by)], low, out=scaled)
+            scaled *= (len(self.lut) - 1) / (high - low)
+            np.clip(scaled, 0, len(self.lut) - 1, out=scaled)
+            lut_index = self.lut_index[:num_points]
+            np.copyto(lut_index, scaled, casting='unsafe')
+            np.take(self.lut, lut_index, axis=0, out=self.slot_colors[self.head, :num_points])
+        self.update_colors()
+
+    def update_colors(self):
+        """ Recolour every slot for its new age, hide the unused rows """
+        np.subtract(self.head, self.slots, out=self.ages)
+        np.mod(self.ages, self.num_frames, out=self.ages)
+        if self.color_by == 'age':
+            np.take(self.age_colors, self.ages, axis=0, out=self.aged_colors)
+            self.slot_colors[:] = self.aged_colors[:, np.newaxis]
+        np.take(self.age_alpha, self.ages, out=self.slot_alpha)
+        np.multiply(self.valid, self.slot_alpha[:, np.newaxis], out=self.slot_colors[:, :, 3])
+
+    def reset(self):
+        """ Forget every frame """
+        self.valid.fill(0)
+        self.colors[:, 3] = 0
+        self.head = -1
@@ -1,14 +1,36 @@
 """ module radar """
 import os
+import re
 import time
 import csv
 import serial
 import numpy as np
-import pandas as pd
 from modules.parser_mmw_demo import parser_one_mmw_demo_output_packet
+from modules.frame_sync import FrameSynchronizer
+from modules.capture import RecordingSerial, ReplaySerial
+from modules.gesture_window import GestureWindow
+from modules.features import FeatureExtractor
+from modules.interpolation import interpolate_gaps
+from modules.render import get_renderer
+from modules.gesture_store import GestureStore
 import matplotlib.pyplot as plt
 
 
+def render_worker_initializer():
+    """ Use a non-interactive backend in render worker processes """
+    plt.switch_backend('Agg')
+
+
+# File name prefix of the rendered gesture images
+IMAGE_FILE_PREFIX = 'feng_data'
+
+
+def log_render_error(future):
+    """ Print a failed render job, its images would otherwise go missing without a trace """
+    if future.exception() is not None:
+        print(f'''[Error] Render gesture images: {future.exception()!r}''')
+
+
 class Radar:
     """ Class: Radar """
 
@@ -17,42 +39,72 @@ class Radar:
         self.detection = 0
         self.num_tx_ant = 0
         self.max_buffer_size = 2**15
-        self.byte_buffer = np.zeros(2**15, dtype='uint8')
-        self.byte_buffer_length = 0
-        self.magic_word = [2, 1, 4, 3, 6, 5, 8, 7]
-        self.word = [1, 2**8, 2**16, 2**24]
+        self.frame_sync = FrameSynchronizer(self.max_buffer_size)
         self.wave_start_pt = np.zeros((1, 3))
         self.wave_last_pt = np.zeros((1, 3))
         self.wave_end_pt = np.zeros((1, 3))
         self.wave_start_time = 0
         self.wave_end_time = 0
         self.tmp_record_arr = np.zeros((1, 4))
+        self.feature_extractor = FeatureExtractor()
+        # GestureStore to append gestures to, None saves one .npy file per gesture
+        self.gesture_store = None
+        # Next .npy file number, found once from the files already saved
+        self.next_file_number = None
         self.radar_parameters = {}
+        # TLV types decoded by the parser, None decodes all of them
+        self.tlv_types = None
         # Number of data points in each window
-        # Buffer to store data points for each window
-        self.window_buffer = np.ndarray((0, 9))
         self.WINDOW_SIZE = 25
+        # Preallocated buffer to store data points for each window
+        self.window = GestureWindow(self.WINDOW_SIZE)
         print('''[Info] Initialize Radar class ''')
 
-    def start(self, radar_cli_port, radar_data_port, radar_config_file_path, window_size=25):
-        """ Radar.start """
-        radar_config = []
+    def start(self, radar_cli_port, radar_data_port, radar_config_file_path, window_size=25, capture_file_dir=None):
+        """ Radar.start
+
+        With capture_file_dir set, every byte read from the data port is also recorded
+        to a timestamped capture file in that directory (see modules.capture).
+        """
         self.WINDOW_SIZE = window_size
+        self.window = GestureWindow(self.WINDOW_SIZE)
         cli_serial = serial.Serial(radar_cli_port, 115200)
         data_serial = serial.Serial(radar_data_port, 921600)
         # Read the configuration file and send it to the board
-        with open(radar_config_file_path, encoding='utf-8') as radar_config_file:
-            for line in radar_config_file:
-                radar_config.append(line.rstrip('\r\n'))
+        radar_config = self.read_radar_config(radar_config_file_path)
         # Write the radar configuration to the radar device
         for line in radar_config:
             cli_serial.write((line+'\n').encode())
             time.sleep(0.01)
 
         self.radar_parameters = self.parse_radar_config(radar_config)
+        if capture_file_dir:
+            data_serial = RecordingSerial(data_serial, capture_file_dir)
         print('''[Info] Radar device starting''')
         return cli_serial, data_serial
 
+    def start_replay(self, capture_file_path, radar_config_file_path, speed=1.0, window_size=25):
+        """ Replay a capture file instead of opening the radar ports, no board needed.
+
+        radar_config_file_path must be the config the capture was recorded with.
+        Returns (None, data_serial) like start().
+        """
+        self.WINDOW_SIZE = window_size
+        self.window = GestureWindow(self.WINDOW_SIZE)
+        self.radar_parameters = self.parse_radar_config(
+            self.read_radar_config(radar_config_file_path))
+        data_serial = ReplaySerial(capture_file_path, speed)
+        print('''[Info] Radar replay starting''')
+        return None, data_serial
+
+    def read_radar_config(self, radar_config_file_path):
+        """ Read the configuration file lines """
+        radar_config = []
+        with open(radar_config_file_path, encoding='utf-8') as radar_config_file:
+            for line in radar_config_file:
+                radar_config.append(line.rstrip('\r\n'))
+        return radar_config
+
     def parse_radar_config(self, radar_config):
         """ Parsing radar config """
         radar_parameters = {}
@@ -101,187 +153,123 @@ class Radar:
 
     def read_and_parse_radar_data(self, data_serial):
         """ read and parse radar data """
+        readBuffer = data_serial.read(data_serial.in_waiting)
+        self.frame_sync.feed(readBuffer)
+
+        # The synchronizer hands out one complete packet starting at the magic word
+        frame = self.frame_sync.next_frame()
+        if frame is None:
+            return 0, 0, {}
+
+        return self.parse_frame(frame)
+
+    def iter_frames(self, data_serial, max_backlog=None):
+        """ Read once from the data port and yield the detection object of every complete frame buffered.
+
+        With max_backlog set, older frames beyond the newest max_backlog are dropped without being
+        parsed, so latency stays bounded when the caller falls behind.
+        """
+        readBuffer = data_serial.read(data_serial.in_waiting)
+        return self.iter_chunk_frames(readBuffer, max_backlog)
+
+    def iter_chunk_frames(self, read_buffer, max_backlog=None):
+        """ Buffer bytes that were already read, e.g. by SerialReader, and yield every complete frame like iter_frames """
+        self.frame_sync.feed(read_buffer)
+
+        if max_backlog is not None:
+            num_dropped = self.frame_sync.drop_stale(max_backlog)
+            if num_dropped and self.debug:
+                print(f"[Info] Dropped {num_dropped} stale frames")
+
+        for frame in self.frame_sync.frames():
+            dataOK, _, detObj = self.parse_frame(frame)
+            if dataOK:
+                yield detObj
+
+    def parse_frame(self, frame):
+        """ Parse one complete mmw demo output packet """
         # Initialize variables
-        magicOK = 0  # Checks if magic number has been read
         dataOK = 0  # Checks if the data has been read correctly
         frameNumber = 0
         detObj = {}
 
-        readBuffer = data_serial.read(data_serial.in_waiting)
-        byteVec = np.frombuffer(readBuffer, dtype='uint8')
-        byteCount = len(byteVec)
-
-        # Check that the buffer is not full, and then add the data to the buffer
-        if (self.byte_buffer_length + byteCount) < self.max_buffer_size:
-            self.byte_buffer[self.byte_buffer_length:self.byte_buffer_length +
-                             byteCount] = byteVec[:byteCount]
-            self.byte_buffer_length = self.byte_buffer_length + byteCount
-
-        # Check that the buffer has some data
-        if self.byte_buffer_length > 16:
-
-            # Check for all possible locations of the magic word
-            possibleLocs = np.where(self.byte_buffer == self.magic_word[0])[0]
-
-            # Confirm that is the beginning of the magic word and store the index in startIdx
-            startIdx = []
-            for loc in possibleLocs:
-                check = self.byte_buffer[loc:loc+8]
-                if np.all(check == self.magic_word):
-                    startIdx.append(loc)
-
-            # Check that startIdx is not empty
-            if startIdx:
-
-                # Remove the data before the first start index
-                if startIdx[0] > 0 and startIdx[0] < self.byte_buffer_length:
-                    self.byte_buffer[:self.byte_buffer_length-startIdx[0]
-                                     ] = self.byte_buffer[startIdx[0]:self.byte_buffer_length]
-                    self.byte_buffer[self.byte_buffer_length-startIdx[0]:] = np.zeros(
-                        len(self.byte_buffer[self.byte_buffer_length-startIdx[0]:]), dtype='uint8')
-                    self.byte_buffer_length = self.byte_buffer_length - \
-                        startIdx[0]
-
-                # Check that there have no errors with the byte buffer length
-                if self.byte_buffer_length < 0:
-                    self.byte_buffer_length = 0
-
-                # Read the total packet length
-                totalPacketLen = np.matmul(
-                    self.byte_buffer[12:12+4], self.word)
-                # Check that all the packet has been read
-                if (self.byte_buffer_length >= totalPacketLen) and (self.byte_buffer_length != 0):
-                    magicOK = 1
-
-        rangeArray = []
-        dopplerArray = []
-        rangeDoppler = []
-        # If magicOK is equal to 1 then process the message
-        if magicOK:
-            # Read the entire buffer
-            readNumBytes = self.byte_buffer_length
-            if (self.debug):
-                print("readNumBytes: ", readNumBytes)
-            allBinData = self.byte_buffer
-            if (self.debug):
-                print("allBinData: ",
-                      allBinData[0], allBinData[1], allBinData[2], allBinData[3])
-
-            # init local variables
-            totalBytesParsed = 0
-            numFramesParsed = 0
-
-            # parser_one_mmw_demo_output_packet extracts only one complete frame at a time
-            # so call this in a loop till end of file
-            #
-            # parser_one_mmw_demo_output_packet function already prints the
-            # parsed data to stdio. So showcasing only saving the data to arrays
-            # here for further custom processing
-            parser_result, \
-                headerStartIndex,  \
-                totalPacketNumBytes, \
-                numDetObj,  \
-                numTlv,  \
-                subFrameNumber,  \
-                detectedX_array,  \
-                detectedY_array,  \
-                detectedZ_array,  \
-                detectedV_array,  \
-                detectedRange_array,  \
-                detectedAzimuth_array,  \
-                detectedElevation_array,  \
-                detectedSNR_array,  \
-                detectedNoise_array, \
-                rangeArray, \
-                dopplerArray, \
-                rangeDoppler = parser_one_mmw_demo_output_packet(
-                    allBinData[totalBytesParsed::1], readNumBytes-totalBytesParsed, self.radar_parameters, self.debug)
-
-            if (self.debug):
-                print("Parser result: ", parser_result)
-            if (parser_result == 0):
-                totalBytesParsed += (headerStartIndex+totalPacketNumBytes)
-                numFramesParsed += 1
-
-                if (self.debug):
-                    print("totalBytesParsed: ", totalBytesParsed)
-                ##################################################################################
-                # TODO: use the arrays returned by above parser as needed.
-                # For array dimensions, see help(parser_one_mmw_demo_output_packet)
-                # help(parser_one_mmw_demo_output_packet)
-                ##################################################################################
-
-                detObj = {"numObj": numDetObj, "range": detectedRange_array, "doppler": detectedV_array,
-                          "x": detectedX_array, "y": detectedY_array, "z": detectedZ_array,
-                          "elevation": detectedElevation_array, "azimuth": detectedAzimuth_array, "snr": detectedSNR_array,
-                          "rangeArray": rangeArray, "dopplerArray": dopplerArray,
-                          "rangeDoppler": rangeDoppler, "doppler": detectedV_array,
-                          "snr": detectedSNR_array,  "noise": detectedNoise_array
-                          }
-
-                dataOK = 1
-
-            shiftSize = totalPacketNumBytes
-            self.byte_buffer[:self.byte_buffer_length -
-                             shiftSize] = self.byte_buffer[shiftSize:self.byte_buffer_length]
-            self.byte_buffer[self.byte_buffer_length - shiftSize:] = np.zeros(
-                len(self.byte_buffer[self.byte_buffer_length - shiftSize:]), dtype='uint8')
-            self.byte_buffer_length = self.byte_buffer_length - shiftSize
-
-            # Check that there are no errors with the buffer length
-            if self.byte_buffer_length < 0:
-                self.byte_buffer_length = 0
-            # All processing done; Exit
-            if (self.debug):
-                print("numFramesParsed: ", numFramesParsed)
+        allBinData = np.frombuffer(frame, dtype='uint8')
+        readNumBytes = len(allBinData)
+        if (self.debug):
+            print("readNumBytes: ", readNumBytes)
+            print("allBinData: ",
+                  allBinData[0], allBinData[1], allBinData[2], allBinData[3])
+
+        # parser_one_mmw_demo_output_packet extracts only one complete frame at a time
+        #
+        # parser_one_mmw_demo_output_packet function already prints the
+        # parsed data to stdio. So showcasing only saving the data to arrays
+        # here for further custom processing
+        parser_result, \
+            headerStartIndex,  \
+            totalPacketNumBytes, \
+            numDetObj,  \
+            numTlv,  \
+            subFrameNumber,  \
+            detectedX_array,  \
+            detectedY_array,  \
+            detectedZ_array,  \
+            detectedV_array,  \
+            detectedRange_array,  \
+            detectedAzimuth_array,  \
+            detectedElevation_array,  \
+            detectedSNR_array,  \
+            detectedNoise_array, \
+            rangeArray, \
+            dopplerArray, \
+            rangeDoppler, \
+            tlvs, \
+            headerFrameNumber, \
+            timeCpuCycles = parser_one_mmw_demo_output_packet(
+                allBinData, readNumBytes, self.radar_parameters, self.debug, self.tlv_types, headerStartIndex=0)
+
+        if (self.debug):
+            print("Parser result: ", parser_result)
+            print("Frame sync: ", self.frame_sync.stats())
+        if (parser_result == 0):
+            ##################################################################################
+            # TODO: use the arrays returned by above parser as needed.
+            # For array dimensions, see help(parser_one_mmw_demo_output_packet)
+            # help(parser_one_mmw_demo_output_packet)
+            ##################################################################################
+
+            # frame number and time stamp come from the header decode in parser_helper
+            frameNumber = headerFrameNumber
+
+            detObj = {"numObj": numDetObj, "range": detectedRange_array, "doppler": detectedV_array,
+                      "x": detectedX_array, "y": detectedY_array, "z": detectedZ_array,
+                      "elevation": detectedElevation_array, "azimuth": detectedAzimuth_array, "snr": detectedSNR_array,
+                      "rangeArray": rangeArray, "dopplerArray": dopplerArray,
+                      "rangeDoppler": rangeDoppler, "doppler": detectedV_array,
+                      "snr": detectedSNR_array,  "noise": detectedNoise_array,
+                      "tlvs": tlvs, "frameNumber": frameNumber,
+                      "timeCpuCycles": timeCpuCycles, "subFrameNumber": subFrameNumber
+                      }
+
+            dataOK = 1
 
         return dataOK, frameNumber, detObj
 
+    @property
+    def window_buffer(self):
+        """ Frames recorded in the current gesture window, a view into self.window """
+        return self.window.view()
+
     def find_average_point(self, data_ok, detection_obj):
-        """ find average point """
-        x_value = 0
-        y_value = 0
-        z_value = 0
-        azi_vals = 0
-        eln_vals = 0
-        num_points = 0
-        snr_max = 250
-        zero_pt = np.zeros((1, 9))  # for initial zero value
+        """ find average point
 
+        Returns the (1, 9) average point of the points with non-zero Doppler, zeros when there is none.
+        The row belongs to self.feature_extractor and is overwritten by the next call, copy it to keep it.
+        """
         # get average point per frame
         if data_ok:
-            pos_pt = np.zeros((detection_obj["numObj"], 9))
-            avg_pt = zero_pt
-
-            pos_pt = np.array(list(map(tuple, np.stack([
-                detection_obj["x"], detection_obj["y"], detection_obj["z"], detection_obj["doppler"],
-                detection_obj["range"], detection_obj["snr"], detection_obj["azimuth"], detection_obj["elevation"]], axis=1))))
-
-            # 取出符合條件的索引
-            # indices = np.where(pos_pt[:, 5] > snr_max)
-            indices = np.where(pos_pt[:, 3] != 0)
-            x_vals, y_vals, z_vals, doppler_vals, range_vals, snr_vals, azi_vals, eln_vals = pos_pt[
-                indices, :9].T
-
-            # 計算平均值
-            x_value = np.mean(x_vals)
-            y_value = np.mean(y_vals)
-            z_value = np.mean(z_vals)
-            doppler_value = np.mean(doppler_vals)
-            range_value = np.mean(range_vals)
-            snr_value = np.mean(snr_vals)
-            azi_vals = np.mean(azi_vals)
-            eln_vals = np.mean(eln_vals)
-            num_points += len(indices[0])
-            save_point = 0
-
-            if num_points > 0:
-                avg_pt = np.array([[x_value, y_value, z_value, doppler_value,
-                                  range_value, snr_value, azi_vals, eln_vals, time.time()]])
-                return avg_pt
-            else:
-                avg_pt = zero_pt
-                return avg_pt
+            self.feature_extractor.extract(detection_obj)
+            return self.feature_extractor.average_point
 
     # def data_to_numpy(self, npy_file_dir, npy_file_name):
     #     filecount = len(os.listdir(npy_file_dir))
@@ -293,63 +281,89 @@ class Radar:
     #     np.save(filename, new_arr)
     #     print(f"Gesture data {filecount} has been saved.")
 
-    def data_to_numpy(self, npy_file_dir, npy_file_name, pic_file_dir):
-        filecount = len(os.listdir(npy_file_dir)) - 1
-        filename = f"{npy_file_dir}/{npy_file_name}_{filecount}.npy"
-
-        data_frame = pd.DataFrame(self.window_buffer, columns=[
-                                  'x', 'y', 'z', 'doppler', 'range', 'snr', 'azimuth', 'elevation', 'time']).drop('time', axis=1)
-
-        data_frame.replace(0, np.nan, inplace=True)
-
-        dataframe_interpolated = data_frame.interpolate(
-            method='linear', limit_direction='both')
-
-        start_index = data_frame.first_valid_index()
-        end_index = data_frame.last_valid_index()
-
-        if start_index is not None:
-            dataframe_interpolated.iloc[:start_index] = data_frame.iloc[:start_index]
-        if end_index is not None:
-            dataframe_interpolated.iloc[end_index +
-                                        1:] = data_frame.iloc[end_index + 1:]
-
-        interpolated_npy = dataframe_interpolated.fillna(0).to_numpy()
-        np.save(filename, interpolated_npy)
+    def data_to_numpy(self, npy_file_dir, npy_file_name, pic_file_dir, window=None, render_pool=None):
+        """ Interpolate and save a gesture window, then render its feature images.
+
+        window defaults to self.window_buffer. With render_pool (a ProcessPoolExecutor started with
+        render_worker_initializer) the images are rendered in the background.
+        With self.gesture_store set the gesture is appended to the store and its id numbers the images.
+        """
+        if window is None:
+            window = self.window_buffer
+
+        # Frames without detections are all zero, fill them from their neighbours and drop the time column
+        interpolated_npy = interpolate_gaps(window[:, :8])
+        if self.gesture_store is not None:
+            filecount = self.gesture_store.append(interpolated_npy)
+        else:
+            filecount = self.allocate_file_number(npy_file_dir, npy_file_name)
+            filename = f"{npy_file_dir}/{npy_file_name}_{filecount}.npy"
+            np.save(filename, interpolated_npy)
         print(f"Gesture data {filecount} has been saved.")
 
-        self.plot_data(interpolated_npy, filecount, pic_file_dir)
-
-    def plot_data(self, np_array, filecount, pic_file_dir):
+        if render_pool is None:
+            self.plot_data(interpolated_npy, filecount, pic_file_dir)
+        else:
+            future = render_pool.submit(self.plot_data, interpolated_npy, filecount, pic_file_dir)
+            future.add_done_callback(log_render_error)
+
+    def open_gesture_store(self, npy_file_dir, npy_file_name, pic_file_dir):
+        """ Save gestures to a GestureStore in npy_file_dir from now on.
+
+        Store ids number the images, so ids already used by legacy .npy files or images are skipped
+        and switching backends never overwrites an existing image.
+        The store is write-only for the other tools for now: read_npy.py, trans_npy2pic.py, auto_read.py,
+        Utils.load_radar_data and RadarDataset still only read .npy files.
+        """
+        store = GestureStore(npy_file_dir)
+        npy_pattern = re.compile(rf'^{re.escape(npy_file_name)}_(\d+)\.npy$')
+        image_pattern = re.compile(rf'^{re.escape(IMAGE_FILE_PREFIX)}_(\d+)_\w+\.png$')
+        numbers = [int(match.group(1)) for match in map(npy_pattern.match, os.listdir(npy_file_dir)) if match]
+        if os.path.isdir(pic_file_dir):
+            numbers += [int(match.group(1)) for match in map(image_pattern.match, os.listdir(pic_file_dir)) if match]
+        if numbers and max(numbers) >= len(store):
+            store.reserve_ids(max(numbers) + 1)
+            print(f'''[Info] GestureStore ids below {max(numbers) + 1} are used by existing files, next id {len(store)}''')
+        print(f'''[Warning] Gestures go to the GestureStore in {npy_file_dir}, read_npy.py, trans_npy2pic.py, '''
+              f'''auto_read.py and RadarDataset only read .npy files and will not see them''')
+        self.gesture_store = store
+        return store
+
+    def allocate_file_number(self, npy_file_dir, npy_file_name):
+        """ Number of the next .npy file, one past the highest number on disk.
+
+        The directory is scanned on the first call only, so numbering stays O(1) and deleted files
+        never make a number collide with an existing one.
+        """
+        if self.next_file_number is None:
+            pattern = re.compile(rf'^{re.escape(npy_file_name)}_(\d+)\.npy$')
+            numbers = [int(match.group(1)) for match in map(pattern.match, os.listdir(npy_file_dir)) if match]
+            self.next_file_number = max(numbers) + 1 if numbers else 0
+        file_number = self.next_file_number
+        self.next_file_number += 1
+        return file_number
+
+    @staticmethod
+    def plot_data(np_array, filecount, pic_file_dir):
+        """ Render the range, Doppler, azimuth and elevation images of one gesture.
+
+        Uses the figure of this process's FeatureRenderer, so repeated calls (e.g. in a render pool
+        worker) only update the line data.
+        """
         # origin
         # y_ranges = {'Range': (-0.2, 0.8), 'Doppler': (-2.5, 2.5),
         #             'Azimuth': (-60, 60), 'Elevation': (-60, 60)}
         y_ranges = {'Range': (-10, 10), 'Doppler': (-2.5, 2.5),
                     'Azimuth': (-100, 100), 'Elevation': (-60, 60)}
-        for param, y_range in y_ranges.items():
-            index = {'Range': 4, 'Doppler': 3,
-                     'Azimuth': 6, 'Elevation': 7}[param]
-            self.plot_parameter_over_time(
-                np_array, index, param, filecount, y_range, pic_file_dir)
-
-    def plot_parameter_over_time(self, np_array, param_index, param_name, number, y_range, pic_file_dir):
-        times = np.arange(np_array.shape[0])
-        values = np_array[:, param_index]
-
-        background_color = (0.8, 0.8, 0.8)
-        line_color = (0.2, 0.2, 0.2)
-
-        plt.figure(figsize=(4, 4), facecolor=background_color)
-        plt.plot(times, values, linewidth=3, color=line_color)
-        plt.ylim(y_range)
-        plt.axis('off')
-        plt.gca().set_position([0, 0, 1, 1])
-        plt.gca().set_aspect('auto')
-
-        img_filename = f'{pic_file_dir}/feng_data_{number}_{param_name.lower()}.png'
-        # plt.savefig(f'{pic_file_dir}/aimage_{param_name.lower()}.png', bbox_inches='tight', pad_inches=0, dpi=80)
-        plt.savefig(img_filename, bbox_inches='tight', pad_inches=0, dpi=80)
-        plt.close()
+        for img_filename in get_renderer().render_gesture(np_array, filecount, pic_file_dir, IMAGE_FILE_PREFIX, y_ranges):
+            print(
+                f"Gesture data {filecount} has been saved as image: {img_filename}.")
+
+    @staticmethod
+    def plot_parameter_over_time(np_array, param_index, param_name, number, y_range, pic_file_dir):
+        """ Render one parameter of a gesture """
+        img_filename = f'{pic_file_dir}/{IMAGE_FILE_PREFIX}_{number}_{param_name.lower()}.png'
+        get_renderer().render(np_array[:, param_index], y_range, img_filename)
         print(
             f"Gesture data {number} has been saved as image: {img_filename}.")
 
@@ -399,7 +413,8 @@ class Radar:
                 writer.writerow(window)
 
     def sliding_window(self, data):
-        self.window_buffer = np.row_stack((self.window_buffer, data[0]))
+        """ Append one frame to the gesture window in place """
+        self.window.append(data[0])
 
     def change_time_unit(self, tmp_arr):
         """ change time unit """
@@ -0,0 +1,197 @@
+""" module render """
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Column of each rendered parameter in a saved gesture
+PARAMETER_INDICES = {'Range': 4, 'Doppler': 3, 'Azimuth': 6, 'Elevation': 7}
+Y_RANGES = {'Range': (-10, 10), 'Doppler': (-2.5, 2.5), 'Azimuth': (-100, 100), 'Elevation': (-60, 60)}
+BACKGROUND_COLOR = (0.8, 0.8, 0.8)
+LINE_COLOR = (0.2, 0.2, 0.2)
+FIGURE_INCHES = 4
+DPI = 80
+# matplotlib's default autoscale margin, kept so images match the plt.plot output
+X_MARGIN = 0.05
+
+# 3 pt matplotlib line width in pixels at DPI
+LINE_WIDTH_PX = 3 * DPI / 72
+# LineRasterizer draws at this multiple of the image size and downsamples, which matches the
+# anti-aliased matplotlib line more closely than OpenCV's 1x anti-aliasing
+SUPERSAMPLE = 2
+# fixed-point fraction bits for OpenCV's sub-pixel coordinates
+SHIFT_BITS = 4
+
+NPY_NUMBER_PATTERN = re.compile(r'_(\d+)\.npy$')
+
+
+class FeatureRenderer:
+    """ Class: FeatureRenderer
+
+    Renders gesture parameters over time as 320x320 line images. One figure, axes and line are
+    created once and only the line data and limits change per image. The figure uses the Agg
+    canvas directly, without pyplot, so it is safe outside the main thread.
+    """
+
+    def __init__(self, dpi=DPI):
+        self.dpi = dpi
+        self.figure = Figure(figsize=(FIGURE_INCHES, FIGURE_INCHES), dpi=dpi, facecolor=BACKGROUND_COLOR)
+        FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_axes([0, 0, 1, 1])
+        self.axes.axis('off')
+        self.axes.set_aspect('auto')
+        (self.line,) = self.axes.plot([], [], linewidth=3, color=LINE_COLOR)
+
+    def render(self, values, y_range, img_filename):
+        """ Draw one parameter and save it as an image """
+        num_frames = len(values)
+        self.line.set_data(np.arange(num_frames), values)
+        margin = X_MARGIN * max(num_frames - 1, 1)
+        self.axes.set_xlim(-margin, num_frames - 1 + margin)
+        self.axes.set_ylim(y_range)
+        self.figure.savefig(img_filename, dpi=self.dpi, facecolor=BACKGROUND_COLOR)
+
+    def render_gesture(self, np_array, number, pic_file_dir, file_prefix, y_ranges=None):
+        """ Draw every parameter of one gesture, returns the image paths """
+        y_ranges = y_ranges or Y_RANGES
+        img_filenames = image_paths(number, pic_file_dir, file_prefix, y_ranges)
+        for (param, y_range), img_filename in zip(y_ranges.items(), img_filenames):
+            self.render(np_array[:, PARAMETER_INDICES[param]], y_range, img_filename)
+        return img_filenames
+
+
+class LineRasterizer:
+    """ Class: LineRasterizer
+
+    Draws the same line images as FeatureRenderer straight into uint8 arrays with OpenCV,
+    without a matplotlib figure: grey background, anti-aliased polyline, same y ranges, x margins
+    and line width. Images are single-channel grey; rasterize_gesture() stacks every parameter
+    into one (parameters, size, size) tensor for training or live inference, and PNG files are
+    only written by render()/render_gesture().
+    """
+
+    def __init__(self, size=FIGURE_INCHES * DPI, line_width=LINE_WIDTH_PX, supersample=SUPERSAMPLE):
+        self.size = size
+        self.supersample = supersample
+        self.canvas = np.empty((size * supersample, size * supersample), dtype=np.uint8)
+        self.thickness = max(1, int(line_width * supersample))
+        self.background = int(round(BACKGROUND_COLOR[0] * 255))
+        self.color = int(round(LINE_COLOR[0] * 255))
+        self.x_cache = {}
+
+    def x_coordinates(self, num_frames):
+        """ Canvas x of every frame, with matplotlib's autoscale margin """
+        if num_frames not in self.x_cache:
+            margin = X_MARGIN * max(num_frames - 1, 1)
+            span = num_frames - 1 + 2 * margin
+            self.x_cache[num_frames] = (np.arange(num_frames) + margin) / span * len(self.canvas) - 0.5
+        return self.x_cache[num_frames]
+
+    def rasterize(self, values, y_range, out=None):
+        """ One parameter as a (size, size) uint8 image, written into out when given """
+        canvas_size = len(self.canvas)
+        y_min, y_max = y_range
+        y = (1 - (np.asarray(values, dtype=float) - y_min) / (y_max - y_min)) * canvas_size - 0.5
+        points = np.stack((self.x_coordinates(len(y)), y), axis=1)
+        # keep far out-of-range values inside OpenCV's int32 fixed-point coordinates
+        np.clip(points, -4 * canvas_size, 5 * canvas_size, out=points)
+        points = np.round(points * (1 << SHIFT_BITS)).astype(np.int32)
+
+        self.canvas.fill(self.background)
+        cv2.polylines(self.canvas, [points], False, self.color, self.thickness, cv2.LINE_AA, SHIFT_BITS)
+        if out is None:
+            out = np.empty((self.size, self.size), dtype=np.uint8)
+        if self.supersample == 1:
+            out[:] = self.canvas
+        else:
+            cv2.resize(self.canvas, (self.size, self.size), dst=out, interpolation=cv2.INTER_AREA)
+        return out
+
+    def rasterize_gesture(self, np_array, y_ranges=None, out=None):
+        """ Every parameter of one gesture as a (parameters, size, size) uint8 tensor """
+        y_ranges = y_ranges or Y_RANGES
+        if out is None:
+            out = np.empty((len(y_ranges), self.size, self.size), dtype=np.uint8)
+        for index, (param, y_range) in enumerate(y_ranges.items()):
+            self.rasterize(np_array[:, PARAMETER_INDICES[param]], y_range, out[index])
+        return out
+
+    def render(self, values, y_range, img_filename):
+        """ Draw one parameter and save it as a PNG """
+        cv2.imwrite(img_filename, self.rasterize(values, y_range))
+
+    def render_gesture(self, np_array, number, pic_file_dir, file_prefix, y_ranges=None):
+        """ Draw every parameter of one gesture to PNG files, returns the image paths """
+        y_ranges = y_ranges or Y_RANGES
+        img_filenames = image_paths(number, pic_file_dir, file_prefix, y_ranges)
+        for image, img_filename in zip(self.rasterize_gesture(np_array, y_ranges), img_filenames):
+            cv2.imwrite(img_filename, image)
+        return img_filenames
+
+
+RENDER_ENGINES = {'matplotlib': FeatureRenderer, 'opencv': LineRasterizer}
+# One renderer per engine and process, created on first use
+renderers = {}
+
+
+def get_renderer(engine='matplotlib'):
+    """ The renderer of the current process, 'matplotlib' (FeatureRenderer) or 'opencv' (LineRasterizer) """
+    if engine not in renderers:
+        renderers[engine] = RENDER_ENGINES[engine]()
+    return renderers[engine]
+
+
+def image_paths(number, pic_file_dir, file_prefix, y_ranges=None):
+    """ Image file of every parameter of one gesture """
+    return [f'''{pic_file_dir}/{file_prefix}_{number}_{param.lower()}.png''' for param in (y_ranges or Y_RANGES)]
+
+
+def is_up_to_date(npy_path, img_filenames):
+    """ True when every image exists and is newer than the gesture file """
+    npy_mtime = os.path.getmtime(npy_path)
+    return all(os.path.exists(path) and os.path.getmtime(path) >= npy_mtime for path in img_filenames)
+
+
+def render_npy_file(task):
+    """ Pool job: render one .npy gesture file, returns the number of images """
+    npy_path, number, pic_file_dir, file_prefix, y_ranges, engine = task
+    return len(get_renderer(engine).render_gesture(np.load(npy_path), number, pic_file_dir, file_prefix, y_ranges))
+
+
+def render_npy_dir(npy_file_dir, pic_file_dir, file_prefix, y_ranges=None, workers=None, force=False,
+                   engine='matplotlib'):
+    """ Render every {name}_{number}.npy gesture in a directory across a process pool.
+
+    Gestures whose images are all newer than the .npy file are skipped unless force is set.
+    engine 'opencv' rasterizes with LineRasterizer instead of matplotlib.
+    Returns {"gestures", "skipped", "images", "seconds", "images_per_sec"}.
+    """
+    start_time = time.perf_counter()
+    tasks = []
+    skipped = 0
+    for npy_file in sorted(os.listdir(npy_file_dir)):
+        match = NPY_NUMBER_PATTERN.search(npy_file)
+        if not match:
+            continue
+        npy_path = os.path.join(npy_file_dir, npy_file)
+        number = int(match.group(1))
+        if not force and is_up_to_date(npy_path, image_paths(number, pic_file_dir, file_prefix, y_ranges)):
+            skipped += 1
+            continue
+        tasks.append((npy_path, number, pic_file_dir, file_prefix, y_ranges, engine))
+
+    num_images = 0
+    if tasks:
+        workers = workers or os.cpu_count() or 1
+        # several gestures per job so the per-job overhead stays small next to rendering
+        chunksize = max(1, min(32, len(tasks) // (4 * workers)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            num_images = sum(pool.map(render_npy_file, tasks, chunksize=chunksize))
+
+    seconds = time.perf_counter() - start_time
+    return {"gestures": len(tasks), "skipped": skipped, "images": num_images, "seconds": seconds,
+            "images_per_sec": num_images / seconds if seconds > 0 else 0.0}
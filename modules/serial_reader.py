@@ -0,0 +1,58 @@
+""" module serial_reader """
+import queue
+import threading
+from modules.pipeline import put_drop_oldest
+
+
+class SerialReader(threading.Thread):
+    """ Class: SerialReader
+
+    Reader stage that blocks on the data port and pushes raw chunks into a bounded queue,
+    so the parser sleeps until bytes arrive instead of polling in_waiting.
+    """
+
+    def __init__(self, data_serial, frame_periodicity, max_chunks=64):
+        threading.Thread.__init__(self, daemon=True)
+        self.data_serial = data_serial
+        # Block for at most two frame periods (ms) so stop() is noticed quickly
+        self.data_serial.timeout = 2 * frame_periodicity / 1000
+        self.chunks = queue.Queue(max_chunks)
+        self.stop_event = threading.Event()
+        self.bytes_read = 0
+        self.chunks_dropped = 0
+        self.timeouts = 0
+        print(f'''[Info] Initialize SerialReader, timeout: {self.data_serial.timeout} s''')
+
+    def run(self):
+        """ Read loop """
+        while not self.stop_event.is_set():
+            # Blocks until the first byte arrives or the timeout expires
+            chunk = self.data_serial.read(1)
+            if not chunk:
+                self.timeouts += 1
+                continue
+            waiting = self.data_serial.in_waiting
+            if waiting:
+                chunk += self.data_serial.read(waiting)
+            self.bytes_read += len(chunk)
+            self.put(chunk)
+
+    def put(self, chunk):
+        """ Queue a chunk, dropping the oldest one when the parser falls behind """
+        self.chunks_dropped += put_drop_oldest(self.chunks, chunk)
+
+    def get(self, timeout=None):
+        """ Block until data arrives and return everything queued as one bytes object, b'' on timeout """
+        try:
+            chunks = [self.chunks.get(timeout=timeout)]
+        except queue.Empty:
+            return b''
+        while True:
+            try:
+                chunks.append(self.chunks.get_nowait())
+            except queue.Empty:
+                return b''.join(chunks)
+
+    def stop(self):
+        """ Ask the read loop to exit after the current read """
+        self.stop_event.set()
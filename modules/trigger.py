@@ -0,0 +1,228 @@
+""" module trigger """
+import numpy as np
+
+
+class RunningWindow:
+    """ Class: RunningWindow
+
+    Circular buffer of the last length values with a running sum, so push and mean are O(1).
+    The sum is recomputed exactly every time the buffer wraps to stop float drift.
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self.buffer = np.zeros(length)
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, value):
+        """ Add a value, dropping the oldest one when full """
+        if self.count == self.length:
+            self.total -= self.buffer[self.index]
+        else:
+            self.count += 1
+        self.buffer[self.index] = value
+        self.total += value
+        self.index += 1
+        if self.index == self.length:
+            self.index = 0
+            self.total = float(self.buffer[:self.count].sum())
+
+    def mean(self):
+        """ Mean of the buffered values, None when empty """
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    def reset(self):
+        """ Forget every value """
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+
+
+class StaLtaTrigger:
+    """ Class: StaLtaTrigger
+
+    Short-term / long-term average trigger with hysteresis: it turns on when STA/LTA rises
+    above on_ratio and off when it falls below off_ratio. offset is added to every value
+    so features near zero (e.g. SNR of an empty frame) still give a usable ratio.
+    """
+
+    def __init__(self, sta_length=15, lta_length=35, on_ratio=1.35, off_ratio=1.1, offset=150):
+        self.sta = RunningWindow(sta_length)
+        self.lta = RunningWindow(lta_length)
+        self.on_ratio = on_ratio
+        self.off_ratio = off_ratio
+        self.offset = offset
+        self.status = False
+
+    def ratio(self):
+        """ STA/LTA, None until both windows have data """
+        sta_mean = self.sta.mean()
+        lta_mean = self.lta.mean()
+        if sta_mean is None or lta_mean is None or lta_mean <= 0:
+            return None
+        return sta_mean / lta_mean
+
+    def check(self):
+        """ Update and return the trigger status from the values pushed so far """
+        ratio = self.ratio()
+        if ratio is None:
+            return self.status
+        if ratio > self.on_ratio:
+            self.status = True
+        elif ratio < self.off_ratio:
+            self.status = False
+        return self.status
+
+    def push(self, value):
+        """ Add the feature value of one frame """
+        value += self.offset
+        self.sta.push(value)
+        self.lta.push(value)
+
+    def reset(self):
+        """ Clear both windows and turn the trigger off """
+        self.sta.reset()
+        self.lta.reset()
+        self.status = False
+
+    def evaluate_batch(self, values, record_frames=None):
+        """ Ratio and status of every frame of a recorded sequence, for offline threshold tuning.
+
+        Vectorized with cumulative sums. Frame i is checked against frames before it and then
+        pushed, which matches calling check() then push() on every frame of a fresh trigger.
+        With record_frames set, the trigger is driven like GestureSegmenter drives it: once on,
+        it stays on for record_frames frames without new values and is then reset, see hold_and_reset().
+        Returns (ratio, status) arrays; ratio is nan where check() would not have one.
+        """
+        values = np.asarray(values, dtype=float)
+        if record_frames is None:
+            return self.evaluate_free_running(values)
+        return hold_and_reset(lambda start: self.evaluate_free_running(values[start:]), len(values), record_frames)
+
+    def evaluate_free_running(self, values):
+        """ evaluate_batch() of a trigger that is never held or reset """
+        values = values + self.offset
+        num_frames = len(values)
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))[:num_frames]
+        frames = np.arange(num_frames)
+
+        def window_mean(length):
+            first = np.maximum(frames - length, 0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return (cumulative - cumulative[first]) / np.minimum(frames, length)
+
+        sta_mean = window_mean(self.sta.length)
+        lta_mean = window_mean(self.lta.length)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = np.where(lta_mean > 0, sta_mean / lta_mean, np.nan)
+        return ratio, hysteresis(ratio, self.on_ratio, self.off_ratio)
+
+
+def hysteresis(ratio, on_ratio, off_ratio, initial=False):
+    """ Status per frame: on above on_ratio, off below off_ratio, otherwise the previous status """
+    state = np.full(len(ratio), -1, dtype=np.int8)
+    state[ratio > on_ratio] = 1
+    state[ratio < off_ratio] = 0
+    if len(state) and state[0] < 0:
+        state[0] = initial
+    # forward fill the last decided state
+    last_decided = np.maximum.accumulate(np.where(state >= 0, np.arange(len(state)), 0))
+    return state[last_decided].astype(bool)
+
+
+def hold_and_reset(evaluate, num_frames, record_frames):
+    """ Per-frame outputs of a trigger that is held and reset the way GestureSegmenter drives it.
+
+    The segmenter stops pushing values while a gesture is recorded, so the trigger stays on with
+    its ratio frozen for record_frames frames (main.py: WINDOW_SIZE minus the pre-trigger frames);
+    on the last of them it is reset and that frame's value is the first one pushed again.
+    evaluate(start) returns the free-running per-frame outputs of a fresh trigger fed the frames
+    from start on, status last. Every gesture costs one evaluate() of the remaining frames.
+    """
+    outputs = None
+    start, first = 0, 0
+    while True:
+        segment = evaluate(start)
+        if outputs is None:
+            outputs = [np.zeros(num_frames, dtype=output.dtype) for output in segment]
+        # frame start of a later segment is the last frame of the previous gesture, already filled
+        triggered = np.flatnonzero(segment[-1][first:])
+        stop = num_frames if not len(triggered) else start + first + triggered[0]
+        for output, segment_output in zip(outputs, segment):
+            output[start + first:stop] = segment_output[first:stop - start]
+        if stop == num_frames:
+            return tuple(outputs)
+        end = min(stop + record_frames, num_frames)
+        for output, segment_output in zip(outputs, segment):
+            output[stop:end] = segment_output[stop - start]
+        if end == num_frames:
+            return tuple(outputs)
+        start, first = end - 1, 1
+
+
+class MultiFeatureTrigger:
+    """ Class: MultiFeatureTrigger
+
+    One StaLtaTrigger per frame feature: average SNR, point count and Doppler energy.
+    mode 'any' triggers when one feature triggers, 'all' only when every feature does.
+    """
+
+    def __init__(self, triggers=None, mode='any'):
+        if triggers is None:
+            triggers = {
+                "snr": StaLtaTrigger(),
+                "num_points": StaLtaTrigger(offset=1),
+                "doppler_energy": StaLtaTrigger(offset=0.1),
+            }
+        self.triggers = triggers
+        self.combine = any if mode == 'any' else all
+        self.combine_batch = np.any if mode == 'any' else np.all
+        self.status = False
+
+    @staticmethod
+    def features(detection_obj, avg_pt):
+        """ Feature values of one frame from its detection object and average point """
+        doppler = np.asarray(detection_obj["doppler"])
+        return {
+            "snr": avg_pt[0][5],
+            "num_points": detection_obj["numObj"],
+            "doppler_energy": float(np.dot(doppler, doppler)),
+        }
+
+    def check(self):
+        """ Update and return the combined status """
+        self.status = self.combine([trigger.check() for trigger in self.triggers.values()])
+        return self.status
+
+    def push(self, features):
+        """ Add the feature values of one frame, a dict like features() returns """
+        for name, trigger in self.triggers.items():
+            trigger.push(features[name])
+
+    def reset(self):
+        """ Reset every feature trigger """
+        for trigger in self.triggers.values():
+            trigger.reset()
+        self.status = False
+
+    def evaluate_batch(self, features, record_frames=None):
+        """ Combined status of every frame, features is a dict of per-frame value arrays.
+        record_frames holds and resets every trigger like StaLtaTrigger.evaluate_batch() """
+        features = {name: np.asarray(features[name], dtype=float) for name in self.triggers}
+        num_frames = len(next(iter(features.values()), ()))
+
+        def evaluate(start):
+            statuses = [trigger.evaluate_free_running(features[name][start:])[1]
+                        for name, trigger in self.triggers.items()]
+            return (self.combine_batch(statuses, axis=0),)
+
+        if record_frames is None:
+            return evaluate(0)[0]
+        return hold_and_reset(evaluate, num_frames, record_frames)[0]
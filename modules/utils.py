@@ -1,8 +1,8 @@
 """ Module: utils """
 import os
-import csv
 import numpy as np
 from dotenv import load_dotenv
+from modules.dataset import RadarDataset
 
 class Utils:
     """ Class: Utils """
@@ -46,17 +46,33 @@ class Utils:
         )
         return radar_position_x, radar_position_y, radar_position_z, grid_size
     
-    def load_radar_data(self, filename):
-        """ load_radar_data """
-        x = []
-        y = []
-        with open(filename, 'r') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                npy_file = row[0]
-                label = row[1]
-                data = np.load(npy_file)
-                x.append(data) # 只保留前三個欄位
-                y.append(label)
+    def get_capture_env(self):
+        """ Reading environmental variables """
+        # Load .env file
+        load_dotenv()
+        # Access environment variables
+        capture_file_dir = os.environ.get("RADAR_CAPTURE_FILE_DIR") or None
+        replay_file_path = os.environ.get("RADAR_REPLAY_FILE_PATH") or None
+        replay_speed = float(os.environ.get("RADAR_REPLAY_SPEED") or 1.0)
+        print(
+            f'''[Info] RADAR_CAPTURE_FILE_DIR: {capture_file_dir}\n''' +
+            f'''[Info] RADAR_REPLAY_FILE_PATH: {replay_file_path}\n''' +
+            f'''[Info] RADAR_REPLAY_SPEED: {replay_speed}'''
+        )
+        return capture_file_dir, replay_file_path, replay_speed
 
-        return x, y
+    def get_storage_env(self):
+        """ Reading environmental variables """
+        # Load .env file
+        load_dotenv()
+        # Access environment variables
+        data_storage_backend = os.environ.get("DATA_STORAGE_BACKEND") or 'npy'
+        print(f'''[Info] DATA_STORAGE_BACKEND: {data_storage_backend}''')
+        return data_storage_backend
+
+    def load_radar_data(self, filename):
+        """ load_radar_data: in-memory gestures and labels of a label CSV, see RadarDataset """
+        dataset = RadarDataset(filename)
+        # plain loads, a memory map per gesture would hold one file descriptor per sample
+        x = [np.load(path) for path in dataset.paths]
+        return x, dataset.labels
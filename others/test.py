@@ -1,17 +1,7 @@
-from modules.utils import Utils
+from modules.dataset import RadarDataset
 
-# Initialize calss
-Utils = Utils()
+dataset = RadarDataset("./np_label_storage.csv")
 
-x, y = Utils.load_radar_data("./np_label_storage.csv")
-
-data_len = len(x)
-
-max_frame = 0
-
-for i in range(data_len):
-    if x[i].shape[0] > max_frame:
-        max_frame = x[i].shape[0]
-    print(type(x))
-
-print(max_frame)
\ No newline at end of file
+# answered from the cached index, no gesture is loaded
+print(dataset.max_frames())
+print(dataset.label_counts())
@@ -3,14 +3,14 @@
 程式執行後會顯示 "請輸入要查看的檔案編號:"
 假如檔案名稱為 yuan_data_55.npy 則輸入 55
 輸入後會在 Terminal 上印出這個手勢中每一個點的 (x, y, z) 座標以及出現的時間
-並且將這些點做成動畫存成 PointCloud_animation.gif 檔案，其中點的顏色由深至淺表示先後順序
+並且將這些點做成動畫存成 radar_data_gif/{檔名}_{視角}.gif 檔案，其中點的顏色由深至淺表示先後順序
+動畫在背景行程中產生，不需等待即可繼續查看下一個檔案；視角輸入 abc 可將三個視角並排
 """
 import os
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 from dotenv import load_dotenv
+from modules.animation import AnimationExporter, PointCloudAnimator, VIEWS
 
 load_dotenv()
 npy_file_name = os.getenv("DATA_STORAGE_FILE_NAME")
@@ -21,9 +21,7 @@ class RadarDataVisualization:
         self.file_number = None
         self.gesture_dataframe = None
         self.file_path = None
-        self.fig = None
-        self.axes = None
-        self.scatter = None
+        self.exporter = AnimationExporter()
 
     def read_data(self, number):
         path = f"radar_data/{npy_file_name}_{number}.npy"
@@ -31,39 +29,6 @@ class RadarDataVisualization:
         dataframe = pd.DataFrame(np_array, columns=['x', 'y', 'z', 'doppler', 'range', 'snr', 'azimuth', 'elevation'])
         return dataframe, path
 
-    def set_figure(self, title, view):
-        plt.close()
-        self.fig = plt.figure()
-        self.axes = self.fig.add_subplot(projection='3d')
-        self.scatter = self.axes.scatter(self.gesture_dataframe['x'], self.gesture_dataframe['y'], self.gesture_dataframe['z'])
-        self.axes.set_xlabel('X')
-        self.axes.set_ylabel('Y')
-        self.axes.set_zlabel('Z')
-        self.axes.set_xlim([0.6, -0.6])
-        self.axes.set_ylim([0.6, 0])
-        self.axes.set_zlim([-0.6, 0.6])
-
-        if view == 'b':
-            self.axes.view_init(elev=80, azim=-90)  # 俯視（用於觀察左右、遠近的變化）
-        elif view == 'c':
-            self.axes.view_init(elev=5, azim=-150)  # 側面（用於觀察上下、遠近的變化）
-        else :
-            self.axes.view_init(elev=10, azim=-90)  # 正面（用於觀察上下、左右的變化）
-
-        plt.title(title)
-
-    def update_plot(self, frame):
-        snr_nonzero_indices = np.nonzero(self.gesture_dataframe['snr'][:frame+1].values)[0]
-        self.scatter._offsets3d = (
-            self.gesture_dataframe['x'][:frame+1].values[snr_nonzero_indices],
-            self.gesture_dataframe['y'][:frame+1].values[snr_nonzero_indices],
-            self.gesture_dataframe['z'][:frame+1].values[snr_nonzero_indices]
-        )
-        self.scatter.set_array(range(len(snr_nonzero_indices)))
-        self.scatter.set_cmap('plasma')
-        self.scatter.set_clim(0, len(snr_nonzero_indices))
-        return self.scatter,
-
     def run(self, file_number, view = 'a'):
         self.file_number = file_number
         if not os.path.exists(f"radar_data/{npy_file_name}_{self.file_number}.npy"):
@@ -75,23 +40,28 @@ class RadarDataVisualization:
         # self.gesture_dataframe = self.gesture_dataframe.loc[self.gesture_dataframe['snr'] != 0].reset_index(drop=True)
         # print("No Zero\n", self.gesture_dataframe)
 
-        self.set_figure(f'Filepath: {self.file_path}', view)
-        animation = FuncAnimation(self.fig, self.update_plot, frames=len(self.gesture_dataframe), interval=20, blit=True)
-
-        output_file = 'radar_data_gif/PointCloud_animation.gif'
-        animation.save(output_file, writer='pillow')
-        print(f"圖片已儲存至 {output_file}")
+        # a 正面、b 俯視、c 側面，多個視角並排
+        views = tuple(v for v in view if v in VIEWS) or ('a',)
+        output_file = f"radar_data_gif/{npy_file_name}_{self.file_number}_{''.join(views)}.gif"
+        # 傳入已讀取的陣列而非路徑，背景行程開始前刪除 .npy 也不影響動畫
+        future = self.exporter.submit(self.gesture_dataframe.to_numpy(), output_file, views,
+                                      title=f'Filepath: {self.file_path}', interval=20)
+        future.add_done_callback(self.report)
+
+    @staticmethod
+    def report(future):
+        if future.exception() is not None:
+            print(f"\n動畫產生失敗: {future.exception()!r}")
+        else:
+            print(f"\n圖片已儲存至 {future.result()}")
 
     def get_animation(self, dataframe):
         self.gesture_dataframe = dataframe
         self.gesture_dataframe = self.gesture_dataframe.loc[self.gesture_dataframe['snr'] != 0].reset_index(drop=True)
         print(self.gesture_dataframe)
 
-        self.set_figure(f'Filepath: {self.file_path}')
-        animation = FuncAnimation(self.fig, self.update_plot, frames=len(self.gesture_dataframe), interval=40, blit=True)
-
         output_file = 'radar_data_gif/PointCloud_animation.gif'
-        animation.save(output_file, writer='pillow')
+        PointCloudAnimator().save(self.gesture_dataframe.to_numpy(), output_file, f'Filepath: {self.file_path}')
         print(f"圖片已儲存至 {output_file}")
 
 
@@ -99,7 +69,7 @@ if __name__ == '__main__':
     radar_viz = RadarDataVisualization()
 
     file_number = int(input("請輸入要查看的起始檔案編號: "))
-    view = str(input("請輸入要查看的視角，a, b, c 分別為正面、俯視和側面視角: "))
+    view = str(input("請輸入要查看的視角，a, b, c 分別為正面、俯視和側面視角，abc 為三個視角並排: "))
     while True:
         status = radar_viz.run(file_number, view)
         if status == None:
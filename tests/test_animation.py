@@ -0,0 +1,33 @@
+""" Tests for the background gesture animation export """
+import os
+import numpy as np
+from PIL import Image
+
+from modules.animation import AnimationExporter, export_animation
+
+
+def make_gesture():
+    gesture = np.random.default_rng(0).uniform(-0.5, 0.5, (25, 8))
+    gesture[:, 5] = 100
+    gesture[::5, 5] = 0
+    return gesture
+
+
+def test_export_from_path_and_array(tmp_path):
+    npy_path = os.path.join(tmp_path, 'gesture.npy')
+    np.save(npy_path, make_gesture())
+    from_path = export_animation(npy_path, os.path.join(tmp_path, 'path.gif'), interval=20)
+    from_array = export_animation(make_gesture(), os.path.join(tmp_path, 'array.gif'), interval=20)
+    with Image.open(from_path) as path_image, Image.open(from_array) as array_image:
+        assert path_image.n_frames == array_image.n_frames > 1
+    assert not [name for name in os.listdir(tmp_path) if '.tmp' in name]
+
+
+def test_export_survives_deleting_the_file(tmp_path):
+    npy_path = os.path.join(tmp_path, 'gesture.npy')
+    np.save(npy_path, make_gesture())
+    exporter = AnimationExporter(workers=1)
+    future = exporter.submit(np.load(npy_path), os.path.join(tmp_path, 'gesture_a.gif'), ('a', 'b'), interval=20)
+    os.remove(npy_path)
+    assert os.path.getsize(future.result(timeout=60)) > 0
+    exporter.shutdown()
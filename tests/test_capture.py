@@ -0,0 +1,91 @@
+""" Tests for recording and replaying the data port """
+import os
+import time
+import pytest
+
+from modules.capture import RecordingSerial, ReplaySerial, CAPTURE_MAGIC, FILE_HEADER, RECORD_HEADER
+
+
+class ChunkSerial:
+    """ Data port stand-in that returns one prepared chunk per read """
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.timeout = None
+        self.closed = False
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size=1):
+        return self.chunks.pop(0) if self.chunks else b''
+
+    def close(self):
+        self.closed = True
+
+
+def write_capture(path, records):
+    """ Capture file with (seconds since start, bytes) records """
+    with open(path, 'wb') as capture_file:
+        capture_file.write(CAPTURE_MAGIC + FILE_HEADER.pack(time.time()))
+        for timestamp, data in records:
+            capture_file.write(RECORD_HEADER.pack(timestamp, len(data)) + data)
+
+
+def read_all(replay):
+    data = bytearray()
+    while not replay.eof:
+        data += replay.read(max(replay.in_waiting, 1))
+    return bytes(data)
+
+
+def test_record_and_replay_round_trip(tmp_path):
+    chunks = [bytes([index]) * (index * 7 + 1) for index in range(30)]
+    data_serial = ChunkSerial(chunks + [b''])
+    recording = RecordingSerial(data_serial, tmp_path)
+    recording.timeout = 0.5
+    assert data_serial.timeout == 0.5
+    received = [recording.read(recording.in_waiting) for _ in range(len(chunks) + 1)]
+    recording.close()
+    assert data_serial.closed
+    assert b''.join(received) == b''.join(chunks)
+
+    replay = ReplaySerial(recording.capture_file_path, speed=0)
+    # empty reads are not recorded, every other read is one record
+    assert len(replay.timestamps) == len(chunks)
+    assert replay.timestamps == sorted(replay.timestamps)
+    assert read_all(replay) == b''.join(chunks)
+    assert replay.in_waiting == 0
+
+
+def test_replay_follows_the_capture_clock(tmp_path):
+    capture_file_path = os.path.join(tmp_path, 'capture.bin')
+    write_capture(capture_file_path, [(0.0, b'a' * 10), (0.05, b'b' * 10), (30.0, b'c' * 10)])
+    replay = ReplaySerial(capture_file_path, speed=1.0)
+    assert replay.in_waiting == 10
+    replay.timeout = 0.3
+    # blocks until the second record is due, the third is not released before its time
+    assert replay.read(100) == b'a' * 10 + b'b' * 10
+    assert not replay.eof
+    fast_replay = ReplaySerial(capture_file_path, speed=1000.0)
+    fast_replay.timeout = 1.0
+    assert fast_replay.read(30) == b'a' * 10 + b'b' * 10 + b'c' * 10
+
+
+def test_replay_of_a_cut_capture(tmp_path):
+    capture_file_path = os.path.join(tmp_path, 'capture.bin')
+    write_capture(capture_file_path, [(0.0, b'a' * 10), (0.01, b'b' * 10)])
+    with open(capture_file_path, 'r+b') as capture_file:
+        # the recorder was killed in the middle of the last record
+        capture_file.truncate(os.path.getsize(capture_file_path) - 4)
+    replay = ReplaySerial(capture_file_path, speed=0)
+    assert read_all(replay) == b'a' * 10 + b'b' * 6
+
+
+def test_replay_rejects_other_files(tmp_path):
+    path = os.path.join(tmp_path, 'not_a_capture.bin')
+    with open(path, 'wb') as other_file:
+        other_file.write(b'\x00' * 64)
+    with pytest.raises(ValueError):
+        ReplaySerial(path)
@@ -0,0 +1,64 @@
+""" Tests for the per-frame FeatureExtractor """
+import numpy as np
+import pytest
+
+from modules.features import FeatureExtractor, AVERAGE_POINT_FIELDS, DETECTION_COLUMNS
+
+
+def detection_obj(num_points, seed=0, num_static=0):
+    rng = np.random.default_rng(seed)
+    obj = {key: rng.uniform(-2, 2, num_points) for key in DETECTION_COLUMNS}
+    obj["snr"] = rng.uniform(50, 300, num_points)
+    obj["doppler"][:num_static] = 0
+    obj["numObj"] = num_points
+    return obj
+
+
+def reference(obj):
+    """ Mean of every column over the points with non-zero Doppler """
+    moving = np.asarray(obj["doppler"]) != 0
+    return np.array([np.mean(np.asarray(obj[key])[moving]) for key in DETECTION_COLUMNS])
+
+
+@pytest.mark.parametrize('num_points', [1, 8, 100])
+def test_average_point_matches_reference(num_points):
+    extractor = FeatureExtractor(capacity=16)
+    obj = detection_obj(num_points, seed=num_points, num_static=num_points // 3)
+    extractor.extract(obj, timestamp=12.5)
+    assert extractor.average_point.shape == (1, len(AVERAGE_POINT_FIELDS))
+    np.testing.assert_allclose(extractor.average_point[0, :len(DETECTION_COLUMNS)], reference(obj), rtol=1e-12)
+    assert extractor.average_point[0, -1] == 12.5
+
+
+def test_frame_without_moving_points_is_zero():
+    extractor = FeatureExtractor(extras=True)
+    extractor.extract(detection_obj(5), timestamp=1.0)
+    extractor.extract(detection_obj(5, num_static=5))
+    assert not extractor.values.any()
+    extractor.extract(detection_obj(0))
+    assert not extractor.values.any()
+
+
+def test_row_is_reused():
+    extractor = FeatureExtractor()
+    first = extractor.extract(detection_obj(4, seed=1), timestamp=1.0)
+    kept = extractor.average_point.copy()
+    second = extractor.extract(detection_obj(4, seed=2), timestamp=2.0)
+    assert first is second
+    assert not np.array_equal(kept, extractor.average_point)
+
+
+def test_extras():
+    extractor = FeatureExtractor(extras=True)
+    obj = detection_obj(20, seed=4, num_static=5)
+    row = extractor.extract(obj, timestamp=3.0)[0]
+    moving = np.asarray(obj["doppler"]) != 0
+    points = np.column_stack([obj["x"], obj["y"], obj["z"]])[moving]
+    snr = obj["snr"][moving]
+    assert row['num_points'] == 15
+    np.testing.assert_allclose([row['weighted_x'], row['weighted_y'], row['weighted_z']],
+                               snr @ points / snr.sum())
+    np.testing.assert_allclose([row['spread_x'], row['spread_y'], row['spread_z']], points.std(axis=0), atol=1e-12)
+    np.testing.assert_allclose([row['min_x'], row['min_y'], row['min_z']], points.min(axis=0))
+    np.testing.assert_allclose([row['max_x'], row['max_y'], row['max_z']], points.max(axis=0))
+    assert row['max_doppler'] == pytest.approx(np.abs(obj["doppler"][moving]).max())
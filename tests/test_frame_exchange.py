@@ -0,0 +1,87 @@
+""" Tests for the FrameExchange triple buffer """
+import threading
+import numpy as np
+
+from modules.frame_exchange import FrameExchange, refresh_interval
+
+
+def test_read_returns_only_new_frames():
+    exchange = FrameExchange((4, 2), np.float32)
+    assert exchange.read() is None
+    assert exchange.write(np.ones((3, 2)))
+    frame = exchange.read()
+    np.testing.assert_array_equal(frame, np.ones((3, 2)))
+    assert exchange.read() is None
+    assert exchange.sequence == exchange.read_sequence == 1
+
+
+def test_unread_frames_are_replaced_by_the_newest():
+    exchange = FrameExchange((4, 2), np.float32)
+    for value in range(1, 4):
+        exchange.write(np.full((2, 2), value))
+    np.testing.assert_array_equal(exchange.read(), np.full((2, 2), 3))
+    assert exchange.dropped == 2
+
+
+def test_read_view_survives_later_writes_until_the_next_read():
+    exchange = FrameExchange((4, 2), np.float32)
+    exchange.write(np.full((4, 2), 1))
+    frame = exchange.read()
+    exchange.write(np.full((4, 2), 2))
+    exchange.write(np.full((4, 2), 3))
+    np.testing.assert_array_equal(frame, np.full((4, 2), 1))
+    np.testing.assert_array_equal(exchange.read(), np.full((4, 2), 3))
+
+
+def test_rejected_and_truncated_frames():
+    exchange = FrameExchange((4, 2), np.float32)
+    assert not exchange.write(np.ones((3, 3)))
+    assert not exchange.write_columns([np.ones(3)])
+    assert exchange.rejected == 2
+    assert exchange.read() is None
+    assert exchange.write(np.ones((6, 2)))
+    assert exchange.truncated == 1
+    assert exchange.read().shape == (4, 2)
+
+
+def test_write_columns():
+    exchange = FrameExchange((8, 3), np.float32)
+    assert exchange.write_columns([np.arange(5), np.arange(5) * 2, np.arange(6)])
+    np.testing.assert_array_equal(exchange.read(), np.column_stack([np.arange(5), np.arange(5) * 2, np.arange(5)]))
+    # an empty frame is a valid frame
+    assert exchange.write_columns([[], [], []])
+    assert exchange.read().shape == (0, 3)
+
+
+def test_concurrent_reader_never_sees_a_torn_frame():
+    exchange = FrameExchange((64, 4), np.int64)
+    num_frames = 5000
+    done = threading.Event()
+    torn = []
+    sequences = []
+
+    def reader():
+        while not done.is_set() or exchange.sequence != exchange.read_sequence:
+            frame = exchange.read()
+            if frame is None:
+                continue
+            # every frame is written with one value, and values only increase
+            if not (frame == frame[0, 0]).all():
+                torn.append(frame.copy())
+            sequences.append(int(frame[0, 0]))
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for value in range(num_frames):
+        exchange.write(np.full((64, 4), value))
+    done.set()
+    thread.join()
+    assert not torn
+    assert sequences == sorted(set(sequences))
+    assert sequences[-1] == num_frames - 1
+    assert len(sequences) + exchange.dropped == num_frames
+
+
+def test_refresh_interval():
+    assert refresh_interval(33.33) == 33
+    assert refresh_interval(5) == 16
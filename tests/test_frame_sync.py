@@ -0,0 +1,128 @@
+""" Tests for the ring-buffer FrameSynchronizer """
+import struct
+import numpy as np
+
+from modules.frame_sync import FrameSynchronizer, HEADER_NUM_BYTES
+from modules.parser_module.data_parser import MAGIC_WORD
+
+
+def build_packet(frame_number, payload_size=88):
+    """ Header with the given total length followed by a payload that holds no magic word """
+    total_packet_len = HEADER_NUM_BYTES + payload_size
+    header = MAGIC_WORD + struct.pack('<8I', 0, total_packet_len, 0, frame_number, 0, 0, 0, 0)
+    return header + bytes([frame_number % 251 + 1]) * payload_size
+
+
+def build_packets(num_packets, start_frame=0):
+    return [build_packet(frame_number, 24 + 8 * (frame_number % 7)) for frame_number in
+            range(start_frame, start_frame + num_packets)]
+
+
+def drain(frame_sync):
+    return [bytes(frame) for frame in frame_sync.frames()]
+
+
+def test_stream_fed_in_chunks():
+    packets = build_packets(20)
+    stream = b''.join(packets)
+    frame_sync = FrameSynchronizer(capacity=512)
+    frames = []
+    # uneven chunks so packets and magic words straddle feed() calls and the end of the ring
+    for start in range(0, len(stream), 37):
+        frame_sync.feed(stream[start:start + 37])
+        frames += drain(frame_sync)
+    assert frames == packets
+    assert frame_sync.frame_count == len(packets)
+    assert frame_sync.bytes_discarded == 0
+    assert frame_sync.overflow_count == 0
+
+
+def test_incomplete_packet_waits_for_more_bytes():
+    packet = build_packet(1)
+    frame_sync = FrameSynchronizer()
+    frame_sync.feed(packet[:-1])
+    assert frame_sync.next_frame() is None
+    frame_sync.feed(packet[-1:])
+    assert drain(frame_sync) == [packet]
+
+
+def test_resync_after_garbage():
+    packets = build_packets(3)
+    frame_sync = FrameSynchronizer()
+    frame_sync.feed(b'\x01\x02\x03' + packets[0] + bytes(range(50)) + packets[1] + packets[2])
+    assert drain(frame_sync) == packets
+    assert frame_sync.bytes_discarded == 53
+    assert frame_sync.resync_count == 2
+
+
+def test_truncated_packet_is_dropped():
+    packets = build_packets(3)
+    frame_sync = FrameSynchronizer()
+    frame_sync.feed(packets[0][:len(packets[0]) // 2] + packets[1] + packets[2])
+    assert drain(frame_sync) == packets[1:]
+    assert frame_sync.truncated_count == 1
+
+
+def test_bad_length_is_skipped():
+    packets = build_packets(2)
+    for bad_length in (3, 2**20):
+        bad_packet = packets[0][:12] + struct.pack('<I', bad_length) + packets[0][16:]
+        frame_sync = FrameSynchronizer(capacity=4096)
+        frame_sync.feed(bad_packet + packets[1])
+        assert drain(frame_sync) == packets[1:]
+        assert frame_sync.bad_length_count == 1
+
+
+def test_overflow_resyncs_on_next_packet():
+    packets = build_packets(40)
+    stream = b''.join(packets)
+    capacity = 4 * max(len(packet) for packet in packets)
+    frame_sync = FrameSynchronizer(capacity=capacity)
+    # the ring overflows in the middle of a packet, the following complete packets must still be found
+    frame_sync.feed(stream[:capacity + len(packets[0]) // 2])
+    frames = drain(frame_sync)
+    assert frame_sync.overflow_count >= 1
+    assert frame_sync.bytes_overflowed > 0
+    frame_sync.feed(stream[capacity + len(packets[0]) // 2:])
+    frames += drain(frame_sync)
+    assert frames and frames[-1] == packets[-1]
+    # every frame is a whole packet, in stream order
+    positions = [packets.index(frame) for frame in frames]
+    assert positions == sorted(positions)
+
+
+def test_feed_larger_than_capacity_keeps_the_newest_bytes():
+    packets = build_packets(30)
+    capacity = 2 * max(len(packet) for packet in packets)
+    frame_sync = FrameSynchronizer(capacity=capacity)
+    frame_sync.feed(b''.join(packets))
+    frames = drain(frame_sync)
+    # only whole packets from the end of the stream, at most what fits into the ring
+    assert frames and frames == packets[-len(frames):]
+    assert sum(map(len, frames)) <= capacity
+    assert frame_sync.bytes_overflowed > 0
+
+
+def test_drop_stale_keeps_the_newest_packets():
+    packets = build_packets(10)
+    frame_sync = FrameSynchronizer()
+    frame_sync.feed(b''.join(packets))
+    assert frame_sync.drop_stale(3) == 7
+    assert frame_sync.frames_dropped == 7
+    assert drain(frame_sync) == packets[-3:]
+
+
+def test_magic_word_split_across_the_ring_end():
+    packets = build_packets(200)
+    capacity = 257
+    frame_sync = FrameSynchronizer(capacity=capacity)
+    frames = []
+    rng = np.random.default_rng(0)
+    stream = b''.join(packets)
+    start = 0
+    while start < len(stream):
+        size = int(rng.integers(1, 64))
+        frame_sync.feed(stream[start:start + size])
+        frames += drain(frame_sync)
+        start += size
+    assert frames == packets
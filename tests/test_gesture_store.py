@@ -0,0 +1,99 @@
+""" Tests for the append-only GestureStore and its crash recovery """
+import os
+import numpy as np
+import pytest
+
+from modules.gesture_store import GestureStore, INDEX_DTYPE
+
+
+def make_gestures(num_gestures=5, num_columns=8):
+    rng = np.random.default_rng(0)
+    return [rng.uniform(-1, 1, (10 + gesture_id, num_columns)) for gesture_id in range(num_gestures)]
+
+
+def fill_store(store_dir, gestures):
+    store = GestureStore(store_dir)
+    ids = [store.append(gesture) for gesture in gestures]
+    store.close()
+    return ids
+
+
+def test_append_and_reopen(tmp_path):
+    gestures = make_gestures()
+    assert fill_store(tmp_path, gestures) == list(range(len(gestures)))
+    store = GestureStore(tmp_path)
+    assert len(store) == len(gestures)
+    for gesture_id, gesture in store:
+        np.testing.assert_array_equal(gesture, gestures[gesture_id])
+    store.close()
+
+
+def test_torn_data_tail_is_trimmed(tmp_path):
+    gestures = make_gestures()
+    fill_store(tmp_path, gestures)
+    data_path = os.path.join(tmp_path, 'gestures.dat')
+    with open(data_path, 'ab') as data_file:
+        # the rows of an append whose index record never reached the disk
+        data_file.write(bytes(100))
+    store = GestureStore(tmp_path)
+    assert len(store) == len(gestures)
+    assert os.path.getsize(data_path) == sum(gesture.nbytes for gesture in gestures)
+    np.testing.assert_array_equal(store.get(len(gestures) - 1), gestures[-1])
+    # the next append starts right after the last complete gesture
+    gesture_id = store.append(gestures[0])
+    np.testing.assert_array_equal(store.get(gesture_id), gestures[0])
+    store.close()
+
+
+def test_records_without_data_are_dropped(tmp_path):
+    gestures = make_gestures()
+    fill_store(tmp_path, gestures)
+    data_path = os.path.join(tmp_path, 'gestures.dat')
+    index_path = os.path.join(tmp_path, 'gestures.idx')
+    # the last gesture's rows were only half written, plus half an index record
+    with open(data_path, 'r+b') as data_file:
+        data_file.truncate(os.path.getsize(data_path) - gestures[-1].nbytes // 2)
+    with open(index_path, 'ab') as index_file:
+        index_file.write(bytes(INDEX_DTYPE.itemsize // 2))
+    store = GestureStore(tmp_path)
+    assert len(store) == len(gestures) - 1
+    assert os.path.getsize(index_path) == (len(gestures) - 1) * INDEX_DTYPE.itemsize
+    assert os.path.getsize(data_path) == sum(gesture.nbytes for gesture in gestures[:-1])
+    for gesture_id, gesture in store:
+        np.testing.assert_array_equal(gesture, gestures[gesture_id])
+    store.close()
+
+
+@pytest.mark.parametrize('index_size', [None, 0])
+def test_data_without_index_is_kept(tmp_path, index_size):
+    fill_store(tmp_path, make_gestures())
+    data_path = os.path.join(tmp_path, 'gestures.dat')
+    index_path = os.path.join(tmp_path, 'gestures.idx')
+    data_size = os.path.getsize(data_path)
+    if index_size is None:
+        os.remove(index_path)
+    else:
+        with open(index_path, 'r+b') as index_file:
+            index_file.truncate(index_size)
+    with pytest.raises(ValueError):
+        GestureStore(tmp_path)
+    assert os.path.getsize(data_path) == data_size
+
+
+def test_reserve_ids_and_empty_gestures(tmp_path):
+    store = GestureStore(tmp_path)
+    store.reserve_ids(8)
+    assert len(store) == 8 and len(store.ids()) == 0
+    assert store.append(np.zeros((0, 8))) == 8
+    assert store.get(8).shape == (0, 8)
+    gesture = make_gestures(1)[0]
+    assert store.append(gesture) == 9
+    store.delete(8)
+    store.close()
+
+    store = GestureStore(tmp_path)
+    assert store.ids().tolist() == [9]
+    np.testing.assert_array_equal(store.get(9), gesture)
+    with pytest.raises(KeyError):
+        store.get(8)
+    store.close()
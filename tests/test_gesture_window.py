@@ -0,0 +1,71 @@
+""" Tests for the preallocated GestureWindow """
+import numpy as np
+
+from modules.gesture_window import GestureWindow
+
+
+def frame(number, num_columns=9):
+    return np.full(num_columns, float(number))
+
+
+def test_append_until_full():
+    window = GestureWindow(window_size=5, num_columns=9, pre_trigger_size=0)
+    window.start()
+    assert len(window) == 0
+    for number in range(5):
+        assert window.append(frame(number))
+    assert window.full
+    assert not window.append(frame(99))
+    np.testing.assert_array_equal(window.view()[:, 0], np.arange(5))
+
+
+def test_start_copies_pre_trigger_frames_oldest_first():
+    window = GestureWindow(window_size=8, num_columns=9, pre_trigger_size=3)
+    for number in range(7):
+        window.push_history(frame(number))
+    window.start()
+    assert len(window) == 3
+    np.testing.assert_array_equal(window.view()[:, 0], [4, 5, 6])
+    window.append(frame(7))
+    np.testing.assert_array_equal(window.view()[:, 0], [4, 5, 6, 7])
+
+
+def test_start_with_short_history():
+    window = GestureWindow(window_size=8, num_columns=9, pre_trigger_size=4)
+    window.push_history(frame(1))
+    window.push_history(frame(2))
+    window.start()
+    np.testing.assert_array_equal(window.view()[:, 0], [1, 2])
+
+
+def test_history_longer_than_window():
+    window = GestureWindow(window_size=2, num_columns=9, pre_trigger_size=4)
+    for number in range(4):
+        window.push_history(frame(number))
+    window.start()
+    assert window.full
+    assert len(window.view()) == 2
+
+
+def test_reset_forgets_window_and_history():
+    window = GestureWindow(window_size=4, num_columns=9, pre_trigger_size=2)
+    window.push_history(frame(1))
+    window.start()
+    window.append(frame(2))
+    window.reset()
+    assert len(window) == 0
+    window.start()
+    assert len(window) == 0
+
+
+def test_view_shares_the_buffer():
+    window = GestureWindow(window_size=4, num_columns=9, pre_trigger_size=0)
+    window.start()
+    window.append(frame(1))
+    view = window.view()
+    assert np.shares_memory(view, window.buffer)
+    copy = view.copy()
+    window.reset()
+    window.start()
+    window.append(frame(5))
+    np.testing.assert_array_equal(copy[:, 0], [1])
@@ -0,0 +1,59 @@
+""" Tests for gap interpolation against its pandas reference """
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.interpolation import interpolate_gaps, missing_frames
+
+
+def make_windows(seed=5, shape=(4, 30, 3)):
+    rng = np.random.default_rng(seed)
+    windows = rng.uniform(1, 10, shape)
+    windows[rng.random(shape[:2]) < 0.3] = 0
+    return windows
+
+
+def pandas_reference(window, method):
+    """ The DataFrame.interpolate path data_to_numpy used before """
+    frame = pd.DataFrame(np.where(window.any(axis=1, keepdims=True), window, np.nan))
+    if method == 'hold':
+        frame = frame.ffill().where(frame.bfill().notna())
+    else:
+        frame = frame.interpolate(method='linear', limit_area='inside')
+    return frame.fillna(0).to_numpy()
+
+
+@pytest.mark.parametrize('method', ['linear', 'hold'])
+def test_matches_pandas(method):
+    windows = make_windows()
+    result = interpolate_gaps(windows, method=method)
+    for window, filled in zip(windows, result):
+        np.testing.assert_allclose(filled, pandas_reference(window, method))
+
+
+def test_single_window_matches_batch():
+    windows = make_windows()
+    for method in ('linear', 'hold', 'spline'):
+        batch = interpolate_gaps(windows, method=method)
+        for window, filled in zip(windows, batch):
+            np.testing.assert_allclose(interpolate_gaps(window, method=method), filled)
+
+
+def test_spline_passes_through_present_frames():
+    windows = make_windows(seed=6)
+    present = ~missing_frames(windows)
+    result = interpolate_gaps(windows, method='spline')
+    np.testing.assert_array_equal(result[present], windows[present])
+    # a straight line is reproduced exactly
+    line = np.outer(np.arange(1, 21), [1.0, -2.0])
+    gapped = line.copy()
+    gapped[[3, 4, 9, 15]] = 0
+    np.testing.assert_allclose(interpolate_gaps(gapped, method='spline'), line)
+
+
+def test_real_zeros_and_edges_are_kept():
+    window = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 0.0], [3.0, 2.0], [0.0, 0.0]])
+    result = interpolate_gaps(window)
+    np.testing.assert_array_equal(result, [[0, 0], [1, 0], [2, 1], [3, 2], [0, 0]])
+    with pytest.raises(ValueError):
+        interpolate_gaps(window, method='cubic')
@@ -0,0 +1,81 @@
+""" Tests for the synthetic packet generator and its serial port stand-in """
+import os
+import numpy as np
+import pytest
+
+from modules.radar import Radar
+from modules.frame_sync import FrameSynchronizer
+from modules.packet_generator import PacketGenerator, GeneratedSerial, PACKET_ALIGNMENT
+
+RADAR_CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'radar_config')
+
+
+@pytest.fixture(scope='module', params=['30fps_06m_15db.cfg', 'heatmap.cfg'])
+def generator(request):
+    return PacketGenerator(os.path.join(RADAR_CONFIG_DIR, request.param), num_points=(1, 32), seed=1)
+
+
+def make_radar(generator):
+    radar = Radar()
+    radar.radar_parameters = generator.radar_parameters
+    return radar
+
+
+def test_packets_parse(generator):
+    radar = make_radar(generator)
+    for frame_number in range(20):
+        packet = generator.packet(frame_number)
+        assert len(packet) % PACKET_ALIGNMENT == 0
+        dataOK, frameNumber, detObj = radar.parse_frame(packet)
+        assert dataOK == 1
+        assert frameNumber == frame_number
+        assert 1 <= detObj["numObj"] <= 32
+        assert len(detObj["x"]) == len(detObj["snr"]) == detObj["numObj"]
+        if generator.range_doppler:
+            assert np.shape(detObj["rangeDoppler"]) == (generator.num_doppler_bins, generator.num_range_bins)
+
+
+def test_same_seed_same_stream():
+    config_file_path = os.path.join(RADAR_CONFIG_DIR, '30fps_06m_15db.cfg')
+    first = PacketGenerator(config_file_path, seed=5).stream_bytes(10)
+    second = PacketGenerator(config_file_path, seed=5).stream_bytes(10)
+    assert first == second
+
+
+def test_corrupted_stream_keeps_every_intact_packet():
+    config_file_path = os.path.join(RADAR_CONFIG_DIR, '30fps_06m_15db.cfg')
+    corruption = {"truncate": 0.1, "garbage": 0.1, "bad_length": 0.1}
+    corrupted = PacketGenerator(config_file_path, corruption=corruption, seed=3)
+    packets = list(corrupted.stream(300))
+    assert all(corrupted.injected.values())
+
+    frame_sync = FrameSynchronizer()
+    frames = []
+    for packet in packets:
+        frame_sync.feed(packet)
+        frames += [bytes(frame) for frame in frame_sync.frames()]
+    radar = make_radar(corrupted)
+    frame_numbers = []
+    for frame in frames:
+        dataOK, frameNumber, _ = radar.parse_frame(frame)
+        assert dataOK == 1
+        frame_numbers.append(frameNumber)
+    # a truncated packet never swallows the start of the next one
+    assert frame_sync.truncated_count > 0
+    assert frame_numbers == sorted(frame_numbers)
+    assert len(frames) >= 300 - corrupted.injected["truncate"] - corrupted.injected["bad_length"]
+
+
+def test_generated_serial_serves_the_stream():
+    config_file_path = os.path.join(RADAR_CONFIG_DIR, '30fps_06m_15db.cfg')
+    expected = PacketGenerator(config_file_path, seed=4).stream_bytes(25)
+    serial_port = GeneratedSerial(PacketGenerator(config_file_path, seed=4), speed=0, num_frames=25)
+    serial_port.timeout = 0.01
+    data = bytearray()
+    while True:
+        chunk = serial_port.read(max(serial_port.in_waiting, 1))
+        if not chunk:
+            break
+        data += chunk
+    assert bytes(data) == expected
+    assert serial_port.frames_released == 25
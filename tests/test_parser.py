@@ -0,0 +1,125 @@
+""" Tests for the mmw demo packet parser """
+import os
+import struct
+import numpy as np
+import pytest
+
+from modules import parser_mmw_demo
+from modules.radar import Radar
+from modules.frame_sync import HEADER_NUM_BYTES
+from modules.packet_generator import PacketGenerator, PACKET_ALIGNMENT
+from modules.parser_module.data_parser import MAGIC_WORD, STATS_DTYPE, TEMPERATURE_DTYPE, parse_tlvs
+
+RADAR_CONFIG_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      'radar_config', '30fps_06m_15db.cfg')
+
+# x, y, z, velocity of the golden packet
+POINTS = np.array([[0.5, 1.0, 0.0, -0.25],
+                   [-0.2, 0.4, 0.1, 0.5],
+                   [0.0, 2.0, -0.3, 0.0]], dtype='<f4')
+# snr, noise of the golden packet
+SIDE_INFO = np.array([[120, 40], [85, 33], [300, 51]], dtype='<u2')
+
+
+def build_packet(frame_number=7, points=POINTS, side_info=SIDE_INFO, num_det_obj=None, side_info_len=None):
+    """ One mmw demo output packet with detected points (TLV 1) and side info (TLV 7) """
+    if num_det_obj is None:
+        num_det_obj = len(points)
+    side_info_bytes = side_info.tobytes()
+    if side_info_len is not None:
+        side_info_bytes = side_info_bytes[:side_info_len]
+    payload = struct.pack('<2I', 1, points.nbytes) + points.tobytes() + \
+        struct.pack('<2I', 7, len(side_info_bytes)) + side_info_bytes
+    total_packet_len = HEADER_NUM_BYTES + len(payload)
+    total_packet_len += (-total_packet_len) % PACKET_ALIGNMENT
+    header = MAGIC_WORD + struct.pack('<8I', 0x03060000, total_packet_len, 0xA6843, frame_number,
+                                      0, num_det_obj, 2, 0)
+    packet = header + payload
+    return packet + bytes(total_packet_len - len(packet))
+
+
+@pytest.fixture(scope='module')
+def radar():
+    radar = Radar()
+    radar.radar_parameters = radar.parse_radar_config(radar.read_radar_config(RADAR_CONFIG_FILE_PATH))
+    return radar
+
+
+def test_parse_frame_golden_packet(radar):
+    dataOK, frameNumber, detObj = radar.parse_frame(build_packet(frame_number=7))
+    assert dataOK == 1
+    assert frameNumber == 7
+    assert detObj["numObj"] == len(POINTS)
+    np.testing.assert_allclose(detObj["x"], POINTS[:, 0])
+    np.testing.assert_allclose(detObj["y"], POINTS[:, 1])
+    np.testing.assert_allclose(detObj["z"], POINTS[:, 2])
+    np.testing.assert_allclose(detObj["doppler"], POINTS[:, 3])
+    np.testing.assert_allclose(detObj["range"], np.linalg.norm(POINTS[:, :3].astype(float), axis=1), rtol=1e-6)
+    np.testing.assert_array_equal(detObj["snr"], SIDE_INFO[:, 0])
+    np.testing.assert_array_equal(detObj["noise"], SIDE_INFO[:, 1])
+
+
+def test_parse_tlvs_golden_packet(radar):
+    packet = np.frombuffer(build_packet(), dtype='uint8')
+    tlvs = parse_tlvs(packet, HEADER_NUM_BYTES, len(packet), 2, len(POINTS), radar.radar_parameters)
+    assert set(tlvs) == {1, 7}
+    np.testing.assert_allclose(tlvs[1]["detectedX_array"], POINTS[:, 0])
+    np.testing.assert_array_equal(tlvs[7]["detectedSNR_array"], SIDE_INFO[:, 0])
+
+
+def test_parse_frame_rejects_num_det_obj_beyond_tlv(radar):
+    # numDetectedObj claims more points than TLV 1 holds
+    dataOK, _, _ = radar.parse_frame(build_packet(num_det_obj=len(POINTS) + 5))
+    assert dataOK == 0
+
+
+def test_parse_frame_rejects_short_side_info(radar):
+    # TLV 7 holds fewer side info records than detected points
+    dataOK, _, _ = radar.parse_frame(build_packet(side_info_len=SIDE_INFO.itemsize * 2 * (len(POINTS) - 1)))
+    assert dataOK == 0
+
+
+def test_parse_tlvs_short_range_doppler(radar):
+    # a range-Doppler TLV shorter than the config's matrix decodes to nothing
+    tlv = struct.pack('<2I', 5, 16) + bytes(16)
+    packet = np.frombuffer(bytes(HEADER_NUM_BYTES) + tlv, dtype='uint8')
+    tlvs = parse_tlvs(packet, HEADER_NUM_BYTES, len(packet), 1, 0, radar.radar_parameters)
+    assert len(tlvs[5]["rangeDoppler"]) == 0
+
+
+@pytest.mark.parametrize('tlvType, key, dtype', [(6, "stats", STATS_DTYPE), (9, "temperature", TEMPERATURE_DTYPE)])
+def test_parse_tlvs_fixed_size_records(radar, tlvType, key, dtype):
+    values = tuple(range(1, len(dtype.names) + 1))
+    tlv = struct.pack('<2I', tlvType, dtype.itemsize) + np.array([values], dtype=dtype).tobytes()
+    packet = np.frombuffer(bytes(HEADER_NUM_BYTES) + tlv, dtype='uint8')
+    tlvs = parse_tlvs(packet, HEADER_NUM_BYTES, len(packet), 1, 0, radar.radar_parameters)
+    assert tuple(tlvs[tlvType][key].values()) == values
+
+    # a short record, followed by another TLV it must not read into
+    tlv = struct.pack('<2I', tlvType, dtype.itemsize - 4) + bytes(dtype.itemsize - 4) + struct.pack('<2I', 2, 0)
+    packet = np.frombuffer(bytes(HEADER_NUM_BYTES) + tlv, dtype='uint8')
+    tlvs = parse_tlvs(packet, HEADER_NUM_BYTES, len(packet), 2, 0, radar.radar_parameters)
+    assert tlvs[tlvType][key] == {}
+    assert 2 in tlvs
+
+def test_parse_frame_without_points_keeps_range_doppler():
+    generator = PacketGenerator(os.path.join(os.path.dirname(RADAR_CONFIG_FILE_PATH), 'heatmap.cfg'), seed=2)
+    radar = Radar()
+    radar.radar_parameters = generator.radar_parameters
+    dataOK, frameNumber, detObj = radar.parse_frame(generator.packet(3, 0))
+    assert dataOK == 1
+    assert frameNumber == 3
+    assert detObj["numObj"] == 0
+    assert len(detObj["x"]) == len(detObj["snr"]) == 0
+    assert np.shape(detObj["rangeDoppler"]) == (generator.num_doppler_bins, generator.num_range_bins)
+
+
+def test_parse_frame_decodes_the_header_once(radar, monkeypatch):
+    calls = []
+    parse_header = parser_mmw_demo.parse_header
+    monkeypatch.setattr(parser_mmw_demo, 'parse_header', lambda *args: calls.append(args) or parse_header(*args))
+    dataOK, frameNumber, detObj = radar.parse_frame(build_packet(frame_number=11))
+    assert dataOK == 1
+    assert frameNumber == detObj["frameNumber"] == 11
+    assert detObj["timeCpuCycles"] == 0
+    assert len(calls) == 1
@@ -0,0 +1,134 @@
+""" Tests for the threaded Pipeline stages and the SerialReader source """
+import queue
+import threading
+import time
+
+from modules.pipeline import Pipeline, put_drop_oldest
+from modules.serial_reader import SerialReader
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_put_drop_oldest():
+    target_queue = queue.Queue(3)
+    dropped = sum(put_drop_oldest(target_queue, item) for item in range(5))
+    assert dropped == 2
+    assert [target_queue.get_nowait() for _ in range(3)] == [2, 3, 4]
+
+
+def test_lossless_stage_keeps_every_item():
+    source_queue = queue.Queue()
+    received = []
+
+    def slow_store(item):
+        time.sleep(0.002)
+        received.append(item)
+
+    pipeline = Pipeline(source_queue)
+    pipeline.add_stage('produce', lambda item: [item])
+    pipeline.add_stage('store', slow_store, max_queue=2, lossless=True)
+    for item in range(100):
+        source_queue.put(item)
+    pipeline.start()
+    assert wait_until(lambda: len(received) == 100)
+    pipeline.stop()
+    pipeline.join()
+    assert received == list(range(100))
+    assert pipeline.metrics()['produce']['dropped_downstream'] == 0
+
+
+def test_lossy_stage_drops_the_oldest_items():
+    source_queue = queue.Queue()
+    release = threading.Event()
+    received = []
+
+    def blocked_store(item):
+        release.wait()
+        received.append(item)
+
+    pipeline = Pipeline(source_queue)
+    pipeline.add_stage('produce', lambda item: [item])
+    pipeline.add_stage('store', blocked_store, max_queue=4)
+    for item in range(50):
+        source_queue.put(item)
+    pipeline.start()
+    assert wait_until(lambda: pipeline.stages[0].processed == 50)
+    release.set()
+    assert wait_until(lambda: pipeline.stages[1].input_queue.empty() and pipeline.stages[1].processed == len(received)
+                      and len(received) > 0)
+    pipeline.stop()
+    pipeline.join()
+    dropped = pipeline.metrics()['produce']['dropped_downstream']
+    assert dropped > 0
+    assert len(received) + dropped == 50
+    # the newest items survive
+    assert received[-1] == 49
+
+
+def test_subscribers_and_errors():
+    source_queue = queue.Queue()
+    seen = []
+
+    def parse(item):
+        if item == 3:
+            raise ValueError('bad item')
+        return [item * 10]
+
+    def failing_subscriber(result):
+        raise RuntimeError('subscriber failed')
+
+    pipeline = Pipeline(source_queue)
+    pipeline.add_stage('parse', parse)
+    pipeline.subscribe('parse', failing_subscriber)
+    pipeline.subscribe('parse', seen.append)
+    for item in range(6):
+        source_queue.put(item)
+    pipeline.start()
+    assert wait_until(lambda: pipeline.stages[0].processed == 6)
+    pipeline.stop()
+    pipeline.join()
+    metrics = pipeline.metrics()['parse']
+    assert seen == [0, 10, 20, 40, 50]
+    assert metrics['errors'] == 1
+    assert metrics['subscriber_errors'] == 5
+
+
+class ChunkSerial:
+    """ Data port stand-in that returns one prepared chunk per read, then times out """
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.timeout = None
+
+    @property
+    def in_waiting(self):
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size=1):
+        if not self.chunks:
+            time.sleep(self.timeout)
+            return b''
+        chunk = self.chunks[0]
+        self.chunks[0] = chunk[size:]
+        if not self.chunks[0]:
+            self.chunks.pop(0)
+        return chunk[:size]
+
+
+def test_serial_reader_drops_the_oldest_chunks():
+    chunks = [bytes([index]) * 10 for index in range(20)]
+    serial_reader = SerialReader(ChunkSerial(chunks), frame_periodicity=10, max_chunks=5)
+    serial_reader.start()
+    assert wait_until(lambda: serial_reader.bytes_read == 200)
+    serial_reader.stop()
+    serial_reader.join()
+    assert serial_reader.chunks_dropped == 15
+    assert serial_reader.get(timeout=0.1) == b''.join(chunks[-5:])
+    assert serial_reader.get(timeout=0.01) == b''
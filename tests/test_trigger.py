@@ -0,0 +1,91 @@
+""" Tests for the STA/LTA triggers: batch evaluation against the online check()/push() path """
+import numpy as np
+import pytest
+
+from modules.trigger import RunningWindow, StaLtaTrigger, MultiFeatureTrigger
+
+
+def gesture_sequence(seed=3, num_gestures=4):
+    """ Quiet frames with bursts of high values """
+    rng = np.random.default_rng(seed)
+    parts = [rng.uniform(0, 20, 60)]
+    for _ in range(num_gestures):
+        parts += [rng.uniform(150, 400, int(rng.integers(5, 30))), rng.uniform(0, 20, int(rng.integers(10, 80)))]
+    return np.concatenate(parts)
+
+
+def run_online(trigger, values):
+    ratios, statuses = [], []
+    for value in values:
+        statuses.append(trigger.check())
+        ratio = trigger.ratio()
+        ratios.append(np.nan if ratio is None else ratio)
+        trigger.push(value)
+    return np.array(ratios), np.array(statuses)
+
+
+def run_segmenter(trigger, values, record_frames):
+    """ The trigger calls of main.py's GestureSegmenter, with record_frames frames recorded per gesture """
+    ratios, statuses = [], []
+    status, counter = False, 0
+    for value in values:
+        prev_status = status
+        status = trigger.check()
+        ratio = trigger.ratio()
+        ratios.append(np.nan if ratio is None else ratio)
+        statuses.append(status)
+        if status and not prev_status:
+            counter = 0
+        if status:
+            counter += 1
+        if status and counter == record_frames:
+            trigger.reset()
+            status = False
+        if not status:
+            trigger.push(value)
+    return np.array(ratios), np.array(statuses)
+
+
+def test_running_window_mean():
+    window = RunningWindow(4)
+    assert window.mean() is None
+    values = np.random.default_rng(0).uniform(0, 1, 50)
+    for index, value in enumerate(values):
+        window.push(value)
+        assert window.mean() == pytest.approx(values[max(index - 3, 0):index + 1].mean())
+    window.reset()
+    assert len(window) == 0 and window.mean() is None
+
+
+def test_evaluate_batch_matches_online():
+    values = gesture_sequence()
+    ratio, status = StaLtaTrigger().evaluate_batch(values)
+    online_ratio, online_status = run_online(StaLtaTrigger(), values)
+    np.testing.assert_allclose(ratio, online_ratio, rtol=1e-9)
+    np.testing.assert_array_equal(status, online_status)
+    assert status.any()
+
+
+@pytest.mark.parametrize('record_frames', [1, 5, 15, 40])
+def test_evaluate_batch_matches_segmenter(record_frames):
+    values = gesture_sequence(seed=record_frames)
+    ratio, status = StaLtaTrigger().evaluate_batch(values, record_frames)
+    online_ratio, online_status = run_segmenter(StaLtaTrigger(), values, record_frames)
+    np.testing.assert_allclose(ratio, online_ratio, rtol=1e-9)
+    np.testing.assert_array_equal(status, online_status)
+    # the held trigger starts a new gesture after each reset
+    assert np.count_nonzero(np.diff(status.astype(int)) == 1) >= 2
+
+
+def test_multi_feature_evaluate_batch_matches_online():
+    rng = np.random.default_rng(7)
+    features = {"snr": gesture_sequence(1), "num_points": rng.integers(0, 30, len(gesture_sequence(1))),
+                "doppler_energy": rng.uniform(0, 2, len(gesture_sequence(1)))}
+    for mode in ('any', 'all'):
+        trigger = MultiFeatureTrigger(mode=mode)
+        status = trigger.evaluate_batch(features)
+        online_status = []
+        for frame in range(len(features["snr"])):
+            online_status.append(trigger.check())
+            trigger.push({name: values[frame] for name, values in features.items()})
+        np.testing.assert_array_equal(status, online_status)
@@ -1,41 +1,24 @@
-import os
-import numpy as np
-import matplotlib.pyplot as plt
-
-def plot_data_from_npy(npy_folder, pic_folder):
-    npy_files = [file for file in os.listdir(npy_folder) if file.endswith('.npy')]
-    
-    for npy_file in npy_files:
-        file_path = os.path.join(npy_folder, npy_file)
-        np_array = np.load(file_path)
-        file_number = npy_file.split('_')[2].split('.')[0]
-        plot_parameter_over_time(np_array, file_number, pic_folder)
-        
-def plot_parameter_over_time(np_array, number, pic_folder):
-    y_ranges = {'Range': (-0.2, 0.8), 'Doppler': (-2.5, 2.5), 'Azimuth': (-60, 60), 'Elevation': (-60, 60)}
-    param_indices = {'Range': 4, 'Doppler': 3, 'Azimuth': 6, 'Elevation': 7}
-    
-    background_color = (0.8, 0.8, 0.8)
-    line_color = (0.2, 0.2, 0.2)
-    
-    for param, y_range in y_ranges.items():
-        param_index = param_indices[param]
-        times = np.arange(np_array.shape[0])
-        values = np_array[:, param_index]
-
-        plt.figure(figsize=(4, 4), facecolor=background_color)
-        plt.plot(times, values, linewidth=3, color=line_color)
-        plt.ylim(y_range)
-        plt.axis('off')
-        plt.gca().set_position([0, 0, 1, 1])
-        plt.gca().set_aspect('auto')
-
-        img_filename = f'{pic_folder}/yuan_data_{number}_{param.lower()}.png'
-        plt.savefig(img_filename, dpi=80, bbox_inches='tight', pad_inches=0)
-        plt.close()
-        print(f"Image saved: {img_filename}")
+"""
+將 radar_data 中所有手勢 .npy 檔案的 range、doppler、azimuth、elevation 畫成圖片存到 radar_data_pic。
+以多個行程平行繪圖，每個行程重複使用同一張 figure；圖片已存在且比 .npy 新的手勢會被跳過。
+加上 --force 可全部重畫，--workers 指定行程數，--engine opencv 以 OpenCV 直接繪製（不經 matplotlib）。
+"""
+import argparse
+from modules.render import render_npy_dir
 
 npy_folder = 'radar_data'
 pic_folder = 'radar_data_pic'
+file_prefix = 'yuan_data'
+y_ranges = {'Range': (-0.2, 0.8), 'Doppler': (-2.5, 2.5), 'Azimuth': (-60, 60), 'Elevation': (-60, 60)}
+
+if __name__ == '__main__':
+    argument_parser = argparse.ArgumentParser(description='Render gesture feature images')
+    argument_parser.add_argument('--workers', type=int, default=None)
+    argument_parser.add_argument('--force', action='store_true', help='render gestures whose images are up to date')
+    argument_parser.add_argument('--engine', choices=['matplotlib', 'opencv'], default='matplotlib',
+                                 help='opencv rasterizes without matplotlib, grey single-channel PNG')
+    args = argument_parser.parse_args()
 
-plot_data_from_npy(npy_folder, pic_folder)
+    result = render_npy_dir(npy_folder, pic_folder, file_prefix, y_ranges, args.workers, args.force, args.engine)
+    print(f"Rendered {result['gestures']} gestures ({result['images']} images), skipped {result['skipped']} up to date, "
+          f"{result['seconds']:.1f} s, {result['images_per_sec']:.1f} images/sec")